@@ -1,15 +1,32 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, UploadFile, File, HTTPException, WebSocket, WebSocketDisconnect
+from typing import Optional
+import json
+import os
+import re
 from app.services.speech_recognition import SpeechRecognitionService
+from app.services.streaming_transcription import StreamingTranscriptionSession
+from app.utils.audio_decoding import SAMPLE_FORMATS, sample_format_for
 
 router = APIRouter()
 
+# Whisper language codes ("en", "haw", "yue"), or "auto" to force detection
+LANGUAGE_HINT = re.compile(r"[a-z]{2,3}|auto")
+
 class SpeechToTextEndpoint:
     def __init__(self):
+        # Cheap to construct: the Whisper model is loaded in the background at startup
         self.stt_service = SpeechRecognitionService()
+        self.stream_config = {
+            "partial_interval_ms": int(os.getenv("STT_STREAM_PARTIAL_MS", "500")),
+            "window_seconds": float(os.getenv("STT_STREAM_WINDOW_SECONDS", "8")),
+            "max_segment_seconds": float(os.getenv("STT_STREAM_MAX_SEGMENT_SECONDS", "25")),
+            "min_silence_ms": int(os.getenv("STT_VAD_MIN_SILENCE_MS", "600"))
+        }
+        self.active_streams = 0
         
-    @router.post("/speech-to-text/")
-    async def convert_speech_to_text(self, audio: UploadFile = File(...)):
-        """Convert uploaded audio to text"""
+    async def convert_speech_to_text(self, audio: UploadFile, sample_format: Optional[str] = None,
+                                     language: Optional[str] = None, user_id: Optional[str] = None):
+        """Convert uploaded audio to text; WAV, WebM/Opus, Ogg, MP3, FLAC, MP4 or raw 16 kHz PCM"""
         if not audio:
             raise HTTPException(status_code=400, detail="Audio file is required")
             
@@ -18,11 +35,82 @@ class SpeechToTextEndpoint:
         
         if not audio_bytes:
             raise HTTPException(status_code=400, detail="Audio file is empty")
+        
+        if not self.stt_service.is_ready:
+            # Kicks off (or retries) the background load; the caller should come back shortly
+            self.stt_service.start()
+            raise HTTPException(status_code=503, detail="Speech recognition model is still loading")
             
-        # Process audio with Whisper
-        result = await self.stt_service.transcribe(audio_bytes)
+        if sample_format is not None and sample_format not in SAMPLE_FORMATS:
+            raise HTTPException(status_code=400, detail=f"Unsupported format: {sample_format}")
+        if language is not None and not LANGUAGE_HINT.fullmatch(language):
+            raise HTTPException(status_code=400, detail=f"Invalid language: {language}")
+
+        # Process audio with Whisper; raw PCM needs its sample format from the query or content type
+        # A language hint, or the user's remembered language, skips Whisper's detection pass
+        result = await self.stt_service.transcribe(audio_bytes, sample_format or sample_format_for(audio.content_type),
+                                                   language, user_id)
         
+        if result.get("queue_full"):
+            raise HTTPException(status_code=503, detail="Speech recognition is busy, try again shortly",
+                                headers={"Retry-After": "1"})
+        if result.get("invalid_audio"):
+            raise HTTPException(status_code=400, detail=result["error"])
         if not result["success"]:
             raise HTTPException(status_code=500, detail=result.get("error", "Failed to transcribe audio"))
             
-        return {"text": result["text"], "language": result.get("language", "en")}
\ No newline at end of file
+        return {"text": result["text"], "language": result.get("language", "en"), "cached": result.get("cached", False),
+                "language_source": result.get("language_source")}
+
+    async def stream_speech_to_text(self, websocket: WebSocket, language: Optional[str], sample_format: str):
+        """Transcribe 16 kHz mono PCM as it arrives: binary frames in, partial and final JSON events out"""
+        await websocket.accept()
+
+        if sample_format not in SAMPLE_FORMATS:
+            await websocket.send_json({"type": "error", "error": f"Unsupported format: {sample_format}"})
+            await websocket.close(code=1003)
+            return
+        if not self.stt_service.is_ready:
+            self.stt_service.start()
+            await websocket.send_json({"type": "error", "error": "Speech recognition model is still loading"})
+            await websocket.close(code=1013)  # Try again later
+            return
+
+        session = StreamingTranscriptionSession(self.stt_service, websocket.send_json, language, sample_format,
+                                                **self.stream_config)
+        self.active_streams += 1
+        try:
+            await websocket.send_json({"type": "ready", "sample_rate": 16000, "format": sample_format})
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    session.cancel()
+                    return
+                if message.get("bytes"):
+                    await session.feed(message["bytes"])
+                elif message.get("text"):
+                    try:
+                        control = json.loads(message["text"])
+                    except ValueError:
+                        control = {}
+                    if control.get("type") == "end":
+                        await session.finish()
+                        await websocket.send_json({"type": "done", **session.stats()})
+                        await websocket.close()
+                        return
+        except WebSocketDisconnect:
+            session.cancel()
+        finally:
+            self.active_streams -= 1
+
+speech_to_text_endpoint = SpeechToTextEndpoint()
+
+@router.post("/speech-to-text")
+async def convert_speech_to_text(audio: UploadFile = File(...), format: Optional[str] = None,
+                                 language: Optional[str] = None, user_id: Optional[str] = None):
+    return await speech_to_text_endpoint.convert_speech_to_text(audio, format, language, user_id)
+
+
+@router.websocket("/ws/speech-to-text")
+async def stream_speech_to_text(websocket: WebSocket, language: Optional[str] = None, format: str = "s16le"):
+    await speech_to_text_endpoint.stream_speech_to_text(websocket, language, format)
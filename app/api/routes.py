@@ -1,10 +1,18 @@
-from fastapi import APIRouter, HTTPException, Request, UploadFile, File
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Request, Response, UploadFile, File, WebSocket, WebSocketDisconnect
 from app.models import ChatRequest
 from app.services.ai_service import AIService
 from app.services.task_service import TaskService
-from datetime import datetime, date
+from app.services.chat_pipeline import ChatPipeline
+from app.services.transcript_store import TranscriptStore
+from app.services.rate_limiter import PRIORITIES, PRIORITY_NORMAL
+from app.services.text_to_speech import TextToSpeechService
+from app.services.voice_turn import VoiceTurnPipeline
+from app.api.endpoints.speech_to_text import speech_to_text_endpoint
+from app.utils.audio_decoding import SAMPLE_FORMATS
+import json
 import logging
-import re
+import os
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -13,9 +21,22 @@ logger = logging.getLogger(__name__)
 router = APIRouter()
 ai_service = AIService()
 task_service = TaskService()
+transcript_store = TranscriptStore(
+    base_dir=os.getenv("TRANSCRIPT_DIR", "data/transcripts"),
+    segment_max_records=int(os.getenv("TRANSCRIPT_SEGMENT_RECORDS", "500")),
+    retention_days=float(os.getenv("TRANSCRIPT_RETENTION_DAYS", "30")),
+    max_cached_users=int(os.getenv("TRANSCRIPT_CACHED_USERS", "1000"))
+)
+chat_pipeline = ChatPipeline(ai_service, transcript_store)
+voice_pipeline = VoiceTurnPipeline(
+    speech_to_text_endpoint.stt_service, chat_pipeline, TextToSpeechService(),
+    max_tts_concurrency=int(os.getenv("VOICE_TTS_CONCURRENCY", "2")),
+    min_sentence_chars=int(os.getenv("VOICE_MIN_SENTENCE_CHARS", "20"))
+)
+VOICE_TURN_MAX_BYTES = int(os.getenv("VOICE_TURN_MAX_BYTES", str(10 * 1024 * 1024)))
 
 @router.post("/chat")
-async def chat(request: ChatRequest):
+async def chat(request: ChatRequest, response: Response):
     """Process chat requests and return AI responses"""
     logger.info(f"Received chat request with message: {request.message}")
     
@@ -23,94 +44,65 @@ async def chat(request: ChatRequest):
         logger.warning("Empty message received")
         raise HTTPException(status_code=400, detail="Message cannot be empty")
     
-    try:
-        # Using user_001 as that's the ID in our tasks.json
-        user_id = "user_001"
-        message_lower = request.message.lower()
-
-        # First try the AI service for any query
-        result = await ai_service.generate_response(request.message)
-        if result["success"]:
-            return result
-            
-        # If AI service fails, handle basic queries directly
-        if any(word in message_lower for word in ["task", "schedule", "meeting", "todo", "to-do", "to do"]):
-            # Handle task listing queries
-            if any(word in message_lower for word in ["show", "list", "what", "display"]):
-                if "today" in message_lower:
-                    tasks = task_service.get_today_tasks(user_id)
-                    if tasks:
-                        tasks_text = "\n".join([f"• {task['title']} (Priority: {task['priority']})" for task in tasks])
-                        return {
-                            "success": True,
-                            "response": f"Here are your tasks for today:\n{tasks_text}"
-                        }
-                    return {
-                        "success": True,
-                        "response": "You don't have any tasks scheduled for today."
-                    }
-                elif "upcoming" in message_lower or "next" in message_lower:
-                    tasks = task_service.get_upcoming_tasks(user_id)
-                    if tasks:
-                        tasks_text = "\n".join([f"• {task['title']} (Due: {task['due_date']})" for task in tasks])
-                        return {
-                            "success": True,
-                            "response": f"Here are your upcoming tasks:\n{tasks_text}"
-                        }
-                    return {
-                        "success": True,
-                        "response": "You don't have any upcoming tasks scheduled."
-                    }
-                elif "priority" in message_lower or "important" in message_lower:
-                    task = task_service.get_highest_priority_task(user_id)
-                    if task:
-                        return {
-                            "success": True,
-                            "response": f"Your highest priority task is: {task['title']} (Due: {task['due_date']})"
-                        }
-                    return {
-                        "success": True,
-                        "response": "You don't have any priority tasks at the moment."
-                    }
-            
-            # Handle task creation
-            elif any(word in message_lower for word in ["create", "add", "new"]):
-                # Pass to AI service to extract task details
-                result = await ai_service.generate_response(request.message)
-                if result["success"]:
-                    return result
-                return {
-                    "success": True,
-                    "response": "I can help you create a new task. Please provide the task title and any other details like due date and priority."
-                }
+    # Route, local handlers, LLM and render each run at most once per message
+    priority = PRIORITIES.get(request.priority, PRIORITY_NORMAL)
+    result, timings = await chat_pipeline.run(request.message, priority, request.latency_budget_ms, request.user_id)
+    response.headers["Server-Timing"] = chat_pipeline.server_timing(timings)
+    logger.info(f"Chat turn stages: {chat_pipeline.server_timing(timings)}")
+    return result
 
-        # For general queries about date/time
-        elif "date" in message_lower or "time" in message_lower or "today" in message_lower:
-            formatted_date = datetime.now().strftime("%B %d, %Y")
-            return {
-                "success": True,
-                "response": f"Today's date is {formatted_date}."
-            }
+@router.websocket("/ws/voice-turn")
+async def voice_turn(websocket: WebSocket, user_id: str = "user_001", voice_id: str = "en",
+                     language: Optional[str] = None, format: Optional[str] = None):
+    """Spoken turns over one connection: audio frames then {"type": "end"} in, transcript, text and audio out"""
+    await websocket.accept()
+    
+    if format is not None and format not in SAMPLE_FORMATS:
+        await websocket.send_json({"type": "error", "stage": "input", "error": f"Unsupported format: {format}"})
+        await websocket.close(code=1003)
+        return
+    if not voice_pipeline.stt_service.is_ready:
+        voice_pipeline.stt_service.start()
+        await websocket.send_json({"type": "error", "stage": "stt", "error": "Speech recognition model is still loading"})
+        await websocket.close(code=1013)  # Try again later
+        return
+    
+    await websocket.send_json({"type": "ready"})
+    audio = bytearray()
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+            if message.get("bytes"):
+                audio += message["bytes"]
+                if len(audio) > VOICE_TURN_MAX_BYTES:
+                    await websocket.send_json({"type": "error", "stage": "input", "error": "Audio is too large"})
+                    await websocket.close(code=1009)  # Message too big
+                    return
+            elif message.get("text"):
+                try:
+                    control = json.loads(message["text"])
+                except ValueError:
+                    control = {}
+                if control.get("type") == "end":
+                    # The connection stays open for the next turn
+                    await voice_pipeline.run(bytes(audio), websocket.send_json, websocket.send_bytes,
+                                             user_id, voice_id, language, format)
+                    audio = bytearray()
+    except WebSocketDisconnect:
+        logger.info("Voice turn client disconnected")
 
-        # For general chat
-        result = await ai_service.generate_response(request.message)
-        
-        if result["success"]:
-            logger.info("Successfully generated response from OpenAI API")
-            return result
-        else:
-            logger.error(f"AI service error: {result.get('error', 'Unknown error')}")
-            return {
-                "success": True,
-                "response": "I apologize, but I'm having trouble processing your request right now. Could you try again?"
-            }
+@router.get("/chat/history")
+async def get_chat_history(user_id: str = "user_001", cursor: Optional[str] = None, limit: int = 20):
+    """Get a user's persisted chat turns, newest first, one page at a time"""
+    if not 1 <= limit <= 100:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 100")
+    if cursor is not None and not cursor.isdigit():
+        raise HTTPException(status_code=400, detail="Invalid cursor")
     
-    except Exception as e:
-        logger.error(f"Error in chat endpoint: {str(e)}")
-        return {
-            "success": True,
-            "response": "I apologize for the inconvenience. I'm experiencing a technical issue. Please try again in a moment."
-        }
+    page = transcript_store.read_page(user_id, cursor, limit)
+    return {"success": True, **page}
 
 @router.get("/models")
 async def get_models():
@@ -120,4 +112,25 @@ async def get_models():
         "models": ["gpt-3.5-turbo"],
         "current_model": ai_service.last_model_used,
         "status": "online" if ai_service.openai_api_key else "offline"
-    }
\ No newline at end of file
+    }
+
+@router.get("/metrics")
+async def get_metrics():
+    """Get cache and performance counters for the chat pipeline"""
+    return {
+        "success": True,
+        "response_cache": ai_service.response_cache.stats(),
+        "semantic_cache": ai_service.semantic_cache.stats() if ai_service.semantic_cache else None,
+        "task_context_cache": ai_service.task_context_builder.stats(),
+        "intent_router": ai_service.intent_router.stats(),
+        "request_coalescing": ai_service.single_flight.stats(),
+        "upstream": ai_service.resilience.stats(),
+        "rate_limiter": ai_service.rate_limiter.stats(),
+        "latency_budget": ai_service.latency_budget_stats(),
+        "task_tools": ai_service.task_tools.stats(),
+        "pipeline": chat_pipeline.stats(),
+        "conversation_memory": ai_service.conversation_memory.stats(),
+        "transcripts": transcript_store.stats(),
+        "llm_backend": ai_service.backend_stats(),
+        "voice_turns": voice_pipeline.stats()
+    }
@@ -2,12 +2,29 @@ from fastapi import FastAPI, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse
-from app.api.routes import router
+from fastapi.responses import HTMLResponse, JSONResponse
+from app.api.routes import router, transcript_store
+from app.api.endpoints.speech_to_text import router as speech_to_text_router, speech_to_text_endpoint
+import asyncio
+import os
+from contextlib import asynccontextmanager
 from app.models import ChatRequest
 from app.services.ai_service import AIService
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Load and warm up Whisper in the background so startup is not blocked"""
+    if os.getenv("WHISPER_PRELOAD", "true").lower() == "true":
+        speech_to_text_endpoint.stt_service.start()
+    # Expire old chat transcripts at startup and periodically, not only when a user rolls a segment
+    retention = asyncio.ensure_future(transcript_store.run_retention(
+        float(os.getenv("TRANSCRIPT_RETENTION_INTERVAL_SECONDS", "3600"))
+    ))
+    yield
+    retention.cancel()
+
 app = FastAPI(
+    lifespan=lifespan,
     title="AI Voice Assistant API",
     description="API for AI voice assistant with speech-to-text, text-to-speech, and chat capabilities",
     version="1.0.0"
@@ -30,6 +47,19 @@ templates = Jinja2Templates(directory="app/templates")
 
 # Include API routes
 app.include_router(router, prefix="/api/v1")
+app.include_router(speech_to_text_router, prefix="/api/v1")
+
+@app.get("/health/live")
+async def live():
+    """The process is up and serving requests"""
+    return {"status": "ok"}
+
+@app.get("/health/ready")
+async def ready():
+    """Ready only once the speech model is loaded and warm, so the load balancer can hold STT traffic"""
+    stt = speech_to_text_endpoint.stt_service.stats()
+    ready = stt["state"] == "ready"
+    return JSONResponse(status_code=200 if ready else 503, content={"ready": ready, "speech_to_text": stt})
 
 @app.get("/", response_class=HTMLResponse)
 async def root(request: Request):
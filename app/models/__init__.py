@@ -1,4 +1,8 @@
+from typing import Optional
 from pydantic import BaseModel
 
 class ChatRequest(BaseModel):
-    message: str
\ No newline at end of file
+    message: str
+    user_id: str = "user_001"
+    priority: str = "normal"  # "interactive" for voice, "normal" for typed chat, or "background"
+    latency_budget_ms: Optional[int] = None  # answer locally if the LLM takes longer than this
\ No newline at end of file
@@ -1,10 +1,23 @@
 import os
 from dotenv import load_dotenv
-import httpx
+import asyncio
 import logging
 import json
 import re
+import hashlib
+import random
 from datetime import datetime
+from app.utils.cache import TTLCache
+from app.services.semantic_cache import SemanticCache
+from app.services.task_context import TaskContextBuilder
+from app.services.prompt_builder import PromptAssembler
+from app.services.intent_router import IntentRouter
+from app.services.request_coalescer import SingleFlight
+from app.services.resilience import CircuitBreaker, CircuitOpenError, ResilientExecutor
+from app.services.rate_limiter import PRIORITY_NORMAL, RateLimitTimeout, TokenBucketRateLimiter
+from app.services.llm_backends import LocalTransformersBackend, OpenAIAPIError, OpenAIBackend
+from app.services.conversation_memory import ConversationMemory
+from app.services.task_tools import MUTATING_TOOLS, TASK_TOOLS, TaskToolExecutor
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -13,271 +26,402 @@ logger = logging.getLogger(__name__)
 # Load environment variables
 load_dotenv()
 
+class _TextStream:
+    """Fans streamed text from one upstream call out to every caller sharing it.
+
+    Retried and hedged attempts each restart their text from the beginning; only the attempt that
+    spoke first is forwarded, and the next one takes over if it fails. A caller that joins late is
+    first given the text so far.
+    """
+
+    def __init__(self):
+        self.listeners = []
+        self.owner = None
+        self.text = ""
+
+    async def subscribe(self, on_text):
+        self.listeners.append(on_text)
+        if self.text:
+            await on_text(self.text)
+
+    def unsubscribe(self, on_text):
+        if on_text in self.listeners:
+            self.listeners.remove(on_text)
+
+    async def update(self, attempt, text):
+        if self.owner is None:
+            self.owner = attempt
+        if self.owner is not attempt:
+            return
+        self.text = text
+        for on_text in list(self.listeners):
+            try:
+                await on_text(text)
+            except Exception as e:
+                # One caller's consumer failing must not fail the upstream call for the others
+                logger.error(f"Dropping streamed text listener after error: {e}")
+                self.unsubscribe(on_text)
+
+    def release(self, attempt):
+        if self.owner is attempt:
+            # The next attempt starts its text over; a caller joining now must not get this one's
+            self.owner = None
+            self.text = ""
+
 class AIService:
     def __init__(self):
         # OpenAI API settings
         self.use_openai = True
-        self.openai_api_key = os.getenv("OPENAI_API_KEY")
+        self.request_timeout = float(os.getenv("OPENAI_TIMEOUT", "30"))
+        self.openai_backend = OpenAIBackend(
+            os.getenv("OPENAI_API_KEY"),
+            timeout=self.request_timeout,
+            # Point at mock_openai_server.py (or any compatible server) for load tests
+            base_url=os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+        )
         self.default_model = "gpt-3.5-turbo"
         self.openai_model = os.getenv("OPENAI_MODEL", self.default_model)
         self.last_model_used = self.openai_model
         self.fallback_response = False
         self.retry_count = 0
-        self.max_retries = 3
+        self.max_retries = int(os.getenv("OPENAI_MAX_RETRIES", "3"))
+        
+        # "openai" (default), "local" for an offline CPU model, or "auto" to use the local
+        # model when OpenAI is unconfigured, its circuit is open or the rate limiter is full
+        self.llm_backend = os.getenv("LLM_BACKEND", "openai").lower()
+        self.local_backend = None
+        if self.llm_backend in ("local", "auto"):
+            self.local_backend = LocalTransformersBackend(
+                model_name=os.getenv("LOCAL_LLM_MODEL", "Qwen/Qwen2.5-0.5B-Instruct"),
+                max_batch_size=int(os.getenv("LOCAL_LLM_BATCH_SIZE", "4")),
+                max_new_tokens=int(os.getenv("LOCAL_LLM_MAX_NEW_TOKENS", "256")),
+                quantize=os.getenv("LOCAL_LLM_QUANTIZE", "true").lower() == "true"
+            )
+        self.local_overflow = 0
         
         # Task Service integration
         from app.services.task_service import TaskService
         self.task_service = TaskService()
+        self.task_context_builder = TaskContextBuilder(self.task_service)
+        self.prompt_assembler = PromptAssembler(
+            self.openai_model,
+            token_budget=int(os.getenv("PROMPT_TOKEN_BUDGET", "3000"))
+        )
+        
+        # Exact-match response cache, keyed on model, prompt, input, task-store version and date
+        self.response_cache = TTLCache(
+            max_entries=int(os.getenv("RESPONSE_CACHE_SIZE", "512")),
+            ttl_seconds=float(os.getenv("RESPONSE_CACHE_TTL", "900")),
+            disk_dir=os.getenv("RESPONSE_CACHE_DIR") or None
+        )
+        
+        # Semantic cache catches paraphrases the exact-match cache misses
+        self.semantic_cache = None
+        if os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true":
+            self.semantic_cache = SemanticCache(
+                max_entries=int(os.getenv("SEMANTIC_CACHE_SIZE", "256")),
+                threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.9")),
+                ttl_seconds=float(os.getenv("RESPONSE_CACHE_TTL", "900"))
+            )
+        
+        # Coalesces identical concurrent requests into one upstream call
+        self.single_flight = SingleFlight()
+        self._text_streams = {}  # Coalescing key -> _TextStream of a streaming in-flight call
+        
+        # Retries with jittered backoff, circuit breaker and optional hedged requests
+        self.resilience = ResilientExecutor(
+            max_retries=self.max_retries,
+            breaker=CircuitBreaker(
+                failure_threshold=int(os.getenv("OPENAI_BREAKER_THRESHOLD", "5")),
+                reset_timeout=float(os.getenv("OPENAI_BREAKER_RESET_SECONDS", "30"))
+            ),
+            hedge_enabled=os.getenv("OPENAI_HEDGE_ENABLED", "false").lower() == "true"
+        )
+        
+        # Client-side request/token budget so bursts queue by priority instead of hitting 429s
+        self.rate_limiter = TokenBucketRateLimiter(
+            requests_per_minute=float(os.getenv("OPENAI_RPM_LIMIT", "500")),
+            tokens_per_minute=float(os.getenv("OPENAI_TPM_LIMIT", "90000")),
+            max_queue_wait=float(os.getenv("OPENAI_MAX_QUEUE_WAIT", "10"))
+        )
+        
+        # Recent turns per user, with older ones folded into a rolling summary
+        self.conversation_memory = ConversationMemory(
+            max_turns=int(os.getenv("CONVERSATION_MAX_TURNS", "8")),
+            summary_trigger_tokens=int(os.getenv("CONVERSATION_SUMMARY_TRIGGER_TOKENS", "800")),
+            summary_max_tokens=int(os.getenv("CONVERSATION_SUMMARY_MAX_TOKENS", "200")),
+            max_users=int(os.getenv("CONVERSATION_MAX_USERS", "1000")),
+            counter=self.prompt_assembler.counter
+        )
+        
+        # Tool-calling mode: the model fetches only the task data it needs instead of the full context dump
+        self.tool_calling = os.getenv("OPENAI_TOOL_CALLING", "false").lower() == "true"
+        self.max_tool_rounds = int(os.getenv("OPENAI_MAX_TOOL_ROUNDS", "3"))
+        self.task_tools = TaskToolExecutor(self.task_service)
+        
+        # Requests that carry a latency budget get a local answer if the LLM is too slow
+        self.deadline_stats = {"met": 0, "missed": 0}
+        self._background_calls = set()
+        
+        # Intent classification and the handler for every intent answered locally
+        self.intent_router = IntentRouter()
+        self._intent_handlers = {
+            "next_days_schedule": self._next_days_schedule_response,
+            "tomorrow_schedule": self._tomorrow_schedule_response,
+            "week_schedule": self._week_schedule_response,
+            "date_schedule": self._date_schedule_response,
+            "current_date": self._current_date_response,
+            "today_schedule": self._today_schedule_response,
+            "weekly_overview": self._weekly_overview_response,
+            "schedule_overview": self._task_context_response,
+            "smalltalk": self._smalltalk_response,
+            "help": self._help_response,
+            "create_task": self._create_task_hint_response,
+            "highest_priority": self._highest_priority_response,
+            "upcoming_tasks": self._upcoming_tasks_response,
+            "task_query": self._task_context_response,
+            "greeting": self._greeting_response,
+            "general": self._default_response,
+        }
         
         # Log configuration
         logger.info(f"Initialized AIService with OpenAI model: {self.openai_model}")
         if not self.openai_api_key:
             logger.warning("OPENAI_API_KEY environment variable is not set")
     
-    async def _call_openai_api(self, user_input, system_prompt):
-        """Call the OpenAI API with the configured model"""
+    @property
+    def openai_api_key(self):
+        return self.openai_backend.api_key
+
+    @openai_api_key.setter
+    def openai_api_key(self, value):
+        self.openai_backend.api_key = value
+
+    def _llm_available(self):
+        """True if some backend can answer: OpenAI with a key, or a local model that has not failed to load"""
+        if self.llm_backend != "local" and self.openai_api_key:
+            return True
+        return self.local_backend is not None and self.local_backend.available()
+
+    async def _post_chat_completion(self, data, on_text=None):
+        """Send one chat completion request to OpenAI and return the parsed response body"""
+        return await self.openai_backend.complete(data, on_text)
+
+    async def _local_completion(self, data):
+        """Generate a completion with the local model; tool calling is not supported there"""
+        data = {key: value for key, value in data.items() if key not in ("tools", "tool_choice")}
+        return await self.local_backend.complete(data)
+
+    async def _complete(self, data, priority=PRIORITY_NORMAL, text_stream=None):
+        """Run one completion on the configured backend, overflowing to the local model in auto mode"""
+        if self.llm_backend == "local" or (self.llm_backend == "auto" and not self.openai_api_key):
+            return await self._local_completion(data)
         try:
-            url = "https://api.openai.com/v1/chat/completions"
-            
-            headers = {
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {self.openai_api_key}"
-            }
-            
-            messages = [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_input}
-            ]
-            
-            # Add context about tasks and schedule if relevant
-            if any(keyword in user_input.lower() for keyword in ["task", "schedule", "meeting", "plan", "calendar"]):
-                context = self._get_task_context()
-                if context:
-                    messages.insert(1, {"role": "system", "content": context})
-            
-            data = {
-                "model": self.openai_model,
-                "messages": messages,
-                "max_tokens": 800,
-                "temperature": 0.7
-            }
-            
-            logger.info(f"Sending request to OpenAI API with model: {self.openai_model}")
-            
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(url, json=data, headers=headers)
-                logger.info(f"OpenAI API response received in {response.elapsed.total_seconds()}s with status code: {response.status_code}")
-                
-                if response.status_code == 200:
-                    response_data = response.json()
-                    self.last_model_used = self.openai_model
-                    return {"success": True, "response": response_data["choices"][0]["message"]["content"]}
-                    
-                elif response.status_code == 429:  # Rate limit or quota exceeded
-                    logger.error("OpenAI API quota exceeded or rate limited")
-                    return await self._handle_fallback(user_input)
-                else:
-                    error_message = f"OpenAI API error: {response.status_code}, {response.text}"
-                    logger.error(error_message)
-                    return await self._handle_fallback(user_input)
-                    
+            return await self._resilient_post(data, priority, text_stream)
         except Exception as e:
-            logger.error(f"Error calling OpenAI API: {e}")
-            return await self._handle_fallback(user_input)
+            # Overflow covers an open circuit, a full rate-limit queue and upstream errors left after retries
+            overflow = isinstance(e, (CircuitOpenError, RateLimitTimeout)) or self.resilience.is_retryable(e)
+            if self.llm_backend != "auto" or not overflow or not self.local_backend.available():
+                raise
+            self.local_overflow += 1
+            logger.info(f"OpenAI unavailable ({e}), serving from local model")
+            response_data = await self._local_completion(data)
+            response_data["overflow"] = True
+            return response_data
+
+    def _estimate_request_tokens(self, data):
+        """Estimate the tokens a request will consume: prompt plus the completion allowance"""
+        counter = self.prompt_assembler.counter
+        prompt_tokens = sum(counter.count(message.get("content") or "") + 4 for message in data["messages"])
+        if "tools" in data:
+            prompt_tokens += counter.count(json.dumps(data["tools"]))
+        return prompt_tokens + data.get("max_tokens", 0)
+
+    async def _rate_limited_post(self, data, priority, text_stream=None):
+        """Wait for rate-limit capacity, then post the request"""
+        await self.rate_limiter.acquire(self._estimate_request_tokens(data), priority)
+        attempt = object()
+        try:
+            if text_stream is None:
+                return await self._post_chat_completion(data)
+            return await self._post_chat_completion(data, on_text=lambda text: text_stream.update(attempt, text))
+        except OpenAIAPIError as e:
+            if e.status_code == 429:
+                # Upstream disagrees with our budget; hold everyone back for its Retry-After
+                self.rate_limiter.pause(e.retry_after or 1.0)
+            raise
+        finally:
+            if text_stream is not None:
+                text_stream.release(attempt)
+
+    async def _resilient_post(self, data, priority=PRIORITY_NORMAL, text_stream=None):
+        """Post a chat completion through the retry, circuit breaker and hedging layer"""
+        retries_before = self.resilience.retries
+        try:
+            return await self.resilience.call(lambda: self._rate_limited_post(data, priority, text_stream))
+        finally:
+            self.retry_count += self.resilience.retries - retries_before
 
-    def _get_task_context(self):
-        """Get comprehensive context about current tasks and schedule"""
-        user_id = "user_001"  # For demonstration, we'll use a default user
-        context = []
-        
-        # Get today's date for reference
-        today = datetime.now().strftime("%B %d, %Y")
-        context.append(f"📅 Today's Date: {today}")
-        
-        # Get today's tasks
-        today_tasks = self.task_service.get_today_tasks(user_id)
-        if today_tasks:
-            context.append(f"\n📋 TODAY'S TASKS ({len(today_tasks)} tasks):")
-            for task in today_tasks:
-                status_emoji = "✅" if task['status'] == "completed" else "🔄" if task['status'] == "in progress" else "⏳"
-                priority_emoji = "🔴" if task['priority'] == "high" else "🟡" if task['priority'] == "medium" else "🟢"
-                context.append(f"  {status_emoji} {priority_emoji} {task['title']}")
-                if task.get('description', '').strip():
-                    context.append(f"      Description: {task['description']}")
-                context.append(f"      Priority: {task['priority']} | Status: {task['status']}")
-        else:
-            context.append("\n📋 TODAY'S TASKS: No tasks scheduled for today")
-        
-        # Get high priority tasks
-        high_priority = self.task_service.get_highest_priority_task(user_id)
-        if high_priority:
-            context.append(f"\n🚨 HIGHEST PRIORITY TASK:")
-            context.append(f"   {high_priority['title']}")
-            context.append(f"   Due: {high_priority['due_date']} | Status: {high_priority['status']}")
-        
-        # Get upcoming tasks (next 7 days)
-        upcoming_tasks = self.task_service.get_upcoming_tasks(user_id, 7)
-        if upcoming_tasks:
-            context.append(f"\n📈 UPCOMING TASKS (Next 7 days - {len(upcoming_tasks)} tasks):")
-            for task in upcoming_tasks[:5]:  # Limit to 5 for brevity
-                priority_emoji = "🔴" if task['priority'] == "high" else "🟡" if task['priority'] == "medium" else "🟢"
-                context.append(f"  {priority_emoji} {task['title']} (Due: {task['due_date']})")
-            if len(upcoming_tasks) > 5:
-                context.append(f"  ... and {len(upcoming_tasks) - 5} more tasks")
-        else:
-            context.append("\n📈 UPCOMING TASKS: No upcoming tasks in the next 7 days")
-        
-        # Get daily recurring tasks
-        daily_tasks = self.task_service.get_daily_tasks(user_id)
-        if daily_tasks:
-            context.append(f"\n🔄 DAILY RECURRING TASKS ({len(daily_tasks)} tasks):")
-            for task in daily_tasks:
-                priority_emoji = "🔴" if task['priority'] == "high" else "🟡" if task['priority'] == "medium" else "🟢"
-                context.append(f"  {priority_emoji} {task['title']} (Priority: {task['priority']})")
-        
-        # Get task statistics
-        all_tasks = self.task_service.get_all_tasks(user_id)
-        if all_tasks:
-            completed_count = len([t for t in all_tasks if t.get('status') == 'completed'])
-            pending_count = len([t for t in all_tasks if t.get('status') == 'pending'])
-            in_progress_count = len([t for t in all_tasks if t.get('status') == 'in progress'])
+    async def _streamed_complete(self, key, data, priority, text_stream):
+        try:
+            return await self._complete(data, priority, text_stream)
+        finally:
+            self._text_streams.pop(key, None)
+
+    async def _coalesced_complete(self, key, data, priority, on_text=None):
+        """Share one upstream call between identical concurrent requests, streaming its text to all that want it"""
+        if on_text is None:
+            return await self.single_flight.do(key, lambda: self._complete(data, priority))
+
+        text_stream = self._text_streams.get(key)
+        if text_stream is None and self.single_flight.in_flight(key):
+            # The call in flight does not stream; waiting on it would hold back all of this caller's text
+            text_stream = _TextStream()
+            await text_stream.subscribe(on_text)
+            return await self._complete(data, priority, text_stream)
+
+        if text_stream is None:
+            text_stream = self._text_streams[key] = _TextStream()
+        await text_stream.subscribe(on_text)
+        try:
+            return await self.single_flight.do(key, lambda: self._streamed_complete(key, data, priority, text_stream))
+        finally:
+            text_stream.unsubscribe(on_text)
+
+    async def _call_openai_api(self, user_input, messages, priority=PRIORITY_NORMAL, tools=None, user_id="user_001",
+                               on_text=None, detached=None):
+        """Call the OpenAI API with the configured model, running any tool calls it makes.
+
+        With on_text the answer is streamed: on_text receives the text so far as it is generated.
+        Once the detached event is set the caller has been answered without this call, so tools
+        that would change tasks are no longer run.
+        """
+        try:
+            messages = list(messages)
+            tools_used = []
+            for round_number in range(self.max_tool_rounds + 1):
+                data = {
+                    "model": self.openai_model,
+                    "messages": messages,
+                    "max_tokens": 800,
+                    "temperature": 0.7
+                }
+                if tools:
+                    data["tools"] = tools
+                    # The last round has to answer in text
+                    data["tool_choice"] = "auto" if round_number < self.max_tool_rounds else "none"
+                
+                # Identical concurrent requests share a single upstream call
+                key = self.single_flight.key_for(data)
+                response_data = await self._coalesced_complete(key, data, priority, on_text)
+                message = response_data["choices"][0]["message"]
+                tool_calls = message.get("tool_calls")
+                if not tool_calls or round_number == self.max_tool_rounds:
+                    # A model that calls tools despite tool_choice "none" gets no further round
+                    break
+                
+                messages.append({"role": "assistant", "content": message.get("content"), "tool_calls": tool_calls})
+                for call in tool_calls:
+                    name = call["function"]["name"]
+                    tools_used.append(name)
+                    if detached is not None and detached.is_set() and name in MUTATING_TOOLS:
+                        # Nobody will see the reply, so the user would never learn their tasks changed
+                        logger.info(f"Skipping tool {name} on a call that outlived its latency budget")
+                        content = json.dumps({"error": "The user was already answered; tasks were not changed"})
+                    else:
+                        logger.info(f"Model called tool {name}")
+                        content = self.task_tools.execute(name, call["function"].get("arguments"), user_id)
+                    messages.append({"role": "tool", "tool_call_id": call["id"], "content": content})
             
-            context.append(f"\n📊 TASK SUMMARY:")
-            context.append(f"   Total Tasks: {len(all_tasks)}")
-            context.append(f"   Completed: {completed_count} | In Progress: {in_progress_count} | Pending: {pending_count}")
-        
-        return "\n".join(context) if context else "No task information available."
-
-    def _extract_date_from_query(self, user_input):
-        """Extract date from user query"""
-        # Look for date patterns like YYYY-MM-DD, MM-DD-YYYY, DD-MM-YYYY
-        date_patterns = [
-            r'(\d{4}-\d{2}-\d{2})',  # YYYY-MM-DD
-            r'(\d{2}-\d{2}-\d{4})',  # MM-DD-YYYY or DD-MM-YYYY
-            r'(\d{1,2}/\d{1,2}/\d{4})',  # M/D/YYYY or D/M/YYYY
-        ]
-        
-        for pattern in date_patterns:
-            match = re.search(pattern, user_input)
-            if match:
-                date_str = match.group(1)
-                try:
-                    # Try to parse different date formats
-                    if '-' in date_str and len(date_str.split('-')[0]) == 4:
-                        # YYYY-MM-DD format
-                        return date_str
-                    elif '-' in date_str:
-                        # MM-DD-YYYY or DD-MM-YYYY format
-                        parts = date_str.split('-')
-                        if len(parts) == 3:
-                            # Assume MM-DD-YYYY for now
-                            return f"{parts[2]}-{parts[0].zfill(2)}-{parts[1].zfill(2)}"
-                    elif '/' in date_str:
-                        # M/D/YYYY format
-                        parts = date_str.split('/')
-                        if len(parts) == 3:
-                            return f"{parts[2]}-{parts[0].zfill(2)}-{parts[1].zfill(2)}"
-                except:
-                    continue
-        
-        return None
-
-    def _get_date_specific_context(self, target_date, user_id="user_001"):
-        """Get context for a specific date"""
-        tasks = self.task_service.get_tasks_for_date(user_id, target_date)
-        
-        if not tasks:
-            return f"No tasks found for {target_date}."
-        
-        context = [f"Tasks for {target_date}:"]
-        for task in tasks:
-            context.append(f"- {task['title']}")
-            context.append(f"  Description: {task.get('description', 'No description')}")
-            context.append(f"  Priority: {task['priority']}")
-            context.append(f"  Status: {task['status']}")
+            self.last_model_used = response_data.get("model") or self.openai_model
+            result = {"success": True, "response": message.get("content") or ""}
+            if response_data.get("overflow"):
+                result["overflow"] = True
+            if tools_used:
+                result["tools_used"] = tools_used
+            return result
         
-        return "\n".join(context)
+        except CircuitOpenError:
+            logger.warning("OpenAI API marked unhealthy, serving local fallback")
+            return await self._handle_fallback(user_input, user_id=user_id)
+        except Exception as e:
+            logger.error(f"Error calling OpenAI API: {e}")
+            return await self._handle_fallback(user_input, user_id=user_id)
 
-    async def _handle_fallback(self, user_input):
+    def _get_task_context(self, user_id="user_001"):
+        """Get comprehensive context about current tasks and schedule"""
+        return self.task_context_builder.build(user_id)
+
+    def _normalize_input(self, user_input):
+        """Normalize user input so trivially different phrasings share a cache entry"""
+        normalized = re.sub(r"\s+", " ", user_input.strip().lower())
+        return normalized.rstrip("?!. ")
+
+    def _cache_scope(self, messages, user_id):
+        """Build the part of the cache key shared by one user's queries under one prompt and store version"""
+        # Tool calls and task context read this user's tasks, so answers are never shared across users
+        prompt = "\n".join(f"{m['role']}:{m['content']}" for m in messages)
+        prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:16]
+        model = self.local_backend.model_name if self.llm_backend == "local" else self.openai_model
+        return "|".join([
+            model,
+            user_id,
+            prompt_hash,
+            self.task_service.get_store_version(),
+            datetime.now().date().isoformat()
+        ])
+
+    def _response_cache_key(self, user_input, cache_scope):
+        """Build the exact-match response cache key for a user input"""
+        return f"{cache_scope}|{self._normalize_input(user_input)}"
+
+    async def _handle_fallback(self, user_input, intent=None, user_id="user_001"):
         """Handle API failures with graceful fallback responses"""
         self.fallback_response = True
-        input_lower = user_input.lower()
-        
-        # Date and time queries
-        if any(word in input_lower for word in ["today", "date", "time", "when"]):
-            today = datetime.now()
-            formatted_date = today.strftime("%B %d, %Y")
-            formatted_time = today.strftime("%I:%M %p")
-            return {
-                "success": True, 
-                "response": f"📅 Today's date is {formatted_date}\n🕐 Current time is {formatted_time}"
-            }
-        
-        # Enhanced schedule and task-related queries with flexible date parsing
-        if any(word in input_lower for word in ["schedule", "tasks", "meetings", "todo", "to-do"]):
-            user_id = "user_001"
-            
-            # Handle flexible date queries
-            date_response = self._handle_flexible_date_query(input_lower, user_id)
-            if date_response:
-                return date_response
-            
-            if "today" in input_lower:
-                tasks = self.task_service.get_today_tasks(user_id)
-                if tasks:
-                    response = ["📋 Here's your schedule for today:"]
-                    for task in tasks:
-                        priority_emoji = "🔴" if task['priority'] == "high" else "🟡" if task['priority'] == "medium" else "🟢"
-                        status_emoji = "✅" if task['status'] == "completed" else "🔄" if task['status'] == "in progress" else "⏳"
-                        response.append(f"{status_emoji} {priority_emoji} {task['title']} (Priority: {task['priority']})")
-                    return {"success": True, "response": "\n".join(response)}
-                else:
-                    return {"success": True, "response": "📋 You don't have any tasks scheduled for today. Would you like me to help you create some?"}
-            
-            elif "upcoming" in input_lower:
-                tasks = self.task_service.get_upcoming_tasks(user_id)
-                if tasks:
-                    response = ["📈 Here are your upcoming tasks:"]
-                    for task in tasks[:5]:  # Limit to 5 tasks
-                        priority_emoji = "🔴" if task['priority'] == "high" else "🟡" if task['priority'] == "medium" else "🟢"
-                        response.append(f"{priority_emoji} {task['title']} (Due: {task['due_date']})")
-                    if len(tasks) > 5:
-                        response.append(f"... and {len(tasks) - 5} more tasks")
-                    return {"success": True, "response": "\n".join(response)}
-                else:
-                    return {"success": True, "response": "📈 You don't have any upcoming tasks in the next 7 days."}
-            
-            else:
-                # General task query
-                context = self._get_task_context()
-                return {"success": True, "response": context}
-        
-        # Greeting responses
-        if any(greeting in input_lower for greeting in ["hi", "hello", "hey", "greetings", "good morning", "good afternoon", "good evening"]):
-            greetings = [
-                "Hello! I'm DONNA, your AI productivity assistant. 🤖",
-                "Hi there! I'm DONNA, ready to help you manage your tasks and schedule. 📋",
-                "Hey! I'm DONNA, your personal AI assistant for task management. ✨",
-                "Greetings! I'm DONNA, here to help you stay organized and productive. 🚀"
-            ]
-            import random
-            greeting = random.choice(greetings)
-            return {"success": True, "response": f"{greeting}\n\nHow can I help you today?"}
-        
-        # Status and well-being queries
-        if any(phrase in input_lower for phrase in ["how are you", "how do you feel", "what's up"]):
-            responses = [
-                "I'm functioning perfectly and ready to help you be more productive! 💪",
-                "I'm doing great! My circuits are optimized and I'm excited to help you organize your day! ⚡",
-                "I'm operating at full capacity and looking forward to helping you tackle your tasks! 🎯",
-                "I'm excellent, thank you for asking! How can I help make your day more organized? 📊"
-            ]
-            import random
-            return {"success": True, "response": random.choice(responses)}
-        
-        # Help and capability queries
-        if any(word in input_lower for word in ["help", "assist", "support", "what can you do", "capabilities"]):
-            help_text = """🤖 I'm DONNA, your AI assistant! Here's how I can help:
+        result = self.respond_locally(user_input, intent, user_id)
+        result["fallback"] = True
+        return result
+
+    def respond_locally(self, user_input, intent=None, user_id="user_001"):
+        """Answer a message with the local handler for its intent, without calling the API"""
+        if intent is None:
+            intent = self.intent_router.classify(user_input)
+        handler = self._intent_handlers.get(intent.name, self._default_response)
+        return handler(intent, user_id)
+
+    def _current_date_response(self, intent, user_id):
+        today = datetime.now()
+        formatted_date = today.strftime("%B %d, %Y")
+        formatted_time = today.strftime("%I:%M %p")
+        return {
+            "success": True, 
+            "response": f"📅 Today's date is {formatted_date}\n🕐 Current time is {formatted_time}"
+        }
+
+    def _task_context_response(self, intent, user_id):
+        return {"success": True, "response": self.task_context_builder.build(user_id)}
+
+    def _greeting_response(self, intent, user_id):
+        greetings = [
+            "Hello! I'm DONNA, your AI productivity assistant. 🤖",
+            "Hi there! I'm DONNA, ready to help you manage your tasks and schedule. 📋",
+            "Hey! I'm DONNA, your personal AI assistant for task management. ✨",
+            "Greetings! I'm DONNA, here to help you stay organized and productive. 🚀"
+        ]
+        greeting = random.choice(greetings)
+        return {"success": True, "response": f"{greeting}\n\nHow can I help you today?"}
+
+    def _smalltalk_response(self, intent, user_id):
+        responses = [
+            "I'm functioning perfectly and ready to help you be more productive! 💪",
+            "I'm doing great! My circuits are optimized and I'm excited to help you organize your day! ⚡",
+            "I'm operating at full capacity and looking forward to helping you tackle your tasks! 🎯",
+            "I'm excellent, thank you for asking! How can I help make your day more organized? 📊"
+        ]
+        return {"success": True, "response": random.choice(responses)}
+
+    def _help_response(self, intent, user_id):
+        help_text = """🤖 I'm DONNA, your AI assistant! Here's how I can help:
 
 📋 **Task Management:**
 • Create, update, and delete tasks
@@ -301,15 +445,37 @@ class AIService:
 • "What's my highest priority task?"
 
 How would you like to get started?"""
-            return {"success": True, "response": help_text}
-        
-        # Task creation hints
-        if any(word in input_lower for word in ["create", "add", "new"]):
+        return {"success": True, "response": help_text}
+
+    def _create_task_hint_response(self, intent, user_id):
+        return {
+            "success": True, 
+            "response": "🆕 I can help you create a new task! Please tell me:\n• Task title\n• Due date (optional)\n• Priority level (high/medium/low)\n• Any description or notes\n\nFor example: 'Create a high priority task: Review presentation by Friday'"
+        }
+
+    def _highest_priority_response(self, intent, user_id):
+        task = self.task_service.get_highest_priority_task(user_id)
+        if task:
+            priority_emoji = "🔴" if task['priority'] == "high" else "🟡" if task['priority'] == "medium" else "🟢"
             return {
-                "success": True, 
-                "response": "🆕 I can help you create a new task! Please tell me:\n• Task title\n• Due date (optional)\n• Priority level (high/medium/low)\n• Any description or notes\n\nFor example: 'Create a high priority task: Review presentation by Friday'"
+                "success": True,
+                "response": f"🚨 Your highest priority task is:\n{priority_emoji} {task['title']} (Priority: {task['priority']}, Due: {task['due_date']}, Status: {task['status']})"
             }
-        
+        return {"success": True, "response": "🎉 You don't have any pending tasks at the moment."}
+
+    def _upcoming_tasks_response(self, intent, user_id):
+        tasks = self.task_service.get_upcoming_tasks(user_id)
+        if tasks:
+            response = ["📈 Here are your upcoming tasks:"]
+            for task in tasks[:5]:  # Limit to 5 tasks
+                priority_emoji = "🔴" if task['priority'] == "high" else "🟡" if task['priority'] == "medium" else "🟢"
+                response.append(f"{priority_emoji} {task['title']} (Due: {task['due_date']})")
+            if len(tasks) > 5:
+                response.append(f"... and {len(tasks) - 5} more tasks")
+            return {"success": True, "response": "\n".join(response)}
+        return {"success": True, "response": "📈 You don't have any upcoming tasks in the next 7 days."}
+
+    def _default_response(self, intent, user_id):
         # Default response with helpful suggestions
         return {
             "success": True,
@@ -329,171 +495,146 @@ Try asking me:
 What would you like to work on?"""
         }
 
-    async def generate_response(self, user_input):
-        """Generate a response using OpenAI API or fallback"""
-        if not self.openai_api_key:
-            logger.warning("OpenAI API key not configured")
-            return await self._handle_fallback(user_input)
-            
-        input_lower = user_input.lower()
-        
-        # Check for flexible date queries first (priority handling)
-        user_id = "user_001"  # Default user for now
-        date_response = self._handle_flexible_date_query(input_lower, user_id)
-        if date_response:
-            return date_response
-        
-        # Check for specific date queries
-        extracted_date = self._extract_date_from_query(user_input)
-        if extracted_date:
-            # User asked for a specific date
-            context = self._get_date_specific_context(extracted_date)
-            return {"success": True, "response": context}
-        
-        # Direct handling of schedule and task queries with better organization
-        if "schedule" in input_lower or "show me my tasks" in input_lower:
-            if "today" in input_lower:
-                return self._get_today_schedule_response()
-            elif "week" in input_lower or "organize" in input_lower:
-                return self._get_weekly_schedule_response()
-            else:
-                context = self._get_task_context()
-                return {"success": True, "response": context}
-            
-        if "today" in input_lower and ("schedule" in input_lower or "tasks" in input_lower):
-            return self._get_today_schedule_response()
-            
-        if "today" in input_lower and "date" in input_lower:
-            today = datetime.now().strftime("%B %d, %Y")
-            return {"success": True, "response": f"Today's date is {today}."}
+    async def generate_response(self, user_input, priority=PRIORITY_NORMAL, latency_budget_ms=None, user_id="user_001"):
+        """Generate a response using OpenAI API or fallback, within an optional latency budget"""
+        intent = self.intent_router.classify(user_input)
+        logger.info(f"Classified message as {intent}")
+        
+        # Schedule, date and task listing queries are answered straight from tasks.json
+        if intent.local:
+            return self.respond_locally(user_input, intent, user_id)
+        
+        return await self.generate_llm_response(user_input, intent, priority, latency_budget_ms, user_id)
+
+    async def generate_llm_response(self, user_input, intent, priority=PRIORITY_NORMAL, latency_budget_ms=None,
+                                    user_id="user_001", on_text=None):
+        """Answer a classified, non-local message from the caches or with one LLM call.
+
+        on_text, if given, is awaited with the answer so far while an OpenAI call streams; cached and
+        fallback answers only arrive in the returned result.
+        """
+        if not self._llm_available():
+            logger.warning("OpenAI API key not configured and no local model available")
+            return await self._handle_fallback(user_input, intent, user_id)
             
-        # Build comprehensive system prompt with current context
-        base_prompt = """You are DONNA, an advanced AI voice and chat assistant designed to help users manage their tasks, schedules, and daily productivity.
-
-## CORE IDENTITY & PERSONALITY
-- Name: DONNA (Digital Organized Neural Network Assistant)
-- Personality: Professional, helpful, friendly, and proactive
-- Communication Style: Clear, concise, and personable
-- Tone: Supportive and encouraging while maintaining professionalism
-
-## PRIMARY CAPABILITIES
-
-### 📋 TASK MANAGEMENT
-- Create, update, and delete tasks
-- Set task priorities (high, medium, low)
-- Manage task statuses (pending, in progress, completed)
-- Handle different task frequencies (one-time, daily, weekly, monthly)
-- Organize tasks by due dates and deadlines
-- Provide task summaries and progress tracking
-
-### 📅 SCHEDULE MANAGEMENT  
-- Display today's tasks and schedule
-- Show upcoming tasks (next 7 days by default)
-- Filter tasks by specific dates
-- Identify highest priority tasks
-- Manage recurring tasks (daily, weekly, monthly)
-- Provide date-specific task context
-
-### 🗣️ VOICE & CHAT INTERACTION
-- Process both text and voice commands
-- Provide natural language responses
-- Support continuous voice mode for hands-free operation
-- Convert responses to speech using female voice synthesis
-- Handle speech-to-text input processing
-
-### 📊 PRODUCTIVITY INSIGHTS
-- Analyze task patterns and workload
-- Suggest task prioritization strategies
-- Provide productivity reminders and motivational support
-- Help with time management and planning
-
-## RESPONSE GUIDELINES
-
-### Task Information Format:
-- Always include task title, priority, due date, and status
-- Use clear formatting: "• Task Title (Priority: high, Due: YYYY-MM-DD, Status: pending)"
-- Group similar tasks together (e.g., all high-priority tasks)
-
-### Date & Time Handling:
-- Use full date format: "May 29, 2025" for user-friendly display
-- Support various date input formats (YYYY-MM-DD, MM-DD-YYYY, natural language)
-- Provide context-aware date responses
-
-### Conversation Flow:
-- Ask clarifying questions when task details are incomplete
-- Offer proactive suggestions for task organization
-- Maintain conversation context across multiple interactions
-- Handle both specific commands and casual conversation
-
-### Error Handling:
-- Gracefully handle missing information
-- Provide helpful suggestions when tasks aren't found
-- Offer alternatives when requested actions cannot be completed
-
-## BEHAVIORAL INSTRUCTIONS
-- Always acknowledge user requests positively
-- Provide actionable next steps or suggestions
-- Use encouraging language to motivate productivity
-- Be concise but thorough in explanations
-- Prioritize user privacy and data security
-- Adapt communication style to user preferences
-
-When discussing tasks, always specify their priority and due date. Be helpful, friendly, and concise while maintaining a professional demeanor."""
-        
-        # Add dynamic context based on query type
-        context_additions = []
-        
-        if any(word in input_lower for word in ["task", "schedule", "meeting", "todo", "to-do", "plan", "upcoming"]):
-            task_context = self._get_task_context()
-            if task_context:
-                context_additions.append(f"\n## CURRENT TASK CONTEXT\n{task_context}")
-                
-        if any(word in input_lower for word in ["help", "what can you do", "capabilities", "features"]):
-            context_additions.append(f"""
-## AVAILABLE COMMANDS REFERENCE
-- "Show me my tasks" - Display all current tasks
-- "What's my schedule today?" - Show today's tasks
-- "Create a new task: [title]" - Add a new task
-- "Mark [task] as completed" - Update task status
-- "What's my highest priority task?" - Show most important task
-- "Show me upcoming tasks" - Display tasks for next 7 days
-- "What's today's date?" - Get current date
-- "Show tasks for [date]" - Display tasks for specific date""")
-        
-        if any(word in input_lower for word in ["priority", "important", "urgent", "high"]):
-            context_additions.append(f"""
-## PRIORITY SYSTEM
-- HIGH: Urgent tasks requiring immediate attention
-- MEDIUM: Important tasks with moderate deadlines  
-- LOW: Tasks that can be completed when time allows""")
-
-        # Combine base prompt with dynamic context
-        system_prompt = base_prompt + "".join(context_additions)
+        # Static instructions first, dynamic task context last and within the token budget
+        static_sections = []
+        if "help" in intent.features:
+            static_sections.append("commands")
+        if "priority" in intent.features:
+            static_sections.append("priority")
+        
+        context_sections = []
+        use_tools = self.tool_calling and self.llm_backend != "local"
+        if use_tools:
+            # Only the date goes in the prompt; the model fetches tasks through tools as needed
+            static_sections.append("tools")
+            context_sections = [
+                section for section in self.task_context_builder.build_sections(user_id) if section[0] == "date"
+            ]
+        elif intent.features & {"tasks", "plan", "schedule", "upcoming"}:
+            context_sections = self.task_context_builder.build_sections(user_id)
+        
+        history = self.conversation_memory.history_messages(user_id)
+        prompt = self.prompt_assembler.assemble(user_input, static_sections, context_sections, history)
+        messages = prompt["messages"]
+        tokens = prompt["tokens"]
         
         # Log prompt type for debugging
         prompt_type = "basic"
-        if context_additions:
-            if any("TASK CONTEXT" in addition for addition in context_additions):
-                prompt_type = "task-enhanced"
-            if any("COMMANDS REFERENCE" in addition for addition in context_additions):
-                prompt_type = "help-enhanced"
-            if any("PRIORITY SYSTEM" in addition for addition in context_additions):
-                prompt_type = "priority-enhanced"
+        if use_tools:
+            prompt_type = "tool-calling"
+        elif context_sections:
+            prompt_type = "task-enhanced"
+        if "commands" in static_sections:
+            prompt_type = "help-enhanced"
+        if "priority" in static_sections:
+            prompt_type = "priority-enhanced"
         
         logger.info(f"Using {prompt_type} system prompt for user query: '{user_input[:50]}{'...' if len(user_input) > 50 else ''}'")
-        
+        logger.info(
+            f"Prompt tokens: static={tokens['static']} context={tokens['context']} history={tokens['history']} "
+            f"user={tokens['user']} "
+            f"total={tokens['total']}/{tokens['budget']}"
+            + (f" (trimmed: {', '.join(prompt['trimmed_sections'])})" if prompt["trimmed_sections"] else "")
+        )
+        
+        # The system prompt always scopes the cache; the history only does for follow-ups, so a
+        # standalone question asked again later in the conversation is still answered from cache
+        prompt_messages = messages[:len(messages) - len(history) - 1]
+        if "followup" in intent.features:
+            prompt_messages = messages[:-1]
+        cache_scope = self._cache_scope(prompt_messages, user_id)
+        cache_key = self._response_cache_key(user_input, cache_scope)
+        cached = self.response_cache.get(cache_key)
+        if cached is not None:
+            logger.info("Serving response from cache")
+            return {"success": True, "response": cached, "cached": True}
+        
+        if self.semantic_cache:
+            cached = self.semantic_cache.get(user_input, cache_scope)
+            if cached is not None:
+                logger.info("Serving response from semantic cache")
+                return {"success": True, "response": cached, "cached": True}
+        
+        tools = TASK_TOOLS if use_tools else None
+        detached = asyncio.Event() if latency_budget_ms else None
+        llm_call = self._complete_and_cache(user_input, messages, priority, cache_key, cache_scope, tools, user_id,
+                                            on_text, detached)
+        if not latency_budget_ms:
+            return await llm_call
+        
+        # Race the LLM against the caller's deadline; a late answer still fills the cache
+        task = asyncio.ensure_future(llm_call)
+        done, _ = await asyncio.wait({task}, timeout=latency_budget_ms / 1000)
+        if done:
+            self.deadline_stats["met"] += 1
+            return task.result()
+        
+        self.deadline_stats["missed"] += 1
+        detached.set()
+        self._background_calls.add(task)
+        task.add_done_callback(self._background_calls.discard)
+        logger.info(f"LLM missed the {latency_budget_ms}ms budget, answering locally while it finishes in the background")
+        result = self.respond_locally(user_input, intent, user_id)
+        result["fallback"] = True
+        result["deadline_exceeded"] = True
+        return result
+
+    def backend_stats(self):
+        """Return which LLM backends are configured and how often the local one absorbed overflow"""
+        return {
+            "mode": self.llm_backend,
+            "openai": self.openai_backend.stats(),
+            "local": self.local_backend.stats() if self.local_backend else None,
+            "local_overflow": self.local_overflow
+        }
+
+    def latency_budget_stats(self):
+        """Return how often the LLM met the caller's latency budget"""
+        return {**self.deadline_stats, "background_in_flight": len(self._background_calls)}
+
+    async def _complete_and_cache(self, user_input, messages, priority, cache_key, cache_scope,
+                                  tools=None, user_id="user_001", on_text=None, detached=None):
+        """Call the LLM and store a successful answer in the response caches"""
         try:
-            result = await self._call_openai_api(user_input, system_prompt)
+            result = await self._call_openai_api(user_input, messages, priority, tools, user_id, on_text, detached)
             if not result["success"]:
-                return await self._handle_fallback(user_input)
+                return await self._handle_fallback(user_input, user_id=user_id)
+            # Answers that changed tasks must run again next time, not replay from cache,
+            # and overflow answers from the smaller local model should not outlive the overflow
+            if not result.get("fallback") and not result.get("overflow") \
+                    and not MUTATING_TOOLS & set(result.get("tools_used", ())):
+                self.response_cache.set(cache_key, result["response"])
+                if self.semantic_cache:
+                    self.semantic_cache.set(user_input, cache_scope, result["response"])
             return result
         except Exception as e:
             logger.error(f"Error generating response: {str(e)}")
-            return await self._handle_fallback(user_input)
+            return await self._handle_fallback(user_input, user_id=user_id)
 
-    def _get_today_schedule_response(self):
+    def _get_today_schedule_response(self, user_id="user_001"):
         """Get properly formatted response for today's schedule"""
-        user_id = "user_001"
         today_date = datetime.now().date().isoformat()  # 2025-05-29
         
         # Get tasks specifically for today
@@ -544,9 +685,8 @@ When discussing tasks, always specify their priority and due date. Be helpful, f
         
         return {"success": True, "response": "\n".join(response_parts)}
 
-    def _get_weekly_schedule_response(self):
+    def _get_weekly_schedule_response(self, user_id="user_001"):
         """Get organized weekly schedule response"""
-        user_id = "user_001"
         from datetime import timedelta
         
         today = datetime.now().date()
@@ -608,140 +748,70 @@ When discussing tasks, always specify their priority and due date. Be helpful, f
         
         return {"success": True, "response": "\n".join(response_parts)}
 
-    def _handle_flexible_date_query(self, input_lower: str, user_id: str):
-        """Handle flexible date queries like 'next day', 'next 2 days', 'tomorrow', etc."""
-        import re
-        
-        # Patterns for flexible date queries
-        date_patterns = [
-            # Today patterns
-            (r'today', 'today'),
-            # Tomorrow patterns
-            (r'tomorrow|next day', 'tomorrow'),
-            # Next X days patterns
-            (r'next (\d+) days?', 'next {} days'),
-            (r'next (\d+)-day', 'next {} days'),
-            # This week / next week
-            (r'this week', 'this week'),
-            (r'next week', 'next week'),
-            # Specific date patterns (DD/MM/YYYY, MM/DD/YYYY, YYYY-MM-DD)
-            (r'(\d{1,2})/(\d{1,2})/(\d{4})', '{}/{}/{}'),
-            (r'(\d{4})-(\d{1,2})-(\d{1,2})', '{}-{}-{}'),
-        ]
-        
-        for pattern, date_format in date_patterns:
-            match = re.search(pattern, input_lower)
-            if match:
-                try:
-                    if 'today' in pattern:
-                        # Handle today - use the proper today schedule response
-                        return self._get_today_schedule_response()
-                    
-                    elif 'next' in pattern and 'days' in pattern:
-                        # Handle "next X days"
-                        days = int(match.group(1))
-                        date_input = f"next {days} days"
-                        tasks = self.task_service.get_tasks_for_date_range(user_id, date_input)
-                        
-                        if tasks:
-                            response = [f"📅 Your schedule for the next {days} days:"]
-                            # Group tasks by date
-                            tasks_by_date = {}
-                            for task in tasks:
-                                due_date = task.get('due_date', '')
-                                if due_date not in tasks_by_date:
-                                    tasks_by_date[due_date] = []
-                                tasks_by_date[due_date].append(task)
-                            
-                            # Sort dates and display
-                            for date_key in sorted(tasks_by_date.keys()):
-                                response.append(f"\n📆 {date_key}:")
-                                for task in tasks_by_date[date_key]:
-                                    priority_emoji = "🔴" if task['priority'] == "high" else "🟡" if task['priority'] == "medium" else "🟢"
-                                    status_emoji = "✅" if task['status'] == "completed" else "🔄" if task['status'] == "in progress" else "⏳"
-                                    response.append(f"  {status_emoji} {priority_emoji} {task['title']}")
-                                    if task.get('description'):
-                                        response.append(f"    Description: {task['description']}")
-                            
-                            return {"success": True, "response": "\n".join(response)}
-                        else:
-                            return {"success": True, "response": f"📅 No tasks found for the next {days} days."}
-                    
-                    elif 'tomorrow' in pattern or 'next day' in pattern:
-                        # Handle tomorrow/next day
-                        tasks = self.task_service.get_tasks_for_flexible_date(user_id, 'tomorrow')
-                        
-                        if tasks:
-                            response = ["📅 Your schedule for tomorrow:"]
-                            for task in tasks:
-                                priority_emoji = "🔴" if task['priority'] == "high" else "🟡" if task['priority'] == "medium" else "🟢"
-                                status_emoji = "✅" if task['status'] == "completed" else "🔄" if task['status'] == "in progress" else "⏳"
-                                response.append(f"{status_emoji} {priority_emoji} {task['title']}")
-                                if task.get('description'):
-                                    response.append(f"  Description: {task['description']}")
-                                response.append(f"  Priority: {task['priority']} | Status: {task['status']}")
-                            return {"success": True, "response": "\n".join(response)}
-                        else:
-                            return {"success": True, "response": "📅 No tasks found for tomorrow."}
-                    
-                    elif 'week' in pattern:
-                        # Handle this week / next week
-                        date_input = 'this week' if 'this week' in input_lower else 'next week'
-                        tasks = self.task_service.get_tasks_for_date_range(user_id, date_input)
-                        
-                        if tasks:
-                            week_name = "this week" if 'this week' in input_lower else "next week"
-                            response = [f"📅 Your schedule for {week_name}:"]
-                            
-                            # Group tasks by date
-                            tasks_by_date = {}
-                            for task in tasks:
-                                due_date = task.get('due_date', '')
-                                if due_date not in tasks_by_date:
-                                    tasks_by_date[due_date] = []
-                                tasks_by_date[due_date].append(task)
-                            
-                            # Sort dates and display
-                            for date_key in sorted(tasks_by_date.keys()):
-                                response.append(f"\n📆 {date_key}:")
-                                for task in tasks_by_date[date_key]:
-                                    priority_emoji = "🔴" if task['priority'] == "high" else "🟡" if task['priority'] == "medium" else "🟢"
-                                    status_emoji = "✅" if task['status'] == "completed" else "🔄" if task['status'] == "in progress" else "⏳"
-                                    response.append(f"  {status_emoji} {priority_emoji} {task['title']}")
-                            
-                            return {"success": True, "response": "\n".join(response)}
-                        else:
-                            week_name = "this week" if 'this week' in input_lower else "next week"
-                            return {"success": True, "response": f"📅 No tasks found for {week_name}."}
-                    
-                    elif len(match.groups()) >= 3:
-                        # Handle specific date formats
-                        if '/' in pattern:
-                            # DD/MM/YYYY or MM/DD/YYYY format
-                            part1, part2, year = match.groups()
-                            date_input = f"{part1}/{part2}/{year}"
-                        else:
-                            # YYYY-MM-DD format
-                            year, month, day = match.groups()
-                            date_input = f"{year}-{month}-{day}"
-                        
-                        tasks = self.task_service.get_tasks_for_flexible_date(user_id, date_input)
-                        
-                        if tasks:
-                            response = [f"📅 Tasks for {date_input}:"]
-                            for task in tasks:
-                                priority_emoji = "🔴" if task['priority'] == "high" else "🟡" if task['priority'] == "medium" else "🟢"
-                                status_emoji = "✅" if task['status'] == "completed" else "🔄" if task['status'] == "in progress" else "⏳"
-                                response.append(f"{status_emoji} {priority_emoji} {task['title']}")
-                                if task.get('description'):
-                                    response.append(f"  Description: {task['description']}")
-                                response.append(f"  Priority: {task['priority']} | Status: {task['status']}")
-                            return {"success": True, "response": "\n".join(response)}
-                        else:
-                            return {"success": True, "response": f"📅 No tasks found for {date_input}."}
-                
-                except Exception as e:
-                    logger.error(f"Error handling flexible date query: {e}")
-                    continue
+    def _format_tasks_by_date(self, heading, tasks, include_description=False):
+        """Render tasks grouped under their due dates"""
+        response = [heading]
+        tasks_by_date = {}
+        for task in tasks:
+            tasks_by_date.setdefault(task.get('due_date', ''), []).append(task)
         
-        return None
\ No newline at end of file
+        # Sort dates and display
+        for date_key in sorted(tasks_by_date.keys()):
+            response.append(f"\n📆 {date_key}:")
+            for task in tasks_by_date[date_key]:
+                priority_emoji = "🔴" if task['priority'] == "high" else "🟡" if task['priority'] == "medium" else "🟢"
+                status_emoji = "✅" if task['status'] == "completed" else "🔄" if task['status'] == "in progress" else "⏳"
+                response.append(f"  {status_emoji} {priority_emoji} {task['title']}")
+                if include_description and task.get('description'):
+                    response.append(f"    Description: {task['description']}")
+        return "\n".join(response)
+
+    def _format_task_list(self, heading, tasks):
+        """Render a flat task list with descriptions, priorities and statuses"""
+        response = [heading]
+        for task in tasks:
+            priority_emoji = "🔴" if task['priority'] == "high" else "🟡" if task['priority'] == "medium" else "🟢"
+            status_emoji = "✅" if task['status'] == "completed" else "🔄" if task['status'] == "in progress" else "⏳"
+            response.append(f"{status_emoji} {priority_emoji} {task['title']}")
+            if task.get('description'):
+                response.append(f"  Description: {task['description']}")
+            response.append(f"  Priority: {task['priority']} | Status: {task['status']}")
+        return "\n".join(response)
+
+    def _today_schedule_response(self, intent, user_id):
+        return self._get_today_schedule_response(user_id)
+
+    def _weekly_overview_response(self, intent, user_id):
+        return self._get_weekly_schedule_response(user_id)
+
+    def _next_days_schedule_response(self, intent, user_id):
+        """Handle "next X days" queries"""
+        days = intent.slots["days"]
+        tasks = self.task_service.get_tasks_for_date_range(user_id, f"next {days} days")
+        if tasks:
+            response = self._format_tasks_by_date(f"📅 Your schedule for the next {days} days:", tasks, include_description=True)
+            return {"success": True, "response": response}
+        return {"success": True, "response": f"📅 No tasks found for the next {days} days."}
+
+    def _tomorrow_schedule_response(self, intent, user_id):
+        """Handle "tomorrow" and "next day" queries"""
+        tasks = self.task_service.get_tasks_for_flexible_date(user_id, 'tomorrow')
+        if tasks:
+            return {"success": True, "response": self._format_task_list("📅 Your schedule for tomorrow:", tasks)}
+        return {"success": True, "response": "📅 No tasks found for tomorrow."}
+
+    def _week_schedule_response(self, intent, user_id):
+        """Handle "this week" and "next week" queries"""
+        week_name = intent.slots["week"]
+        tasks = self.task_service.get_tasks_for_date_range(user_id, week_name)
+        if tasks:
+            return {"success": True, "response": self._format_tasks_by_date(f"📅 Your schedule for {week_name}:", tasks)}
+        return {"success": True, "response": f"📅 No tasks found for {week_name}."}
+
+    def _date_schedule_response(self, intent, user_id):
+        """Handle queries for a specific date such as 2025-05-31, 31/05/2025 or May 31, 2025"""
+        date_input = intent.slots["date"]
+        tasks = self.task_service.get_tasks_for_flexible_date(user_id, date_input)
+        if tasks:
+            return {"success": True, "response": self._format_task_list(f"📅 Tasks for {date_input}:", tasks)}
+        return {"success": True, "response": f"📅 No tasks found for {date_input}."}
@@ -0,0 +1,98 @@
+import logging
+import time
+from typing import Dict, Tuple
+
+from app.services.rate_limiter import PRIORITY_NORMAL
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+STAGES = ("route", "local", "llm", "render")
+
+ERROR_RESPONSE = "I apologize, but I'm having trouble processing your request right now. Could you try again?"
+
+
+class ChatPipeline:
+    """Runs one chat turn through route -> local handlers -> LLM -> render, each stage at most once"""
+
+    def __init__(self, ai_service, transcript_store=None):
+        self.ai_service = ai_service
+        self.transcript_store = transcript_store
+        self.turns = 0
+        self.stage_counts = {stage: 0 for stage in STAGES}
+        self.stage_total_ms = {stage: 0.0 for stage in STAGES}
+
+    def _record(self, timings: Dict[str, float], stage: str, started: float):
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        timings[stage] = elapsed_ms
+        self.stage_counts[stage] += 1
+        self.stage_total_ms[stage] += elapsed_ms
+
+    def _render(self, result: Dict) -> Dict:
+        """Shape a stage result into the /chat response body"""
+        if not result or not result.get("success"):
+            logger.error(f"AI service error: {(result or {}).get('error', 'Unknown error')}")
+            return {"success": True, "response": ERROR_RESPONSE}
+        return result
+
+    async def run(self, message: str, priority: int = PRIORITY_NORMAL, latency_budget_ms: int = None,
+                  user_id: str = "user_001", on_text=None) -> Tuple[Dict, Dict[str, float]]:
+        """Process one message and return the response body with per-stage timings in milliseconds.
+
+        on_text is passed to the LLM stage so a caller can consume the answer while it streams.
+        """
+        self.turns += 1
+        timings = {}
+        result = None
+
+        started = time.perf_counter()
+        intent = self.ai_service.intent_router.classify(message)
+        self._record(timings, "route", started)
+        logger.info(f"Classified message as {intent}")
+
+        # Schedule, date and task listing queries never reach the LLM
+        stage = "local" if intent.local else "llm"
+        started = time.perf_counter()
+        try:
+            if intent.local:
+                result = self.ai_service.respond_locally(message, intent, user_id)
+            else:
+                result = await self.ai_service.generate_llm_response(
+                    message, intent, priority, latency_budget_ms, user_id, on_text
+                )
+        except Exception as e:
+            logger.error(f"Error in {stage} stage: {str(e)}")
+        finally:
+            self._record(timings, stage, started)
+
+        started = time.perf_counter()
+        result = self._render(result)
+        # What the user saw becomes context for their next message
+        self.ai_service.conversation_memory.add_turn(user_id, message, result["response"])
+        if self.transcript_store is not None:
+            try:
+                self.transcript_store.append(user_id, message, result["response"])
+            except OSError as e:
+                logger.error(f"Could not persist chat transcript: {e}")
+        self._record(timings, "render", started)
+        return result, timings
+
+    @staticmethod
+    def server_timing(timings: Dict[str, float]) -> str:
+        """Format stage timings as a Server-Timing header value"""
+        return ", ".join(f"{stage};dur={ms:.2f}" for stage, ms in timings.items())
+
+    def stats(self) -> Dict:
+        """Return turn and average per-stage timing counters"""
+        return {
+            "turns": self.turns,
+            "stages": {
+                stage: {
+                    "runs": self.stage_counts[stage],
+                    "avg_ms": round(self.stage_total_ms[stage] / self.stage_counts[stage], 2)
+                    if self.stage_counts[stage] else None
+                }
+                for stage in STAGES
+            }
+        }
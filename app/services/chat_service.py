@@ -1,18 +1,17 @@
 class ChatService:
     def __init__(self, ai_service):
         self.ai_service = ai_service
-        self.chat_sessions = {}
+        # Bounded per-user history shared with the AI service, which feeds it into prompts
+        self.memory = ai_service.conversation_memory
 
     def start_chat_session(self, user_id):
-        self.chat_sessions[user_id] = []
+        self.memory.clear(user_id)
 
-    def process_chat(self, user_id, user_input):
-        if user_id not in self.chat_sessions:
-            self.start_chat_session(user_id)
-
-        response = self.ai_service.get_response(user_input)
-        self.chat_sessions[user_id].append({'user': user_input, 'bot': response})
+    async def process_chat(self, user_id, user_input):
+        result = await self.ai_service.generate_response(user_input, user_id=user_id)
+        response = result["response"]
+        self.memory.add_turn(user_id, user_input, response)
         return response
 
     def get_chat_history(self, user_id):
-        return self.chat_sessions.get(user_id, [])
\ No newline at end of file
+        return self.memory.get_history(user_id)
@@ -0,0 +1,131 @@
+import logging
+import re
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional
+
+from app.services.prompt_builder import TokenCounter
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def _gist(text: str, max_words: int) -> str:
+    """First sentence of a message, cut to max_words"""
+    text = " ".join(text.split())
+    first = SENTENCE_END.split(text, 1)[0]
+    words = first.split()
+    if len(words) > max_words:
+        return " ".join(words[:max_words]) + "..."
+    return first
+
+
+class _Conversation:
+    __slots__ = ("turns", "turn_tokens", "summary", "summary_tokens", "summarized_turns")
+
+    def __init__(self, max_turns: int):
+        self.turns = deque(maxlen=max_turns)
+        self.turn_tokens = 0
+        self.summary = deque()
+        self.summary_tokens = 0
+        self.summarized_turns = 0
+
+
+class ConversationMemory:
+    """Per-user ring buffer of recent turns plus a rolling summary of older ones, with a cap on users"""
+
+    def __init__(self, max_turns: int = 8, summary_trigger_tokens: int = 800, summary_max_tokens: int = 200,
+                 max_users: int = 1000, gist_words: int = 20, counter: Optional[TokenCounter] = None):
+        self.max_turns = max_turns
+        self.summary_trigger_tokens = summary_trigger_tokens
+        self.summary_max_tokens = summary_max_tokens
+        self.max_users = max_users
+        self.gist_words = gist_words
+        self.counter = counter or TokenCounter("gpt-3.5-turbo")
+        self._conversations = OrderedDict()
+        self._lock = threading.Lock()
+        self.evicted_users = 0
+        self.summarized_turns = 0
+
+    def _conversation(self, user_id: str) -> _Conversation:
+        conversation = self._conversations.get(user_id)
+        if conversation is None:
+            conversation = _Conversation(self.max_turns)
+            self._conversations[user_id] = conversation
+            while len(self._conversations) > self.max_users:
+                self._conversations.popitem(last=False)
+                self.evicted_users += 1
+        self._conversations.move_to_end(user_id)
+        return conversation
+
+    def _fold_oldest(self, conversation: _Conversation):
+        """Move the oldest verbatim turn into the summary as one extractive line"""
+        user_text, assistant_text, tokens = conversation.turns.popleft()
+        conversation.turn_tokens -= tokens
+
+        line = f"- User: {_gist(user_text, self.gist_words)} | DONNA: {_gist(assistant_text, self.gist_words)}"
+        line_tokens = self.counter.count(line)
+        conversation.summary.append((line, line_tokens))
+        conversation.summary_tokens += line_tokens
+        conversation.summarized_turns += 1
+        self.summarized_turns += 1
+
+        # The summary is bounded too: the oldest points fall off first
+        while conversation.summary_tokens > self.summary_max_tokens and len(conversation.summary) > 1:
+            _, dropped = conversation.summary.popleft()
+            conversation.summary_tokens -= dropped
+
+    def add_turn(self, user_id: str, user_text: str, assistant_text: str):
+        """Record one exchange, summarizing older turns once the verbatim window is too large"""
+        tokens = self.counter.count(user_text) + self.counter.count(assistant_text)
+        with self._lock:
+            conversation = self._conversation(user_id)
+            if len(conversation.turns) == self.max_turns:
+                self._fold_oldest(conversation)
+            conversation.turns.append((user_text, assistant_text, tokens))
+            conversation.turn_tokens += tokens
+            while conversation.turn_tokens > self.summary_trigger_tokens and len(conversation.turns) > 1:
+                self._fold_oldest(conversation)
+
+    def history_messages(self, user_id: str) -> List[Dict]:
+        """Chat messages carrying the summary and recent turns, to go before the new user message"""
+        with self._lock:
+            conversation = self._conversations.get(user_id)
+            if conversation is None:
+                return []
+            self._conversations.move_to_end(user_id)
+            messages = []
+            if conversation.summary:
+                lines = "\n".join(line for line, _ in conversation.summary)
+                messages.append({"role": "system", "content": f"## EARLIER IN THIS CONVERSATION\n{lines}"})
+            for user_text, assistant_text, _ in conversation.turns:
+                messages.append({"role": "user", "content": user_text})
+                messages.append({"role": "assistant", "content": assistant_text})
+            return messages
+
+    def get_history(self, user_id: str) -> List[Dict]:
+        """Recent verbatim turns as {'user', 'bot'} pairs"""
+        with self._lock:
+            conversation = self._conversations.get(user_id)
+            if conversation is None:
+                return []
+            return [{"user": user_text, "bot": assistant_text} for user_text, assistant_text, _ in conversation.turns]
+
+    def clear(self, user_id: str):
+        with self._lock:
+            self._conversations.pop(user_id, None)
+
+    def stats(self) -> Dict:
+        """Return memory usage counters for monitoring"""
+        with self._lock:
+            return {
+                "users": len(self._conversations),
+                "max_users": self.max_users,
+                "max_turns": self.max_turns,
+                "evicted_users": self.evicted_users,
+                "summarized_turns": self.summarized_turns,
+                "tokens_held": sum(c.turn_tokens + c.summary_tokens for c in self._conversations.values())
+            }
@@ -0,0 +1,139 @@
+import logging
+import re
+from typing import Dict, FrozenSet
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MONTHS = (r"(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?"
+          r"|sep(?:tember)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)")
+
+# Every keyword feature of a message, in one alternation. Earlier alternatives win
+# when two start at the same position, so longer phrases are listed first.
+FEATURE_PATTERNS = [
+    ("next_days", r"\bnext\s+(?P<days>\d+)(?:\s+|-)days?\b"),
+    ("date_iso", r"\b\d{4}-\d{1,2}-\d{1,2}\b"),
+    ("date_numeric", r"\b\d{1,2}[/-]\d{1,2}[/-]\d{4}\b"),
+    ("date_month_first", rf"\b{MONTHS}\s+\d{{1,2}},?\s+\d{{4}}\b"),
+    ("date_day_first", rf"\b\d{{1,2}}(?:st|nd|rd|th)?\s+{MONTHS}\s+\d{{4}}\b"),
+    ("tomorrow", r"\btomorrow\b|\bnext day\b"),
+    ("named_week", r"\b(?:this|next)\s+week\b"),
+    ("show_tasks", r"\bshow me my tasks\b"),
+    ("smalltalk", r"\bhow are you\b|\bhow do you feel\b|\bwhat'?s up\b"),
+    ("help", r"\bwhat can you do\b|\bhelp\b|\bassist\b|\bsupport\b|\bcapabilities\b|\bfeatures\b"),
+    ("greeting", r"\b(?:hi|hello|hey|greetings|good (?:morning|afternoon|evening))\b"),
+    # Only an explicit question for the date or time; "how much time" or "the next date for" are not
+    ("date_question", r"\btoday'?s date\b|\bcurrent (?:date|time)\b|\bwhat(?:'s| is) the date\b"
+                      r"|\bwhat (?:date|day) is (?:it|today)\b|\bdate (?:is it )?today\b|\bwhat time is it\b"),
+    ("today", r"\btoday\b"),
+    ("schedule", r"\bschedules?\b"),
+    ("week", r"\bweek\b"),
+    ("organize", r"\borgani[sz]e\b"),
+    ("create", r"\bcreate\b|\badd\b|\bnew\b"),
+    ("priority", r"\bpriority\b|\bimportant\b|\burgent\b"),
+    ("upcoming", r"\bupcoming\b"),
+    ("tasks", r"\btasks?\b|\bto-?dos?\b|\bto do\b|\bmeetings?\b|\bplans\b|\bcalendar\b|\bagenda\b"
+              r"|\bappointments?\b"),
+    # "plan" is as often a verb ("plan a trip") as a task, so it only pulls task context into the prompt
+    ("plan", r"\bplan\b"),
+    # Words that only make sense against the previous turns, e.g. "tell me more" or "and the other one?"
+    ("followup", r"\b(?:it|that|this|those|these|them|they|he|she|him|her|again|more|else|also|another|other"
+                 r"|same|previous|last one|above|instead|why)\b|^\s*(?:and|but|so|what about|how about)\b"),
+]
+
+DATE_FEATURES = {"date_iso", "date_numeric", "date_month_first", "date_day_first"}
+TASK_FEATURES = {"tasks", "schedule", "show_tasks"}
+
+# (intent, answered locally, all of, any of, none of), checked in order.
+# Local intents are answered from tasks.json without calling the LLM; the rest go
+# to the LLM when it is available and to their local handler otherwise. A day or week
+# alone is not a schedule lookup ("plan a trip to paris for next week"); it needs a task word.
+INTENT_RULES = [
+    ("next_days_schedule", True, {"next_days"}, TASK_FEATURES, set()),
+    ("tomorrow_schedule", True, {"tomorrow"}, TASK_FEATURES, set()),
+    ("week_schedule", True, {"named_week"}, TASK_FEATURES, set()),
+    ("date_schedule", True, set(), DATE_FEATURES, set()),
+    ("current_date", True, {"date_question"}, set(), TASK_FEATURES),
+    ("today_schedule", True, {"today"}, TASK_FEATURES, set()),
+    ("weekly_overview", True, {"schedule"}, {"week", "organize"}, set()),
+    ("schedule_overview", True, set(), {"schedule", "show_tasks"}, set()),
+    ("smalltalk", False, {"smalltalk"}, set(), set()),
+    ("help", False, {"help"}, set(), set()),
+    ("create_task", False, {"create"}, set(), set()),
+    ("highest_priority", False, {"priority"}, TASK_FEATURES, set()),
+    ("upcoming_tasks", False, {"upcoming"}, set(), set()),
+    ("task_query", False, {"tasks"}, set(), set()),
+    ("greeting", False, {"greeting"}, set(), set()),
+]
+
+
+class Intent:
+    """A classified message: intent name, extracted slots and whether it is answered locally"""
+
+    __slots__ = ("name", "local", "slots", "features")
+
+    def __init__(self, name: str, local: bool, slots: Dict, features: FrozenSet[str]):
+        self.name = name
+        self.local = local
+        self.slots = slots
+        self.features = features
+
+    def __repr__(self):
+        return f"Intent({self.name!r}, local={self.local}, slots={self.slots})"
+
+
+class IntentRouter:
+    """Classifies a message into an intent and slots with a single regex pass"""
+
+    def __init__(self, max_cached_resolutions: int = 1024):
+        self._pattern = re.compile(
+            "|".join(f"(?P<{name}>{pattern})" for name, pattern in FEATURE_PATTERNS),
+            re.IGNORECASE
+        )
+        # Feature sets seen so far map straight to their intent, so resolving a
+        # message does not walk the rule list again
+        self._resolutions = {}
+        self._max_cached_resolutions = max_cached_resolutions
+
+    def _resolve(self, features: FrozenSet[str]):
+        resolved = self._resolutions.get(features)
+        if resolved is not None:
+            return resolved
+
+        resolved = ("general", False)
+        for name, local, all_of, any_of, none_of in INTENT_RULES:
+            if all_of <= features and (not any_of or any_of & features) and not none_of & features:
+                resolved = (name, local)
+                break
+
+        if len(self._resolutions) < self._max_cached_resolutions:
+            self._resolutions[features] = resolved
+        return resolved
+
+    def classify(self, message: str) -> Intent:
+        """Map a message to its intent and extracted slots"""
+        features = set()
+        slots = {}
+        for match in self._pattern.finditer(message):
+            feature = match.lastgroup
+            features.add(feature)
+
+            if feature == "next_days" and "days" not in slots:
+                slots["days"] = int(match.group("days"))
+            elif feature in DATE_FEATURES and "date" not in slots:
+                slots["date"] = match.group(feature).lower()
+            elif feature == "named_week" and "week" not in slots:
+                slots["week"] = "this week" if match.group(feature).lower().startswith("this") else "next week"
+
+        features = frozenset(features)
+        name, local = self._resolve(features)
+        return Intent(name, local, slots, features)
+
+    def stats(self) -> Dict:
+        """Return router counters for monitoring"""
+        return {
+            "features": len(FEATURE_PATTERNS),
+            "intents": len(INTENT_RULES) + 1,
+            "cached_resolutions": len(self._resolutions)
+        }
@@ -0,0 +1,82 @@
+import logging
+from collections import OrderedDict
+from typing import Dict, Optional
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class _UserLanguage:
+    __slots__ = ("language", "since_check")
+
+    def __init__(self, language: str):
+        self.language = language
+        self.since_check = 0
+
+
+class LanguageMemory:
+    """Each user's spoken language, learned from a confident detection, so Whisper can skip detecting it.
+
+    Every recheck_every-th request from a known user is left to detection again. A confident result
+    confirms or switches the language; an unconfident one forgets it, so a multilingual user goes back
+    to detection on every request until one language is clear again.
+    """
+
+    def __init__(self, min_probability: float = 0.8, recheck_every: int = 20, max_users: int = 10000):
+        self.min_probability = min_probability
+        self.recheck_every = recheck_every
+        self.max_users = max_users
+        self._users = OrderedDict()
+        self.hints = 0
+        self.rechecks = 0
+        self.switches = 0
+        self.forgotten = 0
+        self.evicted_users = 0
+
+    def hint(self, user_id: str) -> Optional[str]:
+        """The language to pass to Whisper for this user, or None when detection should run"""
+        known = self._users.get(user_id)
+        if known is None:
+            return None
+        self._users.move_to_end(user_id)
+        known.since_check += 1
+        if self.recheck_every and known.since_check >= self.recheck_every:
+            self.rechecks += 1
+            return None
+        self.hints += 1
+        return known.language
+
+    def observe(self, user_id: str, language: str, probability: float):
+        """Record the outcome of a detection run for this user"""
+        known = self._users.get(user_id)
+        if probability < self.min_probability:
+            if known is not None:
+                del self._users[user_id]
+                self.forgotten += 1
+                logger.info(f"Language detection for {user_id} was unsure ({probability:.2f}), detecting again next time")
+            return
+
+        if known is None:
+            self._users[user_id] = _UserLanguage(language)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+                self.evicted_users += 1
+            return
+        if known.language != language:
+            self.switches += 1
+            logger.info(f"User {user_id} switched language from {known.language} to {language}")
+            known.language = language
+        known.since_check = 0
+        self._users.move_to_end(user_id)
+
+    def stats(self) -> Dict:
+        """Return how often detection was skipped and how often it was run again"""
+        return {
+            "users": len(self._users),
+            "hints": self.hints,
+            "rechecks": self.rechecks,
+            "switches": self.switches,
+            "forgotten": self.forgotten,
+            "evicted_users": self.evicted_users
+        }
@@ -0,0 +1,355 @@
+import asyncio
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class OpenAIAPIError(Exception):
+    """Raised when the OpenAI API answers with a non-success status"""
+    def __init__(self, status_code, message, retry_after=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class LocalBackendUnavailable(Exception):
+    """Raised when the local model cannot be loaded, e.g. torch or transformers are not installed"""
+
+
+def _parse_retry_after(headers):
+    """Read the server's requested retry delay in seconds, if any"""
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        pass
+    return None
+
+
+def _completion(content: str, model: str, prompt_tokens: int = 0, completion_tokens: int = 0) -> Dict:
+    """Wrap generated text in the same shape as an OpenAI chat completion"""
+    return {
+        "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        }
+    }
+
+
+class OpenAIBackend:
+    """Chat completions from the OpenAI HTTP API"""
+
+    name = "openai"
+
+    def __init__(self, api_key: Optional[str], timeout: float = 30.0,
+                 base_url: str = "https://api.openai.com/v1"):
+        self.api_key = api_key
+        self.timeout = timeout
+        self.base_url = base_url.rstrip("/")
+
+    def available(self) -> bool:
+        return bool(self.api_key)
+
+    @staticmethod
+    def _raise_for_status(status_code: int, text: str, headers):
+        if status_code == 429:  # Rate limit or quota exceeded
+            raise OpenAIAPIError(status_code, "OpenAI API quota exceeded or rate limited",
+                                 retry_after=_parse_retry_after(headers))
+        raise OpenAIAPIError(status_code, f"OpenAI API error: {status_code}, {text}",
+                             retry_after=_parse_retry_after(headers))
+
+    async def complete(self, data: Dict, on_text: Optional[Callable[[str], Awaitable[None]]] = None) -> Dict:
+        """Send one chat completion request and return the parsed response body.
+
+        With on_text the answer is streamed and on_text is called with the text so far after every
+        delta; the return value is still a complete, non-streaming response body.
+        """
+        url = f"{self.base_url}/chat/completions"
+
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.api_key}"
+        }
+
+        logger.info(f"Sending request to OpenAI API with model: {data['model']}")
+
+        async with httpx.AsyncClient(timeout=self.timeout) as client:
+            if on_text is not None:
+                return await self._stream(client, url, data, headers, on_text)
+
+            response = await client.post(url, json=data, headers=headers)
+            logger.info(f"OpenAI API response received in {response.elapsed.total_seconds()}s with status code: {response.status_code}")
+
+            if response.status_code == 200:
+                return response.json()
+            self._raise_for_status(response.status_code, response.text, response.headers)
+
+    async def _stream(self, client: httpx.AsyncClient, url: str, data: Dict, headers: Dict,
+                      on_text: Callable[[str], Awaitable[None]]) -> Dict:
+        """Read a server-sent event stream, reporting content as it grows and reassembling tool calls"""
+        started = time.monotonic()
+        async with client.stream("POST", url, json={**data, "stream": True}, headers=headers) as response:
+            if response.status_code != 200:
+                body = await response.aread()
+                self._raise_for_status(response.status_code, body.decode("utf-8", "replace"), response.headers)
+
+            content = ""
+            tool_calls = {}
+            model = data["model"]
+            finish_reason = None
+            first_token = None
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                payload = line[5:].strip()
+                if payload == "[DONE]":
+                    break
+                chunk = json.loads(payload)
+                model = chunk.get("model") or model
+                for choice in chunk.get("choices", []):
+                    delta = choice.get("delta") or {}
+                    if delta.get("content"):
+                        if first_token is None:
+                            first_token = time.monotonic() - started
+                        content += delta["content"]
+                        await on_text(content)
+                    # Tool calls arrive in fragments keyed by index; names and arguments are concatenated
+                    for call in delta.get("tool_calls") or []:
+                        entry = tool_calls.setdefault(call.get("index", 0), {
+                            "id": None, "type": "function", "function": {"name": "", "arguments": ""}
+                        })
+                        entry["id"] = call.get("id") or entry["id"]
+                        function = call.get("function") or {}
+                        entry["function"]["name"] += function.get("name") or ""
+                        entry["function"]["arguments"] += function.get("arguments") or ""
+                    finish_reason = choice.get("finish_reason") or finish_reason
+
+        logger.info(f"OpenAI stream finished in {time.monotonic() - started:.2f}s"
+                    + (f", first token after {first_token:.2f}s" if first_token is not None else ""))
+        message = {"role": "assistant", "content": content or None}
+        if tool_calls:
+            message["tool_calls"] = [tool_calls[index] for index in sorted(tool_calls)]
+        return {"model": model, "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}]}
+
+    def stats(self) -> Dict:
+        return {"name": self.name, "available": self.available()}
+
+
+class _Pending:
+    __slots__ = ("messages", "max_new_tokens", "temperature", "future")
+
+    def __init__(self, messages: List[Dict], max_new_tokens: int, temperature: float, future: asyncio.Future):
+        self.messages = messages
+        self.max_new_tokens = max_new_tokens
+        self.temperature = temperature
+        self.future = future
+
+
+class LocalTransformersBackend:
+    """Small instruct model on CPU: int8 dynamic quantization, KV-cached decoding and micro-batched generation"""
+
+    name = "local"
+
+    def __init__(self, model_name: str = "Qwen/Qwen2.5-0.5B-Instruct", max_batch_size: int = 4,
+                 max_batch_wait_ms: float = 20.0, max_new_tokens: int = 256, max_input_tokens: int = 2048,
+                 quantize: bool = True, threads: Optional[int] = None):
+        self.model_name = model_name
+        self.max_batch_size = max_batch_size
+        self.max_batch_wait = max_batch_wait_ms / 1000
+        self.max_new_tokens = max_new_tokens
+        self.max_input_tokens = max_input_tokens
+        self.quantize = quantize
+        self.threads = threads
+
+        self._model = None
+        self._tokenizer = None
+        self._torch = None
+        self._load_error = None
+        self._load_lock = asyncio.Lock()
+        # One worker: generate() already uses every core, so batches run back to back
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="local-llm")
+        self._queue = []
+        self._batcher = None
+
+        self.requests = 0
+        self.batches = 0
+        self.generated_tokens = 0
+        self.generation_seconds = 0.0
+
+    def available(self) -> bool:
+        return self._load_error is None
+
+    def _load(self):
+        """Import and load the model; runs once, off the event loop"""
+        try:
+            import torch
+            from transformers import AutoModelForCausalLM, AutoTokenizer
+        except ImportError as e:
+            raise LocalBackendUnavailable(f"Local LLM backend needs torch and transformers: {e}")
+
+        if self.threads:
+            torch.set_num_threads(self.threads)
+        started = time.monotonic()
+        tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+        # Left padding keeps every prompt's last token aligned for batched decoding, and left
+        # truncation keeps the end of an over-long prompt: the user turn and the generation prompt
+        tokenizer.padding_side = "left"
+        tokenizer.truncation_side = "left"
+        if tokenizer.pad_token is None:
+            tokenizer.pad_token = tokenizer.eos_token
+        model = AutoModelForCausalLM.from_pretrained(self.model_name, torch_dtype=torch.float32)
+        model.eval()
+        if self.quantize:
+            # int8 weights for every Linear layer: roughly 4x smaller and faster matmuls on CPU
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+        self._torch = torch
+        self._tokenizer = tokenizer
+        self._model = model
+        logger.info(f"Loaded local LLM {self.model_name} in {time.monotonic() - started:.1f}s (quantized={self.quantize})")
+
+    async def _ensure_loaded(self):
+        if self._model is not None:
+            return
+        if self._load_error is not None:
+            raise LocalBackendUnavailable(self._load_error)
+        async with self._load_lock:
+            if self._model is None:
+                try:
+                    await asyncio.get_running_loop().run_in_executor(self._executor, self._load)
+                except Exception as e:
+                    self._load_error = str(e)
+                    logger.error(f"Local LLM backend unavailable: {e}")
+                    raise LocalBackendUnavailable(self._load_error)
+
+    def _prompt(self, messages: List[Dict]) -> str:
+        """Render a chat prompt that fits max_input_tokens, dropping the oldest turns first.
+
+        The prompt may have been assembled for a larger OpenAI context. The system message and the
+        latest turn are kept; anything still too long is cut from the left by the tokenizer.
+        """
+        messages = list(messages)
+        while True:
+            prompt = self._tokenizer.apply_chat_template(messages, tokenize=False, add_generation_prompt=True)
+            first_turn = 1 if messages and messages[0]["role"] == "system" else 0
+            if (len(messages) - first_turn <= 1
+                    or len(self._tokenizer(prompt, add_special_tokens=False)["input_ids"]) <= self.max_input_tokens):
+                return prompt
+            del messages[first_turn]
+
+    def _generate_batch(self, batch: List[_Pending]) -> List[Dict]:
+        """Run one padded batch through generate() with the KV cache enabled"""
+        torch = self._torch
+        prompts = [self._prompt(p.messages) for p in batch]
+        inputs = self._tokenizer(prompts, return_tensors="pt", padding=True, truncation=True,
+                                 max_length=self.max_input_tokens)
+        # Every request in a batch asked for the same temperature; see _take_batch
+        temperature = batch[0].temperature
+        max_new_tokens = max(p.max_new_tokens for p in batch)
+
+        started = time.monotonic()
+        with torch.inference_mode():
+            output = self._model.generate(
+                **inputs,
+                max_new_tokens=max_new_tokens,
+                do_sample=temperature > 0,
+                temperature=temperature if temperature > 0 else None,
+                use_cache=True,
+                pad_token_id=self._tokenizer.pad_token_id
+            )
+        self.generation_seconds += time.monotonic() - started
+
+        prompt_length = inputs["input_ids"].shape[1]
+        results = []
+        for i, p in enumerate(batch):
+            new_tokens = output[i, prompt_length:prompt_length + p.max_new_tokens]
+            text = self._tokenizer.decode(new_tokens, skip_special_tokens=True).strip()
+            used_prompt = int(inputs["attention_mask"][i].sum())
+            completion_tokens = int((new_tokens != self._tokenizer.pad_token_id).sum())
+            self.generated_tokens += completion_tokens
+            results.append(_completion(text, self.model_name, used_prompt, completion_tokens))
+        return results
+
+    def _take_batch(self) -> List[_Pending]:
+        """Remove the oldest request and up to max_batch_size - 1 others that sample the same way.
+
+        A batch shares one generate() call, so a greedy request must never ride along with a sampled
+        one. Differing max_new_tokens are fine: each output is cut to its own request's limit.
+        """
+        temperature = self._queue[0].temperature
+        batch, rest = [], []
+        for p in self._queue:
+            if len(batch) < self.max_batch_size and p.temperature == temperature:
+                batch.append(p)
+            else:
+                rest.append(p)
+        self._queue = rest
+        return batch
+
+    async def _run_batches(self):
+        """Collect concurrent requests for a few milliseconds and generate them together"""
+        loop = asyncio.get_running_loop()
+        while self._queue:
+            if len(self._queue) < self.max_batch_size:
+                await asyncio.sleep(self.max_batch_wait)
+            batch = [p for p in self._take_batch() if not p.future.done()]
+            if not batch:
+                continue
+
+            self.batches += 1
+            try:
+                results = await loop.run_in_executor(self._executor, self._generate_batch, batch)
+            except Exception as e:
+                for p in batch:
+                    if not p.future.done():
+                        p.future.set_exception(e)
+                continue
+            for p, result in zip(batch, results):
+                if not p.future.done():
+                    p.future.set_result(result)
+
+    async def complete(self, data: Dict) -> Dict:
+        """Generate a chat completion locally; tool schemas are ignored"""
+        await self._ensure_loaded()
+        self.requests += 1
+        messages = [
+            {"role": m["role"], "content": m["content"]}
+            for m in data["messages"]
+            if m["role"] in ("system", "user", "assistant") and m.get("content")
+        ]
+        future = asyncio.get_running_loop().create_future()
+        self._queue.append(_Pending(
+            messages,
+            min(data.get("max_tokens", self.max_new_tokens), self.max_new_tokens),
+            data.get("temperature", 0.7),
+            future
+        ))
+        if self._batcher is None or self._batcher.done():
+            self._batcher = asyncio.ensure_future(self._run_batches())
+        return await future
+
+    def stats(self) -> Dict:
+        return {
+            "name": self.name,
+            "model": self.model_name,
+            "loaded": self._model is not None,
+            "available": self.available(),
+            "requests": self.requests,
+            "batches": self.batches,
+            "avg_batch_size": round(self.requests / self.batches, 2) if self.batches else None,
+            "tokens_per_second": round(self.generated_tokens / self.generation_seconds, 1)
+            if self.generation_seconds else None
+        }
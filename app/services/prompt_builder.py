@@ -0,0 +1,245 @@
+import logging
+import math
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken is optional; fall back to a byte-length estimate
+    tiktoken = None
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Static instructions. These are sent byte-identical on every request and always
+# come first so provider-side prompt caching can reuse the prefix.
+BASE_PROMPT = """You are DONNA, an advanced AI voice and chat assistant designed to help users manage their tasks, schedules, and daily productivity.
+
+## CORE IDENTITY & PERSONALITY
+- Name: DONNA (Digital Organized Neural Network Assistant)
+- Personality: Professional, helpful, friendly, and proactive
+- Communication Style: Clear, concise, and personable
+- Tone: Supportive and encouraging while maintaining professionalism
+
+## PRIMARY CAPABILITIES
+
+### 📋 TASK MANAGEMENT
+- Create, update, and delete tasks
+- Set task priorities (high, medium, low)
+- Manage task statuses (pending, in progress, completed)
+- Handle different task frequencies (one-time, daily, weekly, monthly)
+- Organize tasks by due dates and deadlines
+- Provide task summaries and progress tracking
+
+### 📅 SCHEDULE MANAGEMENT  
+- Display today's tasks and schedule
+- Show upcoming tasks (next 7 days by default)
+- Filter tasks by specific dates
+- Identify highest priority tasks
+- Manage recurring tasks (daily, weekly, monthly)
+- Provide date-specific task context
+
+### 🗣️ VOICE & CHAT INTERACTION
+- Process both text and voice commands
+- Provide natural language responses
+- Support continuous voice mode for hands-free operation
+- Convert responses to speech using female voice synthesis
+- Handle speech-to-text input processing
+
+### 📊 PRODUCTIVITY INSIGHTS
+- Analyze task patterns and workload
+- Suggest task prioritization strategies
+- Provide productivity reminders and motivational support
+- Help with time management and planning
+
+## RESPONSE GUIDELINES
+
+### Task Information Format:
+- Always include task title, priority, due date, and status
+- Use clear formatting: "• Task Title (Priority: high, Due: YYYY-MM-DD, Status: pending)"
+- Group similar tasks together (e.g., all high-priority tasks)
+
+### Date & Time Handling:
+- Use full date format: "May 29, 2025" for user-friendly display
+- Support various date input formats (YYYY-MM-DD, MM-DD-YYYY, natural language)
+- Provide context-aware date responses
+
+### Conversation Flow:
+- Ask clarifying questions when task details are incomplete
+- Offer proactive suggestions for task organization
+- Maintain conversation context across multiple interactions
+- Handle both specific commands and casual conversation
+
+### Error Handling:
+- Gracefully handle missing information
+- Provide helpful suggestions when tasks aren't found
+- Offer alternatives when requested actions cannot be completed
+
+## BEHAVIORAL INSTRUCTIONS
+- Always acknowledge user requests positively
+- Provide actionable next steps or suggestions
+- Use encouraging language to motivate productivity
+- Be concise but thorough in explanations
+- Prioritize user privacy and data security
+- Adapt communication style to user preferences
+
+When discussing tasks, always specify their priority and due date. Be helpful, friendly, and concise while maintaining a professional demeanor."""
+
+COMMANDS_REFERENCE = """## AVAILABLE COMMANDS REFERENCE
+- "Show me my tasks" - Display all current tasks
+- "What's my schedule today?" - Show today's tasks
+- "Create a new task: [title]" - Add a new task
+- "Mark [task] as completed" - Update task status
+- "What's my highest priority task?" - Show most important task
+- "Show me upcoming tasks" - Display tasks for next 7 days
+- "What's today's date?" - Get current date
+- "Show tasks for [date]" - Display tasks for specific date"""
+
+PRIORITY_SYSTEM = """## PRIORITY SYSTEM
+- HIGH: Urgent tasks requiring immediate attention
+- MEDIUM: Important tasks with moderate deadlines  
+- LOW: Tasks that can be completed when time allows"""
+
+TOOL_INSTRUCTIONS = """## TASK TOOLS
+- Task data is not included in this prompt; call the provided functions to look it up
+- Fetch only what the question needs, e.g. one date or one keyword rather than everything
+- Use create_task and update_task_status to make changes the user asks for, then confirm them
+- Never invent tasks that the functions did not return"""
+
+# Optional static sections, in the fixed order they are appended after BASE_PROMPT
+STATIC_SECTIONS = {
+    "commands": COMMANDS_REFERENCE,
+    "priority": PRIORITY_SYSTEM,
+    "tools": TOOL_INSTRUCTIONS,
+}
+
+# Task context sections in order of importance; the last ones are trimmed first
+CONTEXT_SECTION_PRIORITY = ["date", "priority", "summary", "today", "upcoming", "daily"]
+
+# Per-message framing overhead of the chat completions format
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+class TokenCounter:
+    """Counts tokens with tiktoken when available, otherwise approximates them"""
+
+    def __init__(self, model: str):
+        self.encoding = None
+        if tiktoken is not None:
+            try:
+                self.encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                self.encoding = tiktoken.get_encoding("cl100k_base")
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        if self.encoding is not None:
+            return len(self.encoding.encode(text))
+        # Roughly four bytes per token for English; emoji and CJK cost more bytes and more tokens
+        return math.ceil(len(text.encode("utf-8")) / 4)
+
+
+class PromptAssembler:
+    """Assembles chat messages from static instructions and budgeted task context"""
+
+    def __init__(self, model: str, token_budget: int = 3000):
+        self.token_budget = token_budget
+        self.counter = TokenCounter(model)
+        self._static_cache = {}
+
+    def _static_prompt(self, static_sections: List[str]) -> Tuple[str, int]:
+        """Return the static system prompt and its token count, memoized per section set"""
+        key = tuple(name for name in STATIC_SECTIONS if name in static_sections)
+        if key not in self._static_cache:
+            prompt = BASE_PROMPT + "".join(f"\n{STATIC_SECTIONS[name]}" for name in key)
+            self._static_cache[key] = (prompt, self.counter.count(prompt))
+        return self._static_cache[key]
+
+    def _shrink(self, text: str, max_tokens: int) -> str:
+        """Keep the heading and as many lines of a section as fit, noting what was dropped"""
+        lines = text.split("\n")
+        leading = 0
+        while leading < len(lines) and not lines[leading].strip():
+            leading += 1
+        if leading >= len(lines):
+            return ""
+
+        kept = lines[:leading + 1]
+        used = self.counter.count("\n".join(kept))
+        if used > max_tokens:
+            return ""
+
+        body = lines[leading + 1:]
+        for index, line in enumerate(body):
+            remaining = len(body) - index
+            note = f"  ... {remaining} more lines omitted"
+            line_tokens = self.counter.count(line) + 1
+            if used + line_tokens + self.counter.count(note) + 1 > max_tokens:
+                kept.append(note)
+                break
+            kept.append(line)
+            used += line_tokens
+        return "\n".join(kept)
+
+    def assemble(self, user_input: str, static_sections: Optional[List[str]] = None,
+                 context_sections: Optional[List[Tuple[str, str]]] = None,
+                 history: Optional[List[Dict]] = None) -> Dict:
+        """Build the message list for a request and report its token usage"""
+        static_prompt, static_tokens = self._static_prompt(static_sections or [])
+        user_tokens = self.counter.count(user_input)
+        context_sections = list(context_sections or [])
+        history = list(history or [])
+        history_tokens = sum(self.counter.count(m["content"]) + MESSAGE_OVERHEAD_TOKENS for m in history)
+
+        fixed_tokens = static_tokens + user_tokens + history_tokens + 2 * MESSAGE_OVERHEAD_TOKENS
+        header = "## CURRENT TASK CONTEXT"
+        available = self.token_budget - fixed_tokens - MESSAGE_OVERHEAD_TOKENS - self.counter.count(header)
+
+        section_tokens = {name: self.counter.count(text) for name, text in context_sections}
+        total = sum(section_tokens.values())
+        trimmed = []
+
+        if context_sections and total > available:
+            rank = {name: i for i, name in enumerate(CONTEXT_SECTION_PRIORITY)}
+            by_importance = sorted(range(len(context_sections)),
+                                   key=lambda i: rank.get(context_sections[i][0], len(rank)), reverse=True)
+            for i in by_importance:
+                if total <= available:
+                    break
+                name, text = context_sections[i]
+                allowed = section_tokens[name] - (total - available)
+                shrunk = self._shrink(text, allowed) if allowed > 0 else ""
+                new_tokens = self.counter.count(shrunk)
+                total += new_tokens - section_tokens[name]
+                section_tokens[name] = new_tokens
+                context_sections[i] = (name, shrunk)
+                trimmed.append(name)
+
+        messages = [{"role": "system", "content": static_prompt}]
+        context_text = "\n".join(text for _, text in context_sections if text)
+        context_tokens = 0
+        if context_text:
+            context_content = f"{header}\n{context_text}"
+            context_tokens = self.counter.count(context_content)
+            messages.append({"role": "system", "content": context_content})
+        # Conversation history changes every turn, so it goes after everything that does not
+        messages.extend(history)
+        messages.append({"role": "user", "content": user_input})
+
+        total_tokens = fixed_tokens + context_tokens + (MESSAGE_OVERHEAD_TOKENS if context_text else 0)
+        if total_tokens > self.token_budget:
+            logger.warning(f"Prompt exceeds token budget even without context: {total_tokens} > {self.token_budget}")
+
+        return {
+            "messages": messages,
+            "tokens": {
+                "static": static_tokens,
+                "context": context_tokens,
+                "history": history_tokens,
+                "user": user_tokens,
+                "total": total_tokens,
+                "budget": self.token_budget
+            },
+            "trimmed_sections": trimmed
+        }
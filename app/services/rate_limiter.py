@@ -0,0 +1,180 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import deque
+from typing import Dict
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Lower numbers are served first
+PRIORITY_INTERACTIVE = 0  # voice turns waiting on a spoken reply
+PRIORITY_NORMAL = 5       # typed chat
+PRIORITY_BACKGROUND = 10  # batch and housekeeping work
+
+PRIORITIES = {
+    "interactive": PRIORITY_INTERACTIVE,
+    "normal": PRIORITY_NORMAL,
+    "background": PRIORITY_BACKGROUND,
+}
+
+
+class RateLimitTimeout(Exception):
+    """Raised when a call waited longer than the maximum queue wait for rate-limit capacity"""
+
+
+class TokenBucket:
+    """Continuously refilling bucket holding up to one minute of capacity"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.level = per_minute
+        self.updated_at = time.monotonic()
+
+    def refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def seconds_until(self, amount: float) -> float:
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+
+class _Waiter:
+    __slots__ = ("priority", "tokens", "future", "enqueued_at")
+
+    def __init__(self, priority: int, tokens: int, future: asyncio.Future):
+        self.priority = priority
+        self.tokens = tokens
+        self.future = future
+        self.enqueued_at = time.monotonic()
+
+
+class TokenBucketRateLimiter:
+    """Client-side limiter for requests and tokens per minute with a priority wait queue"""
+
+    def __init__(self, requests_per_minute: float = 500, tokens_per_minute: float = 90000,
+                 max_queue_wait: float = 10.0, max_queue_size: int = 1000):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_queue_wait = max_queue_wait
+        self.max_queue_size = max_queue_size
+        self.paused_until = 0.0
+
+        self._queue = []
+        self._sequence = itertools.count()
+        self._wakeup = None
+        self._dispatcher = None
+
+        self.admitted = {name: 0 for name in PRIORITIES}
+        self.timeouts = 0
+        self.rejected = 0
+        self.max_depth = 0
+        self._waits = deque(maxlen=500)
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(1 for _, _, waiter in self._queue if not waiter.future.done())
+
+    def _try_take(self, tokens: int, now: float) -> float:
+        """Take capacity if available; otherwise return how long until it will be"""
+        if now < self.paused_until:
+            return self.paused_until - now
+        self.requests.refill(now)
+        self.tokens.refill(now)
+        # A single call larger than the whole minute budget is let through once the bucket is full
+        tokens = min(tokens, self.tokens.capacity)
+        wait = max(self.requests.seconds_until(1), self.tokens.seconds_until(tokens))
+        if wait == 0.0:
+            self.requests.level -= 1
+            self.tokens.level -= tokens
+        return wait
+
+    def _record_admission(self, priority: int, waited: float):
+        name = next((n for n, p in PRIORITIES.items() if p == priority), "normal")
+        self.admitted[name] = self.admitted.get(name, 0) + 1
+        self._waits.append(waited)
+
+    async def acquire(self, tokens: int, priority: int = PRIORITY_NORMAL):
+        """Wait for capacity for one request of the given token size"""
+        now = time.monotonic()
+        if not self._queue and self._try_take(tokens, now) == 0.0:
+            self._record_admission(priority, 0.0)
+            return
+
+        if self.queue_depth >= self.max_queue_size:
+            self.rejected += 1
+            raise RateLimitTimeout("Rate limiter queue is full")
+
+        waiter = _Waiter(priority, tokens, asyncio.get_running_loop().create_future())
+        heapq.heappush(self._queue, (priority, next(self._sequence), waiter))
+        self.max_depth = max(self.max_depth, self.queue_depth)
+        self._ensure_dispatcher()
+        self._wakeup.set()
+
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout=self.max_queue_wait)
+        except asyncio.TimeoutError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                return  # Admitted just as the timeout fired
+            waiter.future.cancel()
+            self.timeouts += 1
+            raise RateLimitTimeout(f"Waited more than {self.max_queue_wait}s for rate-limit capacity")
+        except asyncio.CancelledError:
+            waiter.future.cancel()
+            raise
+
+    def _ensure_dispatcher(self):
+        if self._dispatcher is None or self._dispatcher.done():
+            self._wakeup = asyncio.Event()
+            self._dispatcher = asyncio.ensure_future(self._dispatch())
+
+    async def _dispatch(self):
+        """Admit queued calls in priority order as capacity refills"""
+        while self._queue:
+            _, _, waiter = self._queue[0]
+            if waiter.future.done():
+                heapq.heappop(self._queue)
+                continue
+
+            now = time.monotonic()
+            wait = self._try_take(waiter.tokens, now)
+            if wait == 0.0:
+                heapq.heappop(self._queue)
+                waiter.future.set_result(None)
+                self._record_admission(waiter.priority, now - waiter.enqueued_at)
+                continue
+
+            # Sleep until the head can be served, or until a higher-priority call arrives
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+
+    def pause(self, seconds: float):
+        """Stop admitting calls for a while, e.g. after upstream answered 429 with Retry-After"""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def stats(self) -> Dict:
+        """Return queue depth and wait-time metrics"""
+        waits = sorted(self._waits)
+        p95 = waits[min(len(waits) - 1, int(0.95 * len(waits)))] if waits else None
+        return {
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_depth,
+            "admitted": dict(self.admitted),
+            "timeouts": self.timeouts,
+            "rejected": self.rejected,
+            "avg_wait_seconds": round(sum(waits) / len(waits), 4) if waits else 0.0,
+            "p95_wait_seconds": round(p95, 4) if p95 is not None else None,
+            "requests_available": round(self.requests.level, 2),
+            "tokens_available": round(self.tokens.level)
+        }
@@ -0,0 +1,56 @@
+import asyncio
+import hashlib
+import json
+import logging
+from typing import Any, Awaitable, Callable, Dict
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """Coalesces identical concurrent calls so one upstream request serves every caller"""
+
+    def __init__(self):
+        self._inflight = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def key_for(payload: Dict) -> str:
+        """Hash a request payload into a coalescing key"""
+        encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+    def _finish(self, key: str, task: asyncio.Future):
+        self._inflight.pop(key, None)
+        # Mark the exception as retrieved even if every caller has already gone away
+        if not task.cancelled():
+            task.exception()
+
+    def in_flight(self, key: str) -> bool:
+        return key in self._inflight
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run fn once per key at a time; concurrent callers with the same key await the same result"""
+        task = self._inflight.get(key)
+        if task is None:
+            self.leaders += 1
+            # The call runs as its own task so a caller that gives up (timeout,
+            # client disconnect) does not cancel it for everyone else waiting
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        else:
+            self.coalesced += 1
+            logger.info(f"Coalesced request onto in-flight call {key[:12]}")
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict:
+        """Return coalescing counters for monitoring"""
+        return {
+            "in_flight": len(self._inflight),
+            "upstream_calls": self.leaders,
+            "coalesced_hits": self.coalesced
+        }
@@ -0,0 +1,218 @@
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import httpx
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling upstream while the circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """Stops calling an unhealthy upstream until a cool-down has passed"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._probe_in_flight = False
+        self._probe_started_at = 0.0
+
+    def allow_request(self) -> bool:
+        """Return True if a request may go upstream now"""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+            self._probe_in_flight = False
+        if self.state == self.HALF_OPEN:
+            # Let exactly one probe through to test whether upstream has recovered;
+            # a probe that never reported back is replaced after another cool-down
+            now = time.monotonic()
+            if not self._probe_in_flight or now - self._probe_started_at >= self.reset_timeout:
+                self._probe_in_flight = True
+                self._probe_started_at = now
+                return True
+        return False
+
+    def record_success(self):
+        if self.state != self.CLOSED:
+            logger.info("Circuit breaker closed, upstream has recovered")
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self._probe_in_flight = False
+
+    def release_probe(self):
+        """Let another probe through after one that ended without telling us anything about upstream"""
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning(f"Circuit breaker opened after {self.consecutive_failures} consecutive failures")
+                self.times_opened += 1
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+    def stats(self) -> Dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "times_opened": self.times_opened
+        }
+
+
+class LatencyTracker:
+    """Keeps a sliding window of upstream latencies to derive percentiles"""
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+
+    def record(self, seconds: float):
+        self._samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def __len__(self):
+        return len(self._samples)
+
+
+class ResilientExecutor:
+    """Runs upstream calls with jittered retries, a circuit breaker and optional hedging"""
+
+    def __init__(self, max_retries: int = 3, base_delay: float = 0.5, max_delay: float = 8.0,
+                 breaker: Optional[CircuitBreaker] = None, hedge_enabled: bool = False,
+                 hedge_percentile: float = 95.0, hedge_min_samples: int = 20, hedge_min_delay: float = 0.25):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker = breaker or CircuitBreaker()
+        self.latency = LatencyTracker()
+        self.hedge_enabled = hedge_enabled
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_min_delay = hedge_min_delay
+
+        self.retries = 0
+        self.short_circuited = 0
+        self.hedges_sent = 0
+        self.hedges_won = 0
+
+    def is_retryable(self, error: Exception) -> bool:
+        status_code = getattr(error, "status_code", None)
+        if status_code is not None:
+            return status_code in RETRYABLE_STATUS_CODES
+        return isinstance(error, (httpx.TimeoutException, httpx.TransportError))
+
+    def backoff_delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Full-jitter exponential backoff, never shorter than the server's Retry-After"""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay * 4))
+        return delay
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before sending a hedged duplicate, or None if hedging is off"""
+        if not self.hedge_enabled or len(self.latency) < self.hedge_min_samples:
+            return None
+        return max(self.hedge_min_delay, self.latency.percentile(self.hedge_percentile))
+
+    async def _timed(self, fn: Callable[[], Awaitable[Any]]) -> Any:
+        started = time.monotonic()
+        result = await fn()
+        self.latency.record(time.monotonic() - started)
+        return result
+
+    async def _attempt(self, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """One attempt, hedged with a second identical request if the first is slower than p95"""
+        delay = self.hedge_delay()
+        if delay is None:
+            return await self._timed(fn)
+
+        primary = asyncio.ensure_future(self._timed(fn))
+        pending = {primary}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if done:
+                return primary.result()
+
+            self.hedges_sent += 1
+            logger.info(f"Upstream slower than p{self.hedge_percentile:.0f} ({delay:.2f}s), sending hedged request")
+            hedge = asyncio.ensure_future(self._timed(fn))
+            pending = {primary, hedge}
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.hedges_won += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            # Whichever request lost the race (or every request, if we were cancelled) is dropped
+            for task in pending:
+                task.cancel()
+
+    async def call(self, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Call fn with retries; raises CircuitOpenError while upstream is unhealthy"""
+        for attempt in range(self.max_retries + 1):
+            if not self.breaker.allow_request():
+                self.short_circuited += 1
+                raise CircuitOpenError("Circuit breaker is open, skipping upstream call")
+            try:
+                result = await self._attempt(fn)
+            except Exception as e:
+                if not self.is_retryable(e):
+                    # Client errors and local queueing timeouts say nothing about upstream health
+                    self.breaker.release_probe()
+                    raise
+                self.breaker.record_failure()
+                if attempt >= self.max_retries:
+                    raise
+                if self.breaker.state == CircuitBreaker.OPEN:
+                    self.short_circuited += 1
+                    raise CircuitOpenError("Circuit breaker opened, giving up on retries") from e
+                delay = self.backoff_delay(attempt, getattr(e, "retry_after", None))
+                self.retries += 1
+                logger.warning(f"Upstream call failed ({e}), retry {attempt + 1}/{self.max_retries} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+            else:
+                self.breaker.record_success()
+                return result
+
+    def stats(self) -> Dict:
+        p95 = self.latency.percentile(95)
+        return {
+            "circuit_breaker": self.breaker.stats(),
+            "retries": self.retries,
+            "short_circuited": self.short_circuited,
+            "hedges_sent": self.hedges_sent,
+            "hedges_won": self.hedges_won,
+            "latency_p95_seconds": round(p95, 3) if p95 is not None else None
+        }
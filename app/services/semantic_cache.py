@@ -0,0 +1,191 @@
+import logging
+import re
+import threading
+import time
+import zlib
+from typing import Dict, Optional
+
+import numpy as np
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Words that carry no meaning for matching cached questions
+STOPWORDS = {
+    "a", "an", "the", "me", "my", "i", "you", "your", "is", "are", "am", "be", "to", "of",
+    "for", "on", "in", "at", "please", "can", "could", "would", "will", "do", "does", "s", "it"
+}
+
+# Words that frame a question without changing what is asked. They still count towards the
+# similarity, but unlike every other word they may differ between a query and its cached match.
+FRAMING_WORDS = {
+    "what", "which", "show", "tell", "list", "give", "get", "got", "have", "any", "all", "there",
+    "now", "just", "about", "with", "and", "this", "that", "up", "out"
+}
+
+# Common paraphrases folded onto one canonical word before hashing
+PHRASE_SYNONYMS = [
+    # Every spelling of a negation becomes "not", so it is one content word that must match
+    (re.compile(r"\bcan'?t\b|\bcannot\b"), "can not"),
+    (re.compile(r"\bwon'?t\b"), "will not"),
+    (re.compile(r"\b(do|does|did|is|are|was|were|has|have|had|should|would|could)n'?t\b"), r"\1 not"),
+    (re.compile(r"\b(never|no)\b"), "not"),
+    (re.compile(r"\b(on my plate|have to do|need to do|to-?dos?|to do list)\b"), "tasks"),
+    (re.compile(r"\b(agenda|calendar|plans?)\b"), "schedule"),
+    (re.compile(r"\b(most important|top priority|focus on)\b"), "priority"),
+]
+
+
+class SemanticCache:
+    """Similarity cache of LLM answers backed by a hashed bag-of-features embedding index.
+
+    The embedding only finds near-duplicate wordings: "add milk" and "do not add milk", or the same
+    email for friday and for monday, score above any useful threshold. So a hit also needs the same
+    content words after synonym folding; only framing words such as "what" or "show" may differ.
+    """
+
+    def __init__(self, max_entries: int = 256, threshold: float = 0.9, dimensions: int = 1024,
+                 ttl_seconds: float = 900.0):
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.dimensions = dimensions
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+
+        # One row per cached query; parallel arrays hold the metadata for each row
+        self._vectors = np.zeros((max_entries, dimensions), dtype=np.float32)
+        self._scope_ids = np.full(max_entries, -1, dtype=np.int64)
+        self._expires_at = np.zeros(max_entries, dtype=np.float64)
+        self._last_used = np.zeros(max_entries, dtype=np.float64)
+        self._responses = [None] * max_entries
+        self._content = [None] * max_entries
+        self._size = 0
+        self._scopes = {}
+        self._next_scope_id = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.rejected = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _words(text: str):
+        text = text.lower()
+        for pattern, replacement in PHRASE_SYNONYMS:
+            text = pattern.sub(replacement, text)
+        return [w for w in re.findall(r"[a-z0-9]+", text) if w not in STOPWORDS]
+
+    def content_words(self, text: str) -> frozenset:
+        """The words a cached match must share with the query"""
+        return frozenset(w for w in self._words(text) if w not in FRAMING_WORDS)
+
+    def embed(self, text: str) -> np.ndarray:
+        """Embed text with a signed hashing vectorizer over words and character trigrams"""
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        words = self._words(text)
+
+        features = list(words)
+        for word in words:
+            padded = f"#{word}#"
+            features.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+
+        for feature in features:
+            digest = zlib.crc32(feature.encode("utf-8"))
+            sign = 1.0 if digest & 0x80000000 else -1.0
+            vector[digest % self.dimensions] += sign
+
+        # Sublinear term frequency, then L2-normalize so a dot product is cosine similarity
+        np.copysign(np.log1p(np.abs(vector)), vector, out=vector)
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector
+
+    def _scope_id(self, scope: str) -> int:
+        if scope not in self._scopes:
+            self._scopes[scope] = self._next_scope_id
+            self._next_scope_id += 1
+        return self._scopes[scope]
+
+    def get(self, text: str, scope: str) -> Optional[str]:
+        """Return a cached answer for a similar query in the same scope, or None"""
+        now = time.time()
+        query = self.embed(text)
+        content = self.content_words(text)
+
+        with self._lock:
+            scope_id = self._scopes.get(scope)
+            if scope_id is None or self._size == 0:
+                self.misses += 1
+                return None
+
+            n = self._size
+            similarities = self._vectors[:n] @ query
+            valid = (self._scope_ids[:n] == scope_id) & (self._expires_at[:n] > now)
+            similarities = np.where(valid, similarities, -1.0)
+
+            candidates = np.flatnonzero(similarities >= self.threshold)
+            for best in candidates[np.argsort(-similarities[candidates])]:
+                if self._content[best] == content:
+                    self._last_used[best] = now
+                    self.hits += 1
+                    logger.info(f"Semantic cache hit with similarity {similarities[best]:.3f}")
+                    return self._responses[best]
+
+            if len(candidates):
+                # Worded alike but asking something else, e.g. a negation or another day
+                self.rejected += 1
+            self.misses += 1
+            return None
+
+    def set(self, text: str, scope: str, response: str):
+        """Index a query/answer pair, evicting the least recently used entry when full"""
+        now = time.time()
+        vector = self.embed(text)
+        content = self.content_words(text)
+
+        with self._lock:
+            if self._size < self.max_entries:
+                slot = self._size
+                self._size += 1
+            else:
+                # Expired entries go first, then the least recently used one
+                last_used = np.where(self._expires_at > now, self._last_used, -np.inf)
+                slot = int(np.argmin(last_used))
+                self.evictions += 1
+
+            self._vectors[slot] = vector
+            self._scope_ids[slot] = self._scope_id(scope)
+            self._expires_at[slot] = now + self.ttl_seconds
+            self._last_used[slot] = now
+            self._responses[slot] = response
+            self._content[slot] = content
+
+            # Old task-store versions and dates can never match again, so forget their ids
+            if len(self._scopes) > 4 * self.max_entries:
+                live = {int(i) for i in self._scope_ids[:self._size]}
+                self._scopes = {s: i for s, i in self._scopes.items() if i in live}
+
+    def clear(self):
+        """Drop every cached entry"""
+        with self._lock:
+            self._size = 0
+            self._scopes = {}
+            self._responses = [None] * self.max_entries
+            self._content = [None] * self.max_entries
+            self._scope_ids.fill(-1)
+
+    def stats(self) -> Dict:
+        """Return hit/miss counters for monitoring"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": self._size,
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "rejected": self.rejected,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
@@ -1,28 +1,530 @@
-from typing import Any
-import torch
+import asyncio
+import functools
+import hashlib
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Optional
+
 import numpy as np
-from io import BytesIO
-from faster_whisper import WhisperModel
+
+from app.services.language_memory import LanguageMemory
+from app.services.request_coalescer import SingleFlight
+from app.services.stt_batcher import MicroBatchScheduler
+from app.services.stt_profiles import DEFAULT_PROFILE, STTProfile, resolve_profile
+from app.utils.cache import TTLCache
+from app.utils.audio_decoding import AudioDecodeError, decode_fast_path, decode_with_ffmpeg, sniff_container
+from app.utils.vad import pack_regions, speech_regions
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+# Whisper's encoder sees fixed 30 s windows; clips up to this length fit in one batch row
+BATCH_WINDOW_SAMPLES = 30 * SAMPLE_RATE
+
+
+def _synthetic_clip(seconds: float = 1.0) -> np.ndarray:
+    """A short voiced-like clip (harmonics plus a little noise) for warm-up inference"""
+    t = np.arange(int(SAMPLE_RATE * seconds), dtype=np.float32) / SAMPLE_RATE
+    clip = sum(np.sin(2 * np.pi * f * t) / (i + 1) for i, f in enumerate((180.0, 360.0, 540.0, 720.0)))
+    clip += np.random.default_rng(0).normal(0, 0.01, t.shape)
+    return (0.2 * clip / np.max(np.abs(clip))).astype(np.float32)
+
+
+class TranscriptionQueueFull(Exception):
+    """Raised when more transcriptions are waiting than the bounded queue allows"""
+
+
+def _run_transcription(model, audio_np: np.ndarray, beam_size: int, language: Optional[str]):
+    """Transcribe and consume the lazy segment generator; runs on a worker, never on the event loop"""
+    segments, info = model.transcribe(audio_np, beam_size=beam_size, language=language)
+    return " ".join([segment.text for segment in segments]), info.language, info.language_probability
+
+
+def _run_batch(model, audios: List[np.ndarray], languages: List[Optional[str]], beam_size: int):
+    """Transcribe several short clips with one padded encoder pass and one batched decode"""
+    from faster_whisper.tokenizer import Tokenizer
+
+    extractor = model.feature_extractor
+    features = []
+    for audio in audios:
+        # Pad the audio, not the features, so every row sees the same silence Whisper was trained on
+        padded = np.zeros(BATCH_WINDOW_SAMPLES, dtype=np.float32)
+        padded[:len(audio)] = audio[:BATCH_WINDOW_SAMPLES]
+        features.append(extractor(padded)[:, :extractor.nb_max_frames])
+    encoder_output = model.encode(np.stack(features))
+
+    multilingual = model.model.is_multilingual
+    languages = list(languages)
+    probabilities = [1.0] * len(audios)
+    if multilingual and any(language is None for language in languages):
+        detected = model.model.detect_language(encoder_output)
+        for i, language in enumerate(languages):
+            if language is None:
+                token, probabilities[i] = detected[i][0]
+                languages[i] = token[2:-2]  # "<|en|>" -> "en"
+    languages = [language or "en" for language in languages]
+
+    tokenizers = {
+        language: Tokenizer(model.hf_tokenizer, multilingual, task="transcribe", language=language)
+        for language in set(languages)
+    }
+    prompts = [list(tokenizers[language].sot_sequence) + [tokenizers[language].no_timestamps]
+               for language in languages]
+    results = model.model.generate(encoder_output, prompts, beam_size=beam_size, max_length=448,
+                                   suppress_blank=True, suppress_tokens=[-1])
+    return [
+        (tokenizers[language].decode(result.sequences_ids[0]).strip(), language, probability)
+        for result, language, probability in zip(results, languages, probabilities)
+    ]
+
+
+# Process-pool workers each hold their own replica, created on first use
+_worker_config = None
+_worker_model = None
+
+
+def _init_worker(config: Dict):
+    global _worker_config
+    _worker_config = config
+
+
+def _worker_get_model():
+    global _worker_model
+    if _worker_model is None:
+        from faster_whisper import WhisperModel
+        _worker_model = WhisperModel(**_worker_config)
+    return _worker_model
+
+
+def _worker_warm_up():
+    started = time.monotonic()
+    _run_transcription(_worker_get_model(), _synthetic_clip(), 1, "en")
+    return os.getpid(), time.monotonic() - started
+
+
+def _worker_transcribe(audio_np: np.ndarray, beam_size: int, language: Optional[str]):
+    return _run_transcription(_worker_get_model(), audio_np, beam_size, language)
+
+
+def _worker_transcribe_batch(audios: List[np.ndarray], languages: List[Optional[str]], beam_size: int):
+    return _run_batch(_worker_get_model(), audios, languages, beam_size)
+
 
 class SpeechRecognitionService:
-    def __init__(self):
-        # Initialize Whisper model (using faster-whisper for better performance)
+    """Whisper transcription with the model loaded lazily, off the event loop, and warmed up before use"""
+
+    NOT_LOADED = "not_loaded"
+    LOADING = "loading"
+    WARMING = "warming"
+    READY = "ready"
+    FAILED = "failed"
+
+    def __init__(self, profile: Optional[STTProfile] = None):
         # Choose model size based on your hardware capabilities: tiny, base, small, medium, large-v2
-        self.model = WhisperModel("small", device="cuda" if torch.cuda.is_available() else "cpu")
-        
-    async def transcribe(self, audio_bytes):
-        """Convert speech to text using Whisper"""
+        self.model_size = os.getenv("WHISPER_MODEL_SIZE", "small")
+        self.device = os.getenv("WHISPER_DEVICE", "auto")
+        self.compute_type = os.getenv("WHISPER_COMPUTE_TYPE", "default")
+        # Replicas run on a dedicated pool: threads sharing one model with per-replica
+        # ctranslate2 workers, or processes each holding their own model
+        self.workers = int(os.getenv("STT_WORKERS", "1"))
+        self.worker_mode = os.getenv("STT_WORKER_MODE", "thread").lower()
+        self.cpu_threads = int(os.getenv("STT_CPU_THREADS", str(max(1, (os.cpu_count() or 1) // self.workers))))
+        self.max_queue = int(os.getenv("STT_MAX_QUEUE", "16"))
+        # Concurrent short clips share encoder and decoder passes instead of running one by one
+        self.batching = os.getenv("STT_BATCHING", "true").lower() == "true"
+        self.batch_size = int(os.getenv("STT_BATCH_SIZE", "8"))
+        self.batch_window_ms = float(os.getenv("STT_BATCH_WINDOW_MS", "15"))
+        self.beam_size = int(os.getenv("STT_BEAM_SIZE", "5"))
+        self.batcher = None
+
+        # A measured profile, picked by name or automatically, replaces the WHISPER_* settings above
+        if profile is None:
+            try:
+                profile = resolve_profile(
+                    os.getenv("STT_PROFILE", "auto").lower(),
+                    os.getenv("STT_PROFILE_RESULTS", "stt_profile_results.json"),
+                    max_wer=float(os.getenv("STT_TARGET_WER", "0.15")),
+                    max_rtf=float(os.getenv("STT_TARGET_RTF", "0.5")),
+                    # Settings chosen by hand win over the default until the machine has been measured
+                    default=None if os.getenv("WHISPER_MODEL_SIZE") else DEFAULT_PROFILE
+                )
+            except ValueError as e:
+                logger.error(f"{e}; using WHISPER_* settings")
+        self.profile = profile
+        if profile is not None:
+            self.model_size = profile.model_size
+            self.compute_type = profile.compute_type
+            self.beam_size = profile.beam_size
+            if profile.cpu_threads:
+                self.cpu_threads = profile.cpu_threads
+        self.max_audio_seconds = float(os.getenv("STT_MAX_AUDIO_SECONDS", "600"))
+        self.decoded = {"fast_path": 0, "ffmpeg": 0, "failed": 0}
+        self.decode_seconds = 0.0
+        # Uploads are trimmed to their speech before Whisper sees them
+        self.vad = os.getenv("STT_VAD", "true").lower() == "true"
+        self.vad_options = {
+            "threshold_db": float(os.getenv("STT_VAD_THRESHOLD_DB", "12")),
+            "min_silence_ms": int(os.getenv("STT_VAD_MIN_SILENCE_MS", "600")),
+            "pad_ms": int(os.getenv("STT_VAD_PAD_MS", "200"))
+        }
+        self.vad_input_seconds = 0.0
+        self.vad_speech_seconds = 0.0
+        self.vad_silent_clips = 0
+
+        # Retried uploads and replayed clips are answered from the cache; identical uploads
+        # that arrive while the first is still transcribing share its result
+        self.transcript_cache = None
+        if os.getenv("STT_CACHE", "true").lower() == "true":
+            self.transcript_cache = TTLCache(
+                max_entries=int(os.getenv("STT_CACHE_SIZE", "1024")),
+                ttl_seconds=float(os.getenv("STT_CACHE_TTL", "86400")),
+                disk_dir=os.getenv("STT_CACHE_DIR") or None
+            )
+        self.single_flight = SingleFlight()
+        # Users who keep speaking one language skip Whisper's detection pass after the first confident one
+        self.language_memory = None
+        if os.getenv("STT_LANGUAGE_MEMORY", "true").lower() == "true":
+            self.language_memory = LanguageMemory(
+                min_probability=float(os.getenv("STT_LANGUAGE_MIN_PROBABILITY", "0.8")),
+                recheck_every=int(os.getenv("STT_LANGUAGE_RECHECK_EVERY", "20")),
+                max_users=int(os.getenv("STT_LANGUAGE_USERS", "10000"))
+            )
+        self.model = None
+        self._executor = None
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.busy_seconds = 0.0
+        self.state = self.NOT_LOADED
+        self.load_error = None
+        self.load_seconds = None
+        self.warmup_seconds = None
+        self._load_task = None
+
+    def _resolve_device(self) -> str:
+        if self.device != "auto":
+            return self.device
+        # ctranslate2 ships with faster-whisper, so there is no need to import torch just to find a GPU
+        try:
+            import ctranslate2
+            return "cuda" if ctranslate2.get_cuda_device_count() > 0 else "cpu"
+        except Exception:
+            return "cpu"
+
+    def _model_config(self) -> Dict:
+        device = self._resolve_device()
+        compute_type = self.compute_type
+        if compute_type == "default":
+            compute_type = "float16" if device == "cuda" else "int8"
+        return {
+            "model_size_or_path": self.model_size,
+            "device": device,
+            "compute_type": compute_type,
+            "cpu_threads": self.cpu_threads,
+            # In thread mode one model object serves every pool thread concurrently
+            "num_workers": self.workers if self.worker_mode == "thread" else 1
+        }
+
+    def _load_and_warm_up(self, config: Dict):
+        """Load the model and run one inference so the first real request does not pay for allocation"""
+        from faster_whisper import WhisperModel
+
+        started = time.monotonic()
+        model = WhisperModel(**config)
+        self.load_seconds = time.monotonic() - started
+
+        self.state = self.WARMING
+        started = time.monotonic()
+        _run_transcription(model, _synthetic_clip(), 1, "en")
+        self.warmup_seconds = time.monotonic() - started
+        self.model = model
+
+    async def _load(self):
+        loop = asyncio.get_running_loop()
         try:
-            # Convert bytes to numpy array (assuming 16kHz mono PCM)
-            audio_np = np.frombuffer(audio_bytes, dtype=np.float32)
-            
-            # Transcribe with Whisper
-            segments, info = self.model.transcribe(audio_np, beam_size=5)
-            
-            # Combine all segments
-            transcript = " ".join([segment.text for segment in segments])
-            
-            return {"success": True, "text": transcript, "language": info.language}
-            
+            self.state = self.LOADING
+            config = self._model_config()
+            if self.worker_mode == "process":
+                # spawn, not fork: ctranslate2 thread pools do not survive a fork
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(config,)
+                )
+                started = time.monotonic()
+                # Concurrent warm-ups make the pool start every worker and load every replica
+                warmed = await asyncio.gather(*[
+                    loop.run_in_executor(self._executor, _worker_warm_up) for _ in range(self.workers)
+                ])
+                self.load_seconds = time.monotonic() - started
+                self.warmup_seconds = max(seconds for _, seconds in warmed)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="stt")
+                await loop.run_in_executor(self._executor, self._load_and_warm_up, config)
+            logger.info(f"Whisper {self.model_size} ready: {self.workers} {self.worker_mode} replica(s) on "
+                        f"{config['device']}/{config['compute_type']} with {self.cpu_threads} threads each, "
+                        f"load {self.load_seconds:.1f}s, warm-up {self.warmup_seconds:.1f}s")
+            if self.batching and self.batch_size > 1:
+                self.batcher = MicroBatchScheduler(self._run_batch_on_pool, self.batch_size,
+                                                   self.batch_window_ms, self.workers)
+            self.state = self.READY
         except Exception as e:
-            return {"success": False, "error": str(e)}
\ No newline at end of file
+            self.state = self.FAILED
+            self.load_error = str(e)
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+            logger.error(f"Failed to load Whisper model: {e}")
+
+    def start(self) -> asyncio.Task:
+        """Begin loading in the background; every caller shares the same load"""
+        if self._load_task is None or (self.state == self.FAILED and self._load_task.done()):
+            self.load_error = None
+            self._load_task = asyncio.ensure_future(self._load())
+        return self._load_task
+
+    def close(self):
+        """Release the worker pool and model, e.g. between benchmark runs"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self.model = None
+        self.batcher = None
+        self.state = self.NOT_LOADED
+        self._load_task = None
+
+    @property
+    def is_ready(self) -> bool:
+        return self.state == self.READY
+
+    async def ensure_ready(self):
+        if not self.is_ready:
+            await self.start()
+        if not self.is_ready:
+            raise RuntimeError(f"Speech recognition model unavailable: {self.load_error}")
+
+    async def decode(self, audio_bytes: bytes, sample_format: Optional[str] = None) -> np.ndarray:
+        """Uploaded bytes to 16 kHz mono float32: PCM and 16 kHz WAV in place, anything else through ffmpeg"""
+        if not audio_bytes:
+            raise AudioDecodeError("Audio is empty")
+        started = time.monotonic()
+        try:
+            # A declared PCM format wins over magic bytes: raw samples can look like an MP3 frame sync
+            container = "raw" if sample_format else sniff_container(audio_bytes)
+            audio_np = decode_fast_path(audio_bytes, container, sample_format)
+            if audio_np is not None:
+                self.decoded["fast_path"] += 1
+                audio_np = audio_np[:int(self.max_audio_seconds * SAMPLE_RATE)]
+            else:
+                # ffmpeg is a subprocess; wait for it on the default executor, not the Whisper pool
+                audio_np = await asyncio.get_running_loop().run_in_executor(
+                    None, decode_with_ffmpeg, audio_bytes, self.max_audio_seconds
+                )
+                self.decoded["ffmpeg"] += 1
+        except AudioDecodeError:
+            self.decoded["failed"] += 1
+            raise
+        finally:
+            self.decode_seconds += time.monotonic() - started
+        if not len(audio_np):
+            self.decoded["failed"] += 1
+            raise AudioDecodeError(f"No audio samples found in {container} upload")
+        return audio_np
+
+    async def speech_chunks(self, audio_np: np.ndarray) -> List[np.ndarray]:
+        """Cut silence and long pauses, packing what is left into clips of up to one Whisper window"""
+        if not self.vad:
+            return [audio_np] if len(audio_np) else []
+        if len(audio_np) > BATCH_WINDOW_SAMPLES:
+            # Long recordings take tens of milliseconds to scan; keep that off the event loop
+            regions = await asyncio.get_running_loop().run_in_executor(
+                None, functools.partial(speech_regions, audio_np, **self.vad_options)
+            )
+        else:
+            regions = speech_regions(audio_np, **self.vad_options)
+        chunks = pack_regions(audio_np, regions, BATCH_WINDOW_SAMPLES)
+
+        self.vad_input_seconds += len(audio_np) / SAMPLE_RATE
+        self.vad_speech_seconds += sum(len(chunk) for chunk in chunks) / SAMPLE_RATE
+        if not chunks:
+            self.vad_silent_clips += 1
+        return chunks
+
+    def _cache_key(self, audio_np: np.ndarray, language: Optional[str]) -> str:
+        """Content address of the decoded PCM plus everything that changes the transcript for it"""
+        digest = hashlib.sha256(np.ascontiguousarray(audio_np, dtype=np.float32).data).hexdigest()
+        model = self.profile.name if self.profile is not None else \
+            f"{self.model_size}/{self.compute_type}/beam{self.beam_size}"
+        vad = "vad:{threshold_db}/{min_silence_ms}/{pad_ms}".format(**self.vad_options) if self.vad else "novad"
+        return f"stt:{digest}:{model}:{vad}:{language or 'auto'}"
+
+    async def _transcribe_audio(self, audio_np: np.ndarray, language: Optional[str] = None) -> Dict:
+        await self.ensure_ready()
+        chunks = await self.speech_chunks(audio_np)
+        if not chunks:
+            return {"success": True, "text": "", "no_speech": True}
+
+        results = await self._submit_chunks(chunks, language)
+        transcript = " ".join(text.strip() for text, _, _ in results if text.strip())
+        _, detected, probability = max(zip(chunks, results), key=lambda pair: len(pair[0]))[1]
+
+        return {"success": True, "text": transcript, "language": detected, "language_probability": probability}
+
+    async def _transcribe_cached(self, key: str, audio_np: np.ndarray, language: Optional[str]) -> Dict:
+        result = await self._transcribe_audio(audio_np, language)
+        self.transcript_cache.set(key, result)
+        return result
+
+    async def _transcribe_decoded(self, audio_np: np.ndarray, language: Optional[str]) -> Dict:
+        if self.transcript_cache is None:
+            return await self._transcribe_audio(audio_np, language)
+
+        if len(audio_np) > BATCH_WINDOW_SAMPLES:
+            key = await asyncio.get_running_loop().run_in_executor(None, self._cache_key, audio_np, language)
+        else:
+            key = self._cache_key(audio_np, language)
+        cached = self.transcript_cache.get(key)
+        if cached is not None:
+            return {**cached, "cached": True}
+        return await self.single_flight.do(key, lambda: self._transcribe_cached(key, audio_np, language))
+
+    async def transcribe(self, audio_bytes, sample_format: Optional[str] = None, language: Optional[str] = None,
+                         user_id: Optional[str] = None):
+        """Convert speech to text using Whisper.
+
+        language is a per-request hint; "auto" forces detection. Without one, a user's remembered
+        language is used and only users with no confident detection yet pay for the detection pass.
+        """
+        try:
+            audio_np = await self.decode(audio_bytes, sample_format)
+
+            source = "request"
+            if language == "auto":
+                language = None
+                source = "detected"
+            elif language is None:
+                source = "detected"
+                if user_id and self.language_memory is not None:
+                    language = self.language_memory.hint(user_id)
+                    source = "user" if language else source
+
+            result = await self._transcribe_decoded(audio_np, language)
+            if source == "detected" and user_id and self.language_memory is not None and result.get("language"):
+                self.language_memory.observe(user_id, result["language"], result.get("language_probability", 0.0))
+            return {**result, "language_source": source}
+
+        except AudioDecodeError as e:
+            return {"success": False, "error": str(e), "invalid_audio": True}
+        except TranscriptionQueueFull as e:
+            return {"success": False, "error": str(e), "queue_full": True}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    async def transcribe_array(self, audio_np: np.ndarray, beam_size: Optional[int] = None,
+                               language: Optional[str] = None):
+        """Transcribe decoded 16 kHz float32 samples; returns (text, language, language_probability)"""
+        await self.ensure_ready()
+        return await self._submit(audio_np, beam_size=beam_size or self.beam_size, language=language)
+
+    def _capacity(self) -> int:
+        """Clips that can be running at once: one per replica, or one batch per replica"""
+        return self.workers * (self.batch_size if self.batcher is not None else 1)
+
+    def _admit(self):
+        if self.in_flight >= self._capacity() + self.max_queue:
+            self.rejected += 1
+            raise TranscriptionQueueFull(f"{self.in_flight} transcriptions already in progress or queued")
+
+    async def _submit_chunks(self, chunks: List[np.ndarray], language: Optional[str]) -> List:
+        """Transcribe one request's speech chunks, admitted once against the queue bound.
+
+        Chunks run a few at a time so they can batch with each other without a long upload
+        filling the queue; if one fails the rest are cancelled.
+        """
+        self._admit()
+        slots = asyncio.Semaphore(self.batch_size if self.batcher is not None else self.workers)
+
+        async def run(chunk):
+            async with slots:
+                return await self._submit(chunk, beam_size=self.beam_size, language=language, admitted=True)
+
+        tasks = [asyncio.ensure_future(run(chunk)) for chunk in chunks]
+        try:
+            return await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _submit(self, audio_np: np.ndarray, beam_size: int = 5, language: Optional[str] = None,
+                      batch: bool = True, admitted: bool = False):
+        """Hand one clip to the worker pool; the event loop only awaits the resulting future"""
+        if not admitted:
+            self._admit()
+
+        loop = asyncio.get_running_loop()
+        self.in_flight += 1
+        started = time.monotonic()
+        try:
+            # Batches decode a single 30 s window without timestamps, so longer clips take the full path
+            if batch and self.batcher is not None and beam_size == self.beam_size \
+                    and len(audio_np) <= BATCH_WINDOW_SAMPLES:
+                return await self.batcher.submit(audio_np, language)
+            if self.worker_mode == "process":
+                return await loop.run_in_executor(self._executor, _worker_transcribe, audio_np, beam_size, language)
+            return await loop.run_in_executor(
+                self._executor, _run_transcription, self.model, audio_np, beam_size, language
+            )
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            self.busy_seconds += time.monotonic() - started
+
+    async def _run_batch_on_pool(self, audios: List[np.ndarray], languages: List[Optional[str]]):
+        loop = asyncio.get_running_loop()
+        if self.worker_mode == "process":
+            return await loop.run_in_executor(self._executor, _worker_transcribe_batch, audios, languages,
+                                              self.beam_size)
+        return await loop.run_in_executor(self._executor, _run_batch, self.model, audios, languages, self.beam_size)
+
+    def stats(self) -> Dict:
+        """Return model readiness and load timings"""
+        return {
+            "state": self.state,
+            "profile": self.profile.name if self.profile is not None else None,
+            "model_size": self.model_size,
+            "compute_type": self.compute_type,
+            "load_seconds": round(self.load_seconds, 2) if self.load_seconds is not None else None,
+            "warmup_seconds": round(self.warmup_seconds, 2) if self.warmup_seconds is not None else None,
+            "error": self.load_error,
+            "workers": self.workers,
+            "worker_mode": self.worker_mode,
+            "cpu_threads": self.cpu_threads,
+            "in_flight": self.in_flight,
+            "queued": max(0, self.in_flight - self._capacity()),
+            "max_queue": self.max_queue,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_seconds": round(self.busy_seconds / self.completed, 3) if self.completed else None,
+            "beam_size": self.beam_size,
+            "decoded": dict(self.decoded),
+            "avg_decode_ms": round(self.decode_seconds / sum(self.decoded.values()) * 1000, 2)
+            if sum(self.decoded.values()) else None,
+            "batching": self.batcher.stats() if self.batcher is not None else None,
+            "vad": {
+                "enabled": self.vad,
+                "input_seconds": round(self.vad_input_seconds, 1),
+                "speech_seconds": round(self.vad_speech_seconds, 1),
+                "silence_removed": round(1 - self.vad_speech_seconds / self.vad_input_seconds, 3)
+                if self.vad_input_seconds else None,
+                "silent_clips": self.vad_silent_clips
+            },
+            "transcript_cache": self.transcript_cache.stats() if self.transcript_cache is not None else None,
+            "language_memory": self.language_memory.stats() if self.language_memory is not None else None,
+            "coalescing": self.single_flight.stats()
+        }
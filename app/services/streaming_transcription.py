@@ -0,0 +1,174 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+import numpy as np
+
+from app.services.speech_recognition import SAMPLE_RATE, TranscriptionQueueFull
+from app.utils.audio_decoding import SAMPLE_FORMATS, pcm_to_float32
+from app.utils.vad import StreamingVAD
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class StreamingTranscriptionSession:
+    """One live audio stream: partial hypotheses on a sliding window, final segments at VAD pauses"""
+
+    def __init__(self, stt_service, emit: Callable[[Dict], Awaitable[None]], language: Optional[str] = None,
+                 sample_format: str = "s16le", partial_interval_ms: int = 500, window_seconds: float = 8.0,
+                 max_segment_seconds: float = 25.0, min_silence_ms: int = 600, pad_ms: int = 200):
+        self.stt_service = stt_service
+        self.emit = emit
+        self.language = language
+        self.sample_format = sample_format
+        self.sample_width = SAMPLE_FORMATS[sample_format].itemsize
+        self.partial_interval = int(SAMPLE_RATE * partial_interval_ms / 1000)
+        self.window = int(SAMPLE_RATE * window_seconds)
+        self.max_segment = int(SAMPLE_RATE * max_segment_seconds)
+        self.pad = int(SAMPLE_RATE * pad_ms / 1000)
+        self.vad = StreamingVAD(min_silence_ms=min_silence_ms)
+
+        # Audio since the last finalized cut; self._start is its first sample's stream position
+        self._buffer = np.empty(0, dtype=np.float32)
+        self._start = 0
+        self._speech_start = None
+        self._pending_bytes = b""
+        self._last_partial_at = 0
+        self._partial_task = None
+        self._final_task = None
+        self._tasks = set()
+        self.segment = 0
+
+        self.partials = 0
+        self.partials_skipped = 0
+        self.finals = 0
+        self.audio_seconds = 0.0
+
+    def _decode(self, data: bytes) -> np.ndarray:
+        data = self._pending_bytes + data
+        usable = len(data) - len(data) % self.sample_width
+        self._pending_bytes = data[usable:]
+        return pcm_to_float32(data[:usable], self.sample_format)
+
+    async def feed(self, data: bytes):
+        """Accept one chunk of PCM from the client"""
+        audio = self._decode(data)
+        if not len(audio):
+            return
+        self._buffer = np.concatenate([self._buffer, audio])
+        self.audio_seconds += len(audio) / SAMPLE_RATE
+
+        for event, position in self.vad.push(audio):
+            if event == "start" and self._speech_start is None:
+                self._speech_start = position
+            elif event == "end" and self._speech_start is not None:
+                self._finalize(position + self.pad)
+
+        end = self._start + len(self._buffer)
+        if self._speech_start is None:
+            # Nothing said yet: keep a little lead-in and let the rest of the silence go
+            keep = min(len(self._buffer), self.pad)
+            self._start = end - keep
+            self._buffer = self._buffer[len(self._buffer) - keep:]
+        elif end - self._speech_start >= self.max_segment:
+            # Whisper sees 30 s at a time, so a monologue without pauses is cut here and carries on
+            self._finalize(end)
+            self._speech_start = end
+        elif end - self._last_partial_at >= self.partial_interval:
+            self._schedule_partial(end)
+
+    def _track(self, coroutine) -> asyncio.Task:
+        task = asyncio.ensure_future(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def _schedule_partial(self, end: int):
+        if self._partial_task is not None and not self._partial_task.done():
+            # Decoding is behind the speaker: skip rather than queue stale hypotheses
+            self.partials_skipped += 1
+            return
+        self._last_partial_at = end
+        begin = max(self._speech_start - self.pad, self._start, end - self.window)
+        audio = self._buffer[begin - self._start:end - self._start]
+        self._partial_task = self._track(self._partial(audio, self.segment))
+
+    async def _partial(self, audio: np.ndarray, segment: int):
+        try:
+            # Greedy decoding keeps partials cheap; the final pass uses the full beam
+            text, _, _ = await self.stt_service.transcribe_array(audio, beam_size=1, language=self.language)
+        except TranscriptionQueueFull:
+            self.partials_skipped += 1
+            return
+        except Exception as e:
+            logger.warning(f"Partial transcription failed: {e}")
+            return
+        if segment == self.segment and text.strip():
+            self.partials += 1
+            await self.emit({"type": "partial", "segment": segment, "text": text.strip()})
+
+    def _finalize(self, cut: int):
+        """Close the current segment at stream position cut and transcribe it in order behind earlier ones"""
+        end = min(cut, self._start + len(self._buffer))
+        begin = max(self._speech_start - self.pad, self._start)
+        audio = self._buffer[begin - self._start:end - self._start]
+        segment, previous = self.segment, self._final_task
+
+        self._buffer = self._buffer[end - self._start:]
+        self._start = end
+        self._speech_start = None
+        self._last_partial_at = end
+        self.segment += 1
+
+        self._final_task = self._track(
+            self._final(audio, segment, begin / SAMPLE_RATE, end / SAMPLE_RATE, previous)
+        )
+
+    async def _final(self, audio: np.ndarray, segment: int, start: float, end: float, previous):
+        started = time.monotonic()
+        try:
+            text, language, probability = await self.stt_service.transcribe_array(audio, language=self.language)
+        except Exception as e:
+            if previous is not None:
+                await previous
+            await self.emit({"type": "error", "segment": segment, "error": str(e),
+                             "busy": isinstance(e, TranscriptionQueueFull)})
+            return
+        if self.language is None and probability >= 0.8:
+            # Later segments skip detection once the stream's language is clear
+            self.language = language
+        if previous is not None:
+            await previous
+        self.finals += 1
+        await self.emit({
+            "type": "final",
+            "segment": segment,
+            "text": text.strip(),
+            "language": language,
+            "start": round(start, 2),
+            "end": round(end, 2),
+            "decode_ms": round((time.monotonic() - started) * 1000, 1)
+        })
+
+    async def finish(self):
+        """End of stream: finalize whatever speech is buffered and wait for every segment"""
+        if self._speech_start is not None:
+            self._finalize(self._start + len(self._buffer))
+        if self._final_task is not None:
+            await self._final_task
+
+    def cancel(self):
+        for task in list(self._tasks):
+            task.cancel()
+
+    def stats(self) -> Dict:
+        return {
+            "audio_seconds": round(self.audio_seconds, 2),
+            "segments": self.segment,
+            "finals": self.finals,
+            "partials": self.partials,
+            "partials_skipped": self.partials_skipped
+        }
@@ -0,0 +1,116 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# run_batch(audios, languages) -> [(text, language, language_probability), ...]
+BatchRunner = Callable[[List[np.ndarray], List[Optional[str]]], Awaitable[List[Tuple[str, str, float]]]]
+
+
+class _PendingClip:
+    __slots__ = ("audio", "language", "future", "enqueued")
+
+    def __init__(self, audio: np.ndarray, language: Optional[str], future: asyncio.Future, enqueued: float):
+        self.audio = audio
+        self.language = language
+        self.future = future
+        self.enqueued = enqueued
+
+
+class MicroBatchScheduler:
+    """Collects concurrent clips for a short window, or until a batch is full, and transcribes them together"""
+
+    def __init__(self, run_batch: BatchRunner, max_batch_size: int = 8, max_wait_ms: float = 15.0,
+                 max_concurrent_batches: int = 1):
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        # One batch per replica; while they are all busy new arrivals pile up into bigger batches
+        self._slots = asyncio.Semaphore(max_concurrent_batches)
+        self._pending: List[_PendingClip] = []
+        self._wake = asyncio.Event()
+        self._collector = None
+
+        self.clips = 0
+        self.batches = 0
+        self.failed_batches = 0
+        self.largest_batch = 0
+        self.queue_seconds = 0.0
+        self.batch_seconds = 0.0
+
+    async def submit(self, audio: np.ndarray, language: Optional[str] = None) -> Tuple[str, str, float]:
+        """Queue one clip and wait for its (text, language, probability) from whichever batch picks it up"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append(_PendingClip(audio, language, future, loop.time()))
+        self._wake.set()
+        if self._collector is None or self._collector.done():
+            self._collector = asyncio.ensure_future(self._collect())
+        return await future
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        while self._pending:
+            await self._slots.acquire()
+            # The window is measured from the oldest waiting clip, so time spent queued
+            # behind a busy replica already counts against it
+            deadline = self._pending[0].enqueued + self.max_wait if self._pending else loop.time()
+            while len(self._pending) < self.max_batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), remaining)
+                except asyncio.TimeoutError:
+                    break
+
+            batch = [p for p in self._pending[:self.max_batch_size] if not p.future.done()]
+            del self._pending[:self.max_batch_size]
+            if not batch:
+                self._slots.release()
+                continue
+            asyncio.ensure_future(self._run(batch))
+
+    async def _run(self, batch: List[_PendingClip]):
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        self.batches += 1
+        self.clips += len(batch)
+        self.largest_batch = max(self.largest_batch, len(batch))
+        self.queue_seconds += sum(started - p.enqueued for p in batch)
+        try:
+            results = await self.run_batch([p.audio for p in batch], [p.language for p in batch])
+        except Exception as e:
+            self.failed_batches += 1
+            logger.error(f"Transcription batch of {len(batch)} failed: {e}")
+            for p in batch:
+                if not p.future.done():
+                    p.future.set_exception(e)
+            return
+        finally:
+            self.batch_seconds += loop.time() - started
+            self._slots.release()
+        for p, result in zip(batch, results):
+            if not p.future.done():
+                p.future.set_result(result)
+
+    def stats(self) -> Dict:
+        """Return batch sizes and where batched clips spent their time"""
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": round(self.max_wait * 1000, 1),
+            "pending": len(self._pending),
+            "clips": self.clips,
+            "batches": self.batches,
+            "failed_batches": self.failed_batches,
+            "avg_batch_size": round(self.clips / self.batches, 2) if self.batches else None,
+            "largest_batch": self.largest_batch,
+            "avg_queue_ms": round(self.queue_seconds / self.clips * 1000, 1) if self.clips else None,
+            "avg_batch_ms": round(self.batch_seconds / self.batches * 1000, 1) if self.batches else None
+        }
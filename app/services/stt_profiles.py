@@ -0,0 +1,120 @@
+import json
+import logging
+import re
+from typing import Dict, List, Optional
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class STTProfile:
+    """One way to run Whisper: model size, compute type, threads per replica and beam width"""
+
+    __slots__ = ("name", "model_size", "compute_type", "cpu_threads", "beam_size")
+
+    def __init__(self, name: str, model_size: str, compute_type: str = "int8", cpu_threads: int = 0,
+                 beam_size: int = 5):
+        self.name = name
+        self.model_size = model_size
+        self.compute_type = compute_type
+        self.cpu_threads = cpu_threads  # 0: share the machine's cores between the replicas
+        self.beam_size = beam_size
+
+    def to_dict(self) -> Dict:
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+
+# Ordered roughly from cheapest to most accurate
+PROFILES = {profile.name: profile for profile in [
+    STTProfile("tiny-int8-greedy", "tiny", "int8", beam_size=1),
+    STTProfile("base-int8-greedy", "base", "int8", beam_size=1),
+    STTProfile("base-int8", "base", "int8", beam_size=5),
+    STTProfile("small-int8-greedy", "small", "int8", beam_size=1),
+    STTProfile("small-int8", "small", "int8", beam_size=5),
+    STTProfile("small-int8_float32", "small", "int8_float32", beam_size=5),
+    STTProfile("medium-int8", "medium", "int8", beam_size=5),
+]}
+
+# What STT_PROFILE=auto runs before stt_benchmark.py has measured this machine, e.g. on a fresh checkout
+# where stt_samples/ has no recordings yet: the WHISPER_MODEL_SIZE default, int8 on CPU, full beam search
+DEFAULT_PROFILE = "small-int8"
+
+
+def get_profile(name: str) -> STTProfile:
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Unknown STT profile {name!r}; choose from {', '.join(PROFILES)}")
+
+
+def _words(text: str) -> List[str]:
+    """Lowercase words without punctuation, so scoring ignores formatting"""
+    return re.findall(r"[a-z0-9']+", text.lower())
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """(substitutions + deletions + insertions) / reference words, by word-level edit distance"""
+    ref, hyp = _words(reference), _words(hypothesis)
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i] + [0] * len(hyp)
+        for j, hyp_word in enumerate(hyp, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_word != hyp_word))
+        previous = current
+    return previous[-1] / len(ref)
+
+
+def select_profile(results: Dict[str, Dict], max_wer: float, max_rtf: float) -> Optional[str]:
+    """The fastest measured profile within both targets, or None if none qualifies"""
+    eligible = [
+        (measured["rtf"], name) for name, measured in results.items()
+        if name in PROFILES and measured.get("wer") is not None and measured.get("rtf") is not None
+        and measured["wer"] <= max_wer and measured["rtf"] <= max_rtf
+    ]
+    return min(eligible)[1] if eligible else None
+
+
+def load_results(path: str) -> Dict[str, Dict]:
+    """Profile measurements written by `stt_benchmark.py profiles`; empty if not benchmarked yet"""
+    try:
+        with open(path, "r") as f:
+            return json.load(f).get("profiles", {})
+    except (OSError, ValueError):
+        return {}
+
+
+def resolve_profile(setting: str, results_path: str, max_wer: float, max_rtf: float,
+                    default: Optional[str] = DEFAULT_PROFILE) -> Optional[STTProfile]:
+    """Profile for STT_PROFILE: a registry name, 'auto' to pick from measurements, or 'none'.
+
+    Without measurements 'auto' uses the default profile, or the WHISPER_* settings if default is None.
+    """
+    if setting == "none":
+        return None
+    if setting != "auto":
+        return get_profile(setting)
+
+    results = load_results(results_path)
+    if not results:
+        if default is None:
+            logger.info(f"No STT profile measurements at {results_path}; using WHISPER_* settings")
+            return None
+        logger.info(f"No STT profile measurements at {results_path}; using the default profile {default}")
+        return get_profile(default)
+    name = select_profile(results, max_wer, max_rtf)
+    if name is None:
+        # Nothing meets both targets: favour accuracy, the cheaper failure for a voice assistant
+        measured = [(m["wer"], m["rtf"], name) for name, m in results.items()
+                    if name in PROFILES and m.get("wer") is not None and m.get("rtf") is not None]
+        if not measured:
+            return get_profile(default) if default is not None else None
+        name = min(measured)[2]
+        logger.warning(f"No STT profile meets WER <= {max_wer} and RTF <= {max_rtf}; "
+                       f"using the most accurate measured profile, {name}")
+    else:
+        logger.info(f"Selected STT profile {name} (WER {results[name]['wer']:.3f}, RTF {results[name]['rtf']:.3f})")
+    return PROFILES[name]
+
@@ -0,0 +1,121 @@
+import logging
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Tuple
+from app.utils.cache import TTLCache
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PRIORITY_LEVELS = {"high": 3, "medium": 2, "low": 1}
+
+
+def priority_emoji(task: Dict) -> str:
+    return "🔴" if task['priority'] == "high" else "🟡" if task['priority'] == "medium" else "🟢"
+
+
+def status_emoji(task: Dict) -> str:
+    return "✅" if task['status'] == "completed" else "🔄" if task['status'] == "in progress" else "⏳"
+
+
+class TaskContextBuilder:
+    """Builds the task context given to the LLM from one snapshot of tasks.json"""
+
+    def __init__(self, task_service, max_entries: int = 64, upcoming_days: int = 7):
+        self.task_service = task_service
+        self.upcoming_days = upcoming_days
+        # Rendered sections per (user, store version, date); a new version or day is a new key
+        self._cache = TTLCache(max_entries=max_entries, ttl_seconds=24 * 3600)
+
+    def build(self, user_id: str) -> str:
+        """Return the rendered task context for a user"""
+        return "\n".join(text for _, text in self.build_sections(user_id))
+
+    def build_sections(self, user_id: str) -> List[Tuple[str, str]]:
+        """Return the task context as (section name, rendered text) pairs"""
+        today = date.today()
+        cache_key = f"{user_id}|{self.task_service.get_store_version()}|{today.isoformat()}"
+        sections = self._cache.get(cache_key)
+        if sections is None:
+            tasks = self.task_service.get_snapshot().get(user_id, [])
+            sections = self._render_sections(tasks, today)
+            self._cache.set(cache_key, sections)
+        return sections
+
+    def _render_sections(self, tasks: List[Dict], today: date) -> List[Tuple[str, str]]:
+        """Compute every context section in a single pass over the user's tasks"""
+        today_iso = today.isoformat()
+        upcoming_end = (today + timedelta(days=self.upcoming_days)).isoformat()
+
+        today_tasks, upcoming_tasks, daily_tasks = [], [], []
+        highest_priority = None
+        status_counts = {"completed": 0, "pending": 0, "in progress": 0}
+
+        for task in tasks:
+            status = task.get("status")
+            if status in status_counts:
+                status_counts[status] += 1
+            if status == "completed":
+                continue
+
+            due_date = task.get("due_date", "")
+            if due_date == today_iso:
+                today_tasks.append(task)
+            if today_iso <= due_date <= upcoming_end:
+                upcoming_tasks.append(task)
+            if task.get("frequency") == "daily":
+                daily_tasks.append(task)
+
+            # Strict comparison keeps the first task of the highest priority, like max()
+            level = PRIORITY_LEVELS.get(task.get("priority", "low"), 0)
+            if highest_priority is None or level > PRIORITY_LEVELS.get(highest_priority.get("priority", "low"), 0):
+                highest_priority = task
+
+        sections = [("date", f"📅 Today's Date: {datetime.now().strftime('%B %d, %Y')}")]
+
+        if today_tasks:
+            lines = [f"\n📋 TODAY'S TASKS ({len(today_tasks)} tasks):"]
+            for task in today_tasks:
+                lines.append(f"  {status_emoji(task)} {priority_emoji(task)} {task['title']}")
+                if task.get('description', '').strip():
+                    lines.append(f"      Description: {task['description']}")
+                lines.append(f"      Priority: {task['priority']} | Status: {task['status']}")
+            sections.append(("today", "\n".join(lines)))
+        else:
+            sections.append(("today", "\n📋 TODAY'S TASKS: No tasks scheduled for today"))
+
+        if highest_priority:
+            sections.append(("priority", "\n".join([
+                "\n🚨 HIGHEST PRIORITY TASK:",
+                f"   {highest_priority['title']}",
+                f"   Due: {highest_priority['due_date']} | Status: {highest_priority['status']}"
+            ])))
+
+        if upcoming_tasks:
+            lines = [f"\n📈 UPCOMING TASKS (Next {self.upcoming_days} days - {len(upcoming_tasks)} tasks):"]
+            for task in upcoming_tasks[:5]:  # Limit to 5 for brevity
+                lines.append(f"  {priority_emoji(task)} {task['title']} (Due: {task['due_date']})")
+            if len(upcoming_tasks) > 5:
+                lines.append(f"  ... and {len(upcoming_tasks) - 5} more tasks")
+            sections.append(("upcoming", "\n".join(lines)))
+        else:
+            sections.append(("upcoming", f"\n📈 UPCOMING TASKS: No upcoming tasks in the next {self.upcoming_days} days"))
+
+        if daily_tasks:
+            lines = [f"\n🔄 DAILY RECURRING TASKS ({len(daily_tasks)} tasks):"]
+            for task in daily_tasks:
+                lines.append(f"  {priority_emoji(task)} {task['title']} (Priority: {task['priority']})")
+            sections.append(("daily", "\n".join(lines)))
+
+        if tasks:
+            sections.append(("summary", "\n".join([
+                "\n📊 TASK SUMMARY:",
+                f"   Total Tasks: {len(tasks)}",
+                f"   Completed: {status_counts['completed']} | In Progress: {status_counts['in progress']} | Pending: {status_counts['pending']}"
+            ])))
+
+        return sections
+
+    def stats(self) -> Dict:
+        """Return cache counters for monitoring"""
+        return self._cache.stats()
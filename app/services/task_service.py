@@ -5,6 +5,10 @@ from datetime import datetime, date
 from ..utils.date_parser import FlexibleDateParser
 
 class TaskService:
+    # Bumped on every write from this process so same-size rewrites within the
+    # filesystem timestamp granularity still produce a new store version
+    _write_generation = 0
+
     def __init__(self):
         self.tasks_file = "tasks.json"
         self.date_parser = FlexibleDateParser()
@@ -28,6 +32,19 @@ class TaskService:
     def _save_tasks(self, tasks: Dict):
         with open(self.tasks_file, "w") as f:
             json.dump(tasks, f, indent=4)
+        TaskService._write_generation += 1
+
+    def get_snapshot(self) -> Dict:
+        """Load every user's tasks from tasks.json in one read"""
+        return self._load_tasks()
+
+    def get_store_version(self) -> str:
+        """Return a cheap version stamp of tasks.json that changes whenever the file is written"""
+        try:
+            stat = os.stat(self.tasks_file)
+        except OSError:
+            return f"{TaskService._write_generation}-missing"
+        return f"{TaskService._write_generation}-{stat.st_mtime_ns}-{stat.st_size}"
 
     def get_all_tasks(self, user_id: str) -> List[Dict]:
         """Get all tasks for a user"""
@@ -0,0 +1,173 @@
+import json
+import logging
+from typing import Dict, List
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Function schemas offered to the model in tool-calling mode
+TASK_TOOLS = [
+    {
+        "type": "function",
+        "function": {
+            "name": "get_tasks_for_date",
+            "description": "List the user's tasks due on one date.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "date": {"type": "string", "description": "Date as YYYY-MM-DD"}
+                },
+                "required": ["date"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_upcoming_tasks",
+            "description": "List incomplete tasks due from today through the next N days.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "days": {"type": "integer", "description": "Number of days ahead, default 7"}
+                }
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "search_tasks_by_keyword",
+            "description": "Find tasks whose title or description contains a keyword.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "keyword": {"type": "string"}
+                },
+                "required": ["keyword"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "create_task",
+            "description": "Create a new task for the user.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "title": {"type": "string"},
+                    "description": {"type": "string"},
+                    "due_date": {"type": "string", "description": "YYYY-MM-DD or natural language such as 'tomorrow'"},
+                    "priority": {"type": "string", "enum": ["high", "medium", "low"]},
+                    "frequency": {"type": "string", "enum": ["once", "daily", "weekly", "monthly"]}
+                },
+                "required": ["title"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "update_task_status",
+            "description": "Change the status of a task identified by its exact title.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "title": {"type": "string"},
+                    "status": {"type": "string", "enum": ["pending", "in progress", "completed"]}
+                },
+                "required": ["title", "status"]
+            }
+        }
+    },
+]
+
+# Tools that change tasks.json; answers produced with them must not be cached
+MUTATING_TOOLS = {"create_task", "update_task_status"}
+
+# Fields returned to the model for each task; timestamps and ids only cost tokens
+TASK_FIELDS = ("title", "description", "due_date", "priority", "frequency", "status")
+
+TOOL_PARAMETERS = {tool["function"]["name"]: tool["function"]["parameters"] for tool in TASK_TOOLS}
+JSON_TYPES = {"string": str, "integer": int}
+
+
+class TaskToolExecutor:
+    """Runs the model's tool calls against TaskService and returns compact JSON results"""
+
+    def __init__(self, task_service, max_results: int = 20):
+        self.task_service = task_service
+        self.max_results = max_results
+        self.calls = {tool["function"]["name"]: 0 for tool in TASK_TOOLS}
+        self.errors = 0
+
+    def _task_list(self, tasks: List[Dict]) -> Dict:
+        tasks = sorted(tasks, key=lambda t: t.get("due_date", ""))
+        return {
+            "count": len(tasks),
+            "tasks": [{field: task[field] for field in TASK_FIELDS if task.get(field)} for task in tasks[:self.max_results]],
+            "truncated": len(tasks) > self.max_results
+        }
+
+    @staticmethod
+    def _validate(name: str, args) -> Dict:
+        """Check the model's arguments against the tool's schema before touching any task"""
+        schema = TOOL_PARAMETERS.get(name)
+        if schema is None:
+            raise ValueError(f"Unknown tool: {name}")
+        if not isinstance(args, dict):
+            raise ValueError("Arguments must be a JSON object")
+        for field in schema.get("required", ()):
+            if field not in args:
+                raise ValueError(f"Missing required argument: {field}")
+        for field, value in args.items():
+            spec = schema["properties"].get(field)
+            if spec is None:
+                raise ValueError(f"Unexpected argument: {field}")
+            expected = JSON_TYPES[spec["type"]]
+            if not isinstance(value, expected) or isinstance(value, bool):
+                raise ValueError(f"Argument {field} must be of type {spec['type']}")
+            if "enum" in spec and value not in spec["enum"]:
+                raise ValueError(f"Argument {field} must be one of {', '.join(spec['enum'])}")
+        return args
+
+    def _run(self, name: str, args: Dict, user_id: str) -> Dict:
+        if name == "get_tasks_for_date":
+            return self._task_list(self.task_service.get_tasks_for_date(user_id, args["date"]))
+        if name == "get_upcoming_tasks":
+            return self._task_list(self.task_service.get_upcoming_tasks(user_id, args.get("days", 7)))
+        if name == "search_tasks_by_keyword":
+            return self._task_list(self.task_service.search_tasks_by_keyword(user_id, args["keyword"]))
+        if name == "create_task":
+            created = self.task_service.create_task(
+                user_id,
+                args["title"],
+                description=args.get("description", ""),
+                due_date=args.get("due_date"),
+                priority=args.get("priority", "medium"),
+                frequency=args.get("frequency", "once")
+            )
+            return {"created": created, "title": args["title"]}
+        if name == "update_task_status":
+            updated = self.task_service.update_task_status(user_id, args["title"], args["status"])
+            return {"updated": updated, "title": args["title"], "status": args["status"]}
+        raise ValueError(f"Unknown tool: {name}")
+
+    def execute(self, name: str, arguments: str, user_id: str) -> str:
+        """Run one tool call and return its result as a JSON string for the tool message"""
+        try:
+            args = self._validate(name, json.loads(arguments or "{}"))
+            result = self._run(name, args, user_id)
+            self.calls[name] += 1
+        except Exception as e:
+            # Errors go back to the model so it can correct its arguments or tell the user
+            self.errors += 1
+            logger.warning(f"Tool call {name} failed: {e}")
+            result = {"error": str(e)}
+        return json.dumps(result, ensure_ascii=False, separators=(",", ":"))
+
+    def stats(self) -> Dict:
+        """Return tool call counters for monitoring"""
+        return {"calls": dict(self.calls), "errors": self.errors}
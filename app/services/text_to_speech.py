@@ -1,3 +1,4 @@
+import asyncio
 import io
 from gtts import gTTS
 
@@ -5,6 +6,13 @@ class TextToSpeechService:
     def __init__(self):
         pass
         
+    def _synthesize_sync(self, text, language):
+        """Blocking gTTS call: one HTTP round trip per chunk of text"""
+        audio_buffer = io.BytesIO()
+        tts = gTTS(text=text, lang=language, slow=False)
+        tts.write_to_fp(audio_buffer)
+        return audio_buffer.getvalue()
+        
     async def synthesize(self, text, voice_id="en"):
         """Convert text to speech using Google TTS"""
         try:
@@ -16,15 +24,14 @@ class TextToSpeechService:
                 language = "es"
             # Add more language mappings as needed
             
-            # Generate speech
-            audio_buffer = io.BytesIO()
-            tts = gTTS(text=text, lang=language, slow=False)
-            tts.write_to_fp(audio_buffer)
-            audio_buffer.seek(0)
+            # Generate speech off the event loop, so a voice turn can keep streaming the LLM reply
+            audio_data = await asyncio.get_running_loop().run_in_executor(
+                None, self._synthesize_sync, text, language
+            )
             
             return {
                 "success": True, 
-                "audio_data": audio_buffer.read(),
+                "audio_data": audio_data,
                 "sample_rate": 24000  # gTTS standard sample rate
             }
             
@@ -0,0 +1,275 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SAFE_USER_ID = re.compile(r"[A-Za-z0-9_-]{1,64}")
+INDEX_FILE = "index.json"
+
+
+class TranscriptStore:
+    """Append-only, segmented on-disk chat transcripts per user with a sparse offset index"""
+
+    def __init__(self, base_dir: str = "data/transcripts", segment_max_records: int = 500,
+                 index_every: int = 50, retention_days: float = 30.0, max_cached_users: int = 1000):
+        self.base_dir = base_dir
+        self.segment_max_records = segment_max_records
+        self.index_every = index_every
+        self.retention_seconds = retention_days * 86400
+        self.max_cached_users = max_cached_users
+        self._indexes = OrderedDict()  # User dir -> segment index, least recently used first
+        self._lock = threading.Lock()
+        self.appended = 0
+        self.segments_read = 0
+        self.segments_deleted = 0
+        self.users_expired = 0
+        os.makedirs(self.base_dir, exist_ok=True)
+
+    def _user_dir(self, user_id: str) -> str:
+        if SAFE_USER_ID.fullmatch(user_id):
+            name = user_id
+        else:
+            name = hashlib.sha256(user_id.encode("utf-8")).hexdigest()[:32]
+        return os.path.join(self.base_dir, name)
+
+    @staticmethod
+    def _segment_name(first_seq: int) -> str:
+        return f"{first_seq:012d}.jsonl"
+
+    def _scan_segment(self, path: str, segment: Dict, offset: int = 0):
+        """Bring a segment's index entry up to date with the records on disk from offset onwards"""
+        with open(path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break  # A torn final write, truncated by _load_index
+                if segment["count"] % self.index_every == 0:
+                    segment["marks"].append([record["seq"], offset])
+                if segment["count"] == 0:
+                    segment["first_ts"] = record["ts"]
+                segment["count"] += 1
+                segment["last_seq"] = record["seq"]
+                segment["last_ts"] = record["ts"]
+                offset += len(line)
+        segment["bytes"] = offset
+
+    def _new_segment(self, first_seq: int) -> Dict:
+        return {
+            "name": self._segment_name(first_seq),
+            "first_seq": first_seq,
+            "last_seq": first_seq - 1,
+            "first_ts": None,
+            "last_ts": None,
+            "count": 0,
+            "bytes": 0,
+            "marks": []
+        }
+
+    def _load_index(self, user_id: str) -> List[Dict]:
+        """Load a user's segment index, repairing it from the segment files if it is stale"""
+        user_dir = self._user_dir(user_id)
+        index = self._indexes.get(user_dir)
+        if index is not None:
+            self._indexes.move_to_end(user_dir)
+            return index
+
+        index = []
+        try:
+            with open(os.path.join(user_dir, INDEX_FILE), "r") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+        on_disk = sorted(name for name in os.listdir(user_dir) if name.endswith(".jsonl")) \
+            if os.path.isdir(user_dir) else []
+        known = {segment["name"]: segment for segment in index}
+        index = []
+        for name in on_disk:
+            path = os.path.join(user_dir, name)
+            segment = known.get(name)
+            if segment is None:
+                segment = self._new_segment(int(name.split(".")[0]))
+                self._scan_segment(path, segment)
+            elif os.path.getsize(path) != segment["bytes"]:
+                # Records appended after the index was last saved
+                self._scan_segment(path, segment, segment["bytes"])
+            if os.path.getsize(path) > segment["bytes"]:
+                # Drop a torn final write so new records start on a clean line
+                os.truncate(path, segment["bytes"])
+            if segment["count"]:
+                index.append(segment)
+            else:
+                os.remove(path)
+
+        self._indexes[user_dir] = index
+        # Idle users' indexes are dropped; the next access reloads them from index.json and the segments
+        while len(self._indexes) > self.max_cached_users:
+            self._indexes.popitem(last=False)
+        return index
+
+    def _save_index(self, user_id: str, index: List[Dict]):
+        user_dir = self._user_dir(user_id)
+        path = os.path.join(user_dir, INDEX_FILE)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(index, f)
+        os.replace(tmp_path, path)
+
+    def append(self, user_id: str, user_text: str, assistant_text: str, ts: Optional[float] = None) -> int:
+        """Append one chat turn and return its sequence number"""
+        ts = time.time() if ts is None else ts
+        with self._lock:
+            index = self._load_index(user_id)
+            user_dir = self._user_dir(user_id)
+            os.makedirs(user_dir, exist_ok=True)
+
+            rolled = False
+            if not index or index[-1]["count"] >= self.segment_max_records:
+                next_seq = index[-1]["last_seq"] + 1 if index else 0
+                index.append(self._new_segment(next_seq))
+                rolled = True
+            segment = index[-1]
+
+            seq = segment["last_seq"] + 1
+            line = json.dumps({"seq": seq, "ts": ts, "user": user_text, "bot": assistant_text},
+                              ensure_ascii=False).encode("utf-8") + b"\n"
+            with open(os.path.join(user_dir, segment["name"]), "ab") as f:
+                f.write(line)
+
+            marked = segment["count"] % self.index_every == 0
+            if marked:
+                segment["marks"].append([seq, segment["bytes"]])
+            if segment["count"] == 0:
+                segment["first_ts"] = ts
+            segment["count"] += 1
+            segment["last_seq"] = seq
+            segment["last_ts"] = ts
+            segment["bytes"] += len(line)
+            self.appended += 1
+
+            # The index is only a shortcut; anything newer than the saved copy is recovered by scanning
+            if marked:
+                self._save_index(user_id, index)
+            if rolled:
+                self._apply_retention(user_id, index, ts)
+            return seq
+
+    def _read_range(self, user_id: str, segment: Dict, start_seq: int, end_seq: int) -> List[Dict]:
+        """Read records with start_seq <= seq < end_seq from one segment, seeking via its sparse marks"""
+        offset = 0
+        for mark_seq, mark_offset in segment["marks"]:
+            if mark_seq > start_seq:
+                break
+            offset = mark_offset
+
+        records = []
+        self.segments_read += 1
+        try:
+            with open(os.path.join(self._user_dir(user_id), segment["name"]), "rb") as f:
+                f.seek(offset)
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break
+                    if record["seq"] >= end_seq:
+                        break
+                    if record["seq"] >= start_seq:
+                        records.append(record)
+        except FileNotFoundError:
+            pass  # Deleted by retention while we were paging
+        return records
+
+    def read_page(self, user_id: str, cursor: Optional[str] = None, limit: int = 20) -> Dict:
+        """Return up to limit turns older than cursor, newest first, and the cursor for the next page"""
+        with self._lock:
+            index = list(self._load_index(user_id))
+        if not index:
+            return {"messages": [], "next_cursor": None}
+
+        before = int(cursor) if cursor else index[-1]["last_seq"] + 1
+        start = max(index[0]["first_seq"], before - limit)
+
+        records = []
+        # Only segments overlapping [start, before) are opened
+        for segment in reversed(index):
+            if segment["first_seq"] >= before:
+                continue
+            if segment["last_seq"] < start:
+                break
+            records[:0] = self._read_range(user_id, segment, start, before)
+
+        records.reverse()
+        next_cursor = str(start) if start > index[0]["first_seq"] else None
+        return {"messages": records, "next_cursor": next_cursor}
+
+    def _apply_retention(self, user_id: str, index: List[Dict], now: float, include_last: bool = False):
+        """Delete whole segments whose newest record is past retention.
+
+        The segment being appended to is kept unless include_last is set; the periodic sweep sets it
+        so users who stopped chatting expire completely.
+        """
+        cutoff = now - self.retention_seconds
+        expired = 0
+        keep = 0 if include_last else 1
+        while len(index) > keep and index[0]["last_ts"] < cutoff:
+            segment = index.pop(0)
+            try:
+                os.remove(os.path.join(self._user_dir(user_id), segment["name"]))
+            except OSError:
+                pass
+            expired += 1
+        if not expired:
+            return
+        self.segments_deleted += expired
+        logger.info(f"Deleted {expired} expired transcript segments for {user_id}")
+        if index:
+            self._save_index(user_id, index)
+            return
+        # Nothing left: forget the user entirely
+        user_dir = self._user_dir(user_id)
+        self._indexes.pop(user_dir, None)
+        shutil.rmtree(user_dir, ignore_errors=True)
+        self.users_expired += 1
+
+    def apply_retention(self, now: Optional[float] = None):
+        """Run retention over every user's transcripts, including users who are no longer active"""
+        now = time.time() if now is None else now
+        with self._lock:
+            for name in os.listdir(self.base_dir):
+                if os.path.isdir(os.path.join(self.base_dir, name)):
+                    self._apply_retention(name, self._load_index(name), now, include_last=True)
+
+    async def run_retention(self, interval_seconds: float = 3600.0):
+        """Apply retention now and then every interval_seconds; disk work runs off the event loop"""
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                await loop.run_in_executor(None, self.apply_retention)
+            except OSError as e:
+                logger.error(f"Transcript retention failed: {e}")
+            await asyncio.sleep(interval_seconds)
+
+    def stats(self) -> Dict:
+        """Return store counters for monitoring"""
+        return {
+            "users_loaded": len(self._indexes),
+            "appended": self.appended,
+            "segments_read": self.segments_read,
+            "segments_deleted": self.segments_deleted,
+            "users_expired": self.users_expired,
+            "retention_days": self.retention_seconds / 86400
+        }
@@ -0,0 +1,215 @@
+import asyncio
+import logging
+import re
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from app.services.rate_limiter import PRIORITY_INTERACTIVE
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# End of a sentence: terminal punctuation, optional closing quotes or brackets, then whitespace.
+# Requiring the whitespace keeps "3.5" and "e.g.x" whole while the text is still arriving.
+SENTENCE_END = re.compile(r"[.!?;:]+[\"')\]]*\s+|\n+")
+
+
+class SentenceSplitter:
+    """Cuts a growing answer into sentences as soon as each one is complete.
+
+    feed() takes the whole text so far, not a delta. A text that is a prefix of what has already been
+    consumed is a restarted attempt catching up and yields nothing. A text that diverges from it is a
+    different answer: a retried or hedged attempt sampled anew, or the fallback reply after a failed
+    stream. The splitter then rewinds to the last sentence both share and carries on from there.
+    Sentences shorter than min_chars are joined to the next so TTS is not called for every "Sure."
+    """
+
+    def __init__(self, min_chars: int = 20):
+        self.min_chars = min_chars
+        self.offset = 0
+        self.consumed = ""
+        self.ends = []
+        self.restarts = 0
+
+    def _rewind(self, text: str):
+        """Go back to the end of the last consumed sentence that text also starts with"""
+        self.restarts += 1
+        self.ends = [end for end in self.ends if text[:end] == self.consumed[:end]]
+        self.offset = self.ends[-1] if self.ends else 0
+        self.consumed = self.consumed[:self.offset]
+
+    def _continues(self, text: str) -> bool:
+        # The whitespace after a sentence may not have arrived yet, or never will at the very end
+        return text.startswith(self.consumed.rstrip())
+
+    def feed(self, text: str) -> List[str]:
+        if not self._continues(text):
+            if self.consumed.startswith(text):
+                return []
+            self._rewind(text)
+        sentences = []
+        start = self.offset = min(self.offset, len(text))
+        for match in SENTENCE_END.finditer(text, self.offset):
+            if len(text[start:match.end()].strip()) >= self.min_chars:
+                sentences.append(text[start:match.end()].strip())
+                start = match.end()
+                self.ends.append(start)
+        self.offset = start
+        self.consumed = text[:start]
+        return sentences
+
+    def flush(self, text: str) -> List[str]:
+        """Whatever the final text holds beyond the sentences already returned"""
+        if not self._continues(text):
+            # The final text is complete, so a prefix of what was spoken is a different answer too
+            self._rewind(text)
+        sentences = self.feed(text)
+        rest = text[self.offset:].strip()
+        self.offset = len(text)
+        self.consumed = text
+        return sentences + [rest] if rest else sentences
+
+
+class VoiceTurnPipeline:
+    """One spoken turn: speech-to-text, chat and text-to-speech, with the last two overlapped.
+
+    The reply streams from the LLM into a sentence splitter; each finished sentence is synthesized
+    right away while the model keeps generating, and audio goes out in sentence order.
+    """
+
+    def __init__(self, stt_service, chat_pipeline, tts_service, max_tts_concurrency: int = 2,
+                 min_sentence_chars: int = 20):
+        self.stt_service = stt_service
+        self.chat_pipeline = chat_pipeline
+        self.tts_service = tts_service
+        self.tts_slots = asyncio.Semaphore(max_tts_concurrency)
+        self.min_sentence_chars = min_sentence_chars
+
+        self.turns = 0
+        self.errors = 0
+        self.sentences = 0
+        self.restarts = 0
+        self.total_ms = {"stt": 0.0, "first_audio": 0.0, "turn": 0.0}
+        self.timed_turns = {"stt": 0, "first_audio": 0, "turn": 0}
+
+    async def _synthesize(self, text: str, voice_id: str) -> Dict:
+        async with self.tts_slots:
+            started = time.perf_counter()
+            result = await self.tts_service.synthesize(text, voice_id)
+            result["elapsed_ms"] = (time.perf_counter() - started) * 1000
+            return result
+
+    async def _send_audio(self, queue: asyncio.Queue, emit: Callable[[Dict], Awaitable[None]],
+                          emit_bytes: Callable[[bytes], Awaitable[None]], timings: Dict[str, float],
+                          turn_started: float):
+        """Send each sentence's text and audio in order, waiting on its synthesis if it is not done yet"""
+        timings["tts"] = 0.0
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            index, sentence, task = item
+            await emit({"type": "text", "index": index, "text": sentence})
+            result = await task
+            timings["tts"] += result["elapsed_ms"]
+            if not result["success"]:
+                # One sentence failing to synthesize should not silence the rest of the reply
+                await emit({"type": "error", "stage": "tts", "index": index,
+                            "error": result.get("error", "Failed to synthesize speech")})
+                continue
+            if "first_audio" not in timings:
+                timings["first_audio"] = (time.perf_counter() - turn_started) * 1000
+            await emit({"type": "audio", "index": index, "format": "mp3", "bytes": len(result["audio_data"])})
+            await emit_bytes(result["audio_data"])
+
+    async def run(self, audio_bytes: bytes, emit: Callable[[Dict], Awaitable[None]],
+                  emit_bytes: Callable[[bytes], Awaitable[None]], user_id: str = "user_001", voice_id: str = "en",
+                  language: Optional[str] = None, sample_format: Optional[str] = None) -> Dict[str, float]:
+        """Answer one utterance out loud and return its per-stage timings in milliseconds"""
+        self.turns += 1
+        turn_started = time.perf_counter()
+        timings = {}
+
+        stt = await self.stt_service.transcribe(audio_bytes, sample_format, language, user_id)
+        timings["stt"] = (time.perf_counter() - turn_started) * 1000
+        if not stt["success"]:
+            self.errors += 1
+            await emit({"type": "error", "stage": "stt", "error": stt.get("error", "Failed to transcribe audio")})
+            return timings
+        message = stt["text"].strip()
+        await emit({"type": "transcript", "text": message, "language": stt.get("language"),
+                    "cached": stt.get("cached", False)})
+        if not message:
+            timings["turn"] = (time.perf_counter() - turn_started) * 1000
+            await emit({"type": "done", "response": "", "no_speech": True, "timings": self._round(timings)})
+            return timings
+
+        splitter = SentenceSplitter(self.min_sentence_chars)
+        queue = asyncio.Queue()
+        sender = asyncio.ensure_future(self._send_audio(queue, emit, emit_bytes, timings, turn_started))
+        synthesis = []
+        answered = False
+
+        def speak(sentence: str):
+            task = asyncio.ensure_future(self._synthesize(sentence, voice_id))
+            synthesis.append(task)
+            queue.put_nowait((len(synthesis) - 1, sentence, task))
+
+        async def on_text(text: str):
+            # A streamed answer that lost a deadline race may keep going after the turn ended
+            if answered:
+                return
+            if "first_text" not in timings:
+                timings["first_text"] = (time.perf_counter() - turn_started) * 1000
+            for sentence in splitter.feed(text):
+                speak(sentence)
+
+        try:
+            result, chat_timings = await self.chat_pipeline.run(message, PRIORITY_INTERACTIVE, None, user_id, on_text)
+            answered = True
+            timings.update(chat_timings)
+            if "first_text" not in timings:
+                timings["first_text"] = (time.perf_counter() - turn_started) * 1000
+
+            # Cached, local and non-streamed answers are spoken here in one go; streamed ones only
+            # have their last sentence left, unless the stream broke off and a fallback reply replaced it
+            for sentence in splitter.flush(result["response"]):
+                speak(sentence)
+            queue.put_nowait(None)
+            await sender
+        finally:
+            answered = True
+            # Reached with work pending only when the client went away mid-turn
+            sender.cancel()
+            for task in synthesis:
+                task.cancel()
+
+        timings["turn"] = (time.perf_counter() - turn_started) * 1000
+        self.sentences += len(synthesis)
+        self.restarts += splitter.restarts
+        for stage in self.total_ms:
+            if stage in timings:
+                self.total_ms[stage] += timings[stage]
+                self.timed_turns[stage] += 1
+        logger.info(f"Voice turn: {len(synthesis)} sentences, "
+                    + ", ".join(f"{stage}={ms:.0f}ms" for stage, ms in timings.items()))
+        await emit({"type": "done", "response": result["response"], "timings": self._round(timings)})
+        return timings
+
+    @staticmethod
+    def _round(timings: Dict[str, float]) -> Dict[str, float]:
+        return {stage: round(ms, 2) for stage, ms in timings.items()}
+
+    def stats(self) -> Dict:
+        """Return turn counters and average stage latencies"""
+        return {
+            "turns": self.turns,
+            "errors": self.errors,
+            "sentences": self.sentences,
+            "restarts": self.restarts,
+            "avg_ms": {
+                stage: round(self.total_ms[stage] / self.timed_turns[stage], 2) if self.timed_turns[stage] else None
+                for stage in self.total_ms
+            }
+        }
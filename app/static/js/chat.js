@@ -91,7 +91,7 @@ document.addEventListener('DOMContentLoaded', () => {
     }
 
     // Send a message to the Groq-powered API
-    async function sendMessage(message) {
+    async function sendMessage(message, priority = 'normal', latencyBudgetMs = null) {
         try {
             const response = await fetch('/api/v1/chat', {
                 method: 'POST',
@@ -99,7 +99,9 @@ document.addEventListener('DOMContentLoaded', () => {
                     'Content-Type': 'application/json',
                 },
                 body: JSON.stringify({
-                    message: message
+                    message: message,
+                    priority: priority,
+                    latency_budget_ms: latencyBudgetMs
                 }),
             });
 
@@ -162,6 +164,12 @@ document.addEventListener('DOMContentLoaded', () => {
         const message = userInput.value.trim();
         if (!message) return;
         
+        // Voice turns are marked interactive so they are served ahead of other traffic
+        const priority = chatForm.dataset.priority || 'normal';
+        const latencyBudgetMs = chatForm.dataset.latencyBudgetMs ? parseInt(chatForm.dataset.latencyBudgetMs, 10) : null;
+        delete chatForm.dataset.priority;
+        delete chatForm.dataset.latencyBudgetMs;
+        
         // Add user message to chat
         addMessage(message, true);
         
@@ -172,7 +180,7 @@ document.addEventListener('DOMContentLoaded', () => {
         showTypingIndicator();
         
         // Send message and get response
-        await sendMessage(message);
+        await sendMessage(message, priority, latencyBudgetMs);
         
         // Hide typing indicator
         hideTypingIndicator();
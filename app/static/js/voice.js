@@ -141,6 +141,9 @@ document.addEventListener('DOMContentLoaded', () => {
                 
                 // Submit the form with the recognized text
                 setTimeout(() => {
+                    chatForm.dataset.priority = 'interactive';
+                    // Spoken replies should start within ~1.5s; the server answers locally if the LLM is slower
+                    chatForm.dataset.latencyBudgetMs = '1500';
                     chatForm.dispatchEvent(new Event('submit'));
                 }, 300);
             }
@@ -0,0 +1,160 @@
+import logging
+import struct
+from typing import Optional
+
+import numpy as np
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+
+# Headerless PCM wire formats: little-endian 16-bit ints or 32-bit floats, 16 kHz mono
+SAMPLE_FORMATS = {"s16le": np.dtype("<i2"), "f32le": np.dtype("<f4")}
+
+# Content types that mean headerless 16-bit PCM
+PCM16_CONTENT_TYPES = ("audio/l16", "audio/pcm", "audio/x-pcm", "audio/raw")
+
+
+class AudioDecodeError(Exception):
+    """Raised when uploaded bytes cannot be turned into 16 kHz mono samples"""
+
+
+def sniff_container(data: bytes) -> str:
+    """Identify the container from its magic bytes; 'raw' means no known magic, taken as headerless PCM"""
+    head = data[:12]
+    if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+        return "wav"
+    if head[:4] == b"FORM" and head[8:12] in (b"AIFF", b"AIFC"):
+        return "aiff"
+    if head[:5] == b"#!AMR":
+        return "amr"  # Also matches "#!AMR-WB"
+    if head[:4] == b"caff":
+        return "caf"
+    if head[:4] == b"\x1a\x45\xdf\xa3":
+        return "webm"  # Matroska/WebM, what MediaRecorder produces in Chrome and Firefox
+    if head[:4] == b"OggS":
+        return "ogg"
+    if head[:4] == b"fLaC":
+        return "flac"
+    if head[4:8] == b"ftyp":
+        return "mp4"  # Safari's MediaRecorder output
+    if head[:3] == b"ID3" or (len(head) > 1 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0):
+        return "mp3"
+    return "raw"
+
+
+def sample_format_for(content_type: Optional[str]) -> Optional[str]:
+    """Map an upload's content type to a raw PCM format, if it declares one"""
+    base = (content_type or "").split(";")[0].strip().lower()
+    return "s16le" if base in PCM16_CONTENT_TYPES else None
+
+
+def _to_float32(samples: np.ndarray) -> np.ndarray:
+    if samples.dtype.kind == "i":
+        # One allocation: convert, then scale in place
+        audio = samples.astype(np.float32)
+        audio *= np.float32(1 / 32768)
+        return audio
+    return samples.astype(np.float32, copy=False)
+
+
+def pcm_to_float32(data: bytes, sample_format: str) -> np.ndarray:
+    """Headerless PCM to float32 in [-1, 1]; samples are read from the upload buffer in place"""
+    dtype = SAMPLE_FORMATS[sample_format]
+    return _to_float32(np.frombuffer(data, dtype=dtype, count=len(data) // dtype.itemsize))
+
+
+def _guess_raw_format(data: bytes) -> str:
+    """Older clients sent float32; int16 pairs read as float32 give NaNs, huge values or denormals"""
+    if len(data) % 4:
+        return "s16le"
+    probe = np.abs(np.frombuffer(data, dtype="<f4", count=min(len(data) // 4, 4096)))
+    with np.errstate(invalid="ignore"):
+        plausible = (probe == 0) | ((probe >= 1e-10) & (probe <= 1.5))
+    return "f32le" if plausible.mean() > 0.99 else "s16le"
+
+
+def _wav_fast_path(data: bytes) -> Optional[np.ndarray]:
+    """Decode 16 kHz PCM WAV without ffmpeg; anything needing resampling returns None"""
+    offset = 12
+    fmt = None
+    while offset + 8 <= len(data):
+        chunk_id, size = struct.unpack_from("<4sI", data, offset)
+        body = offset + 8
+        if chunk_id == b"fmt ":
+            if size < 16 or body + 16 > len(data):
+                raise AudioDecodeError("WAV header is truncated")
+            fmt = struct.unpack_from("<HHIIHH", data, body)
+        elif chunk_id == b"data":
+            if fmt is None:
+                return None
+            tag, channels, rate, _, _, bits = fmt
+            if channels == 0:
+                raise AudioDecodeError("WAV header declares no channels")
+            # Streaming writers leave the size at 0 or 0xFFFFFFFF; read to the end then
+            end = len(data) if size in (0, 0xFFFFFFFF) else min(len(data), body + size)
+            if rate != SAMPLE_RATE:
+                return None
+            if tag == 1 and bits == 16:
+                dtype = np.dtype("<i2")
+            elif tag == 3 and bits == 32:
+                dtype = np.dtype("<f4")
+            else:
+                return None
+            count = (end - body) // (dtype.itemsize * channels) * channels
+            samples = np.frombuffer(data, dtype=dtype, offset=body, count=count)
+            audio = _to_float32(samples)
+            if channels > 1:
+                audio = audio.reshape(-1, channels).mean(axis=1, dtype=np.float32)
+            return audio
+        offset = body + size + (size & 1)  # Chunks are word aligned
+    raise AudioDecodeError("WAV file is truncated or has no data chunk")
+
+
+def decode_fast_path(data: bytes, container: str, sample_format: Optional[str] = None) -> Optional[np.ndarray]:
+    """Decode without a subprocess when the bytes are already 16 kHz PCM; otherwise None"""
+    if container == "raw":
+        return pcm_to_float32(data, sample_format or _guess_raw_format(data))
+    if container == "wav":
+        return _wav_fast_path(data)
+    return None
+
+
+def decode_with_ffmpeg(data: bytes, max_seconds: Optional[float] = None) -> np.ndarray:
+    """Any container ffmpeg understands to 16 kHz mono float32, piped through stdin/stdout with no temp files"""
+    try:
+        import ffmpeg
+    except ImportError:
+        raise AudioDecodeError("Decoding compressed audio needs ffmpeg-python and the ffmpeg binary")
+
+    output_options = {"format": "f32le", "acodec": "pcm_f32le", "ac": 1, "ar": SAMPLE_RATE}
+    if max_seconds:
+        output_options["t"] = max_seconds
+    try:
+        out, _ = (
+            ffmpeg
+            .input("pipe:0")
+            .output("pipe:1", **output_options)
+            .global_args("-hide_banner", "-loglevel", "error")
+            .run(input=data, capture_stdout=True, capture_stderr=True)
+        )
+    except FileNotFoundError:
+        raise AudioDecodeError("The ffmpeg binary is not installed")
+    except ffmpeg.Error as e:
+        detail = (e.stderr or b"").decode("utf-8", "replace").strip().splitlines()
+        raise AudioDecodeError(f"ffmpeg could not decode the audio: {detail[-1] if detail else e}")
+    return np.frombuffer(out, dtype=np.float32)
+
+
+def decode_audio(data: bytes, sample_format: Optional[str] = None, max_seconds: Optional[float] = None) -> np.ndarray:
+    """Uploaded bytes in any supported container to 16 kHz mono float32"""
+    if not data:
+        raise AudioDecodeError("Audio is empty")
+    # A declared PCM format wins over magic bytes: raw samples can look like an MP3 frame sync
+    container = "raw" if sample_format else sniff_container(data)
+    audio = decode_fast_path(data, container, sample_format)
+    if audio is None:
+        return decode_with_ffmpeg(data, max_seconds)
+    return audio[:int(max_seconds * SAMPLE_RATE)] if max_seconds else audio
@@ -0,0 +1,141 @@
+from typing import List, Tuple
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+
+def frame_levels_db(audio: np.ndarray, frame_length: int) -> np.ndarray:
+    """RMS level of each complete frame in dBFS, computed for the whole chunk at once"""
+    frames = len(audio) // frame_length
+    if frames == 0:
+        return np.empty(0, dtype=np.float32)
+    framed = audio[:frames * frame_length].reshape(frames, frame_length).astype(np.float32)
+    rms = np.sqrt(np.mean(framed * framed, axis=1))
+    return 20 * np.log10(np.maximum(rms, 1e-10))
+
+
+class StreamingVAD:
+    """Energy-based voice activity detection over a live stream, with an adaptive noise floor.
+
+    push() takes audio in arbitrary chunk sizes and returns ("start", sample) when speech begins
+    and ("end", sample) once the speaker has paused for min_silence_ms. Sample positions count
+    from the start of the stream.
+    """
+
+    def __init__(self, sample_rate: int = SAMPLE_RATE, frame_ms: int = 30, threshold_db: float = 12.0,
+                 min_level_db: float = -50.0, min_speech_ms: int = 90, min_silence_ms: int = 600,
+                 noise_adapt: float = 0.05):
+        self.sample_rate = sample_rate
+        self.frame_length = int(sample_rate * frame_ms / 1000)
+        self.threshold_db = threshold_db
+        self.min_level_db = min_level_db
+        self.min_speech_frames = max(1, min_speech_ms // frame_ms)
+        self.min_silence_frames = max(1, min_silence_ms // frame_ms)
+        self.noise_adapt = noise_adapt
+
+        self.noise_db = min_level_db - threshold_db
+        self.in_speech = False
+        self._run = 0  # Consecutive frames disagreeing with the current state
+        self._frames = 0
+        self._remainder = np.empty(0, dtype=np.float32)
+
+    def push(self, audio: np.ndarray) -> List[Tuple[str, int]]:
+        audio = np.concatenate([self._remainder, audio]) if len(self._remainder) else audio
+        levels = frame_levels_db(audio, self.frame_length)
+        self._remainder = audio[len(levels) * self.frame_length:]
+
+        events = []
+        for level in levels:
+            speech = level > max(self.noise_db + self.threshold_db, self.min_level_db)
+            if not speech:
+                # Only quiet frames move the floor, so a long sentence cannot raise it
+                self.noise_db += self.noise_adapt * (level - self.noise_db)
+
+            if speech != self.in_speech:
+                self._run += 1
+            else:
+                self._run = 0
+            self._frames += 1
+
+            needed = self.min_silence_frames if self.in_speech else self.min_speech_frames
+            if self._run >= needed:
+                self.in_speech = speech
+                # The change happened where the run began, not where it was confirmed
+                events.append(("start" if speech else "end", (self._frames - self._run) * self.frame_length))
+                self._run = 0
+        return events
+
+    @property
+    def samples_seen(self) -> int:
+        return self._frames * self.frame_length
+
+
+def zero_crossing_rates(audio: np.ndarray, frame_length: int) -> np.ndarray:
+    """Fraction of adjacent samples that change sign, per complete frame"""
+    frames = len(audio) // frame_length
+    if frames == 0:
+        return np.empty(0, dtype=np.float32)
+    signs = np.signbit(audio[:frames * frame_length].reshape(frames, frame_length))
+    return np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (frame_length - 1)
+
+
+def _runs(mask: np.ndarray) -> np.ndarray:
+    """[start, end) frame pairs of every run of True in mask"""
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], mask.view(np.int8), [0]))))
+    return edges.reshape(-1, 2)
+
+
+def speech_regions(audio: np.ndarray, sample_rate: int = SAMPLE_RATE, frame_ms: int = 30,
+                   threshold_db: float = 12.0, min_level_db: float = -50.0, max_floor_db: float = -40.0,
+                   zcr_threshold: float = 0.25,
+                   min_speech_ms: int = 120, min_silence_ms: int = 600, pad_ms: int = 200) -> List[Tuple[int, int]]:
+    """Find speech in a whole recording at once: [start, end) sample ranges, padded and split on long pauses.
+
+    A frame is speech when it is well above the recording's own noise floor, or moderately above it
+    with a high zero-crossing rate, which catches quiet fricatives like "s" and "f". Pauses shorter
+    than min_silence_ms stay inside a region so words are not clipped.
+    """
+    frame_length = int(sample_rate * frame_ms / 1000)
+    levels = frame_levels_db(audio, frame_length)
+    if not len(levels):
+        return []
+    zcr = zero_crossing_rates(audio, frame_length)
+
+    # The quietest tenth of the recording is taken as its background noise, unless it is too loud
+    # to be noise: a clip that is speech from end to end must not hide below its own floor
+    floor = min(max(float(np.percentile(levels, 10)), -100.0), max_floor_db)
+    loud = levels > max(floor + threshold_db, min_level_db)
+    fricative = (levels > max(floor + threshold_db / 2, min_level_db - 6)) & (zcr > zcr_threshold)
+    runs = _runs(loud | fricative)
+    if not len(runs):
+        return []
+
+    # Bridge short pauses, then drop blips too short to be words
+    gaps = runs[1:, 0] - runs[:-1, 1]
+    breaks = np.flatnonzero(gaps >= max(1, min_silence_ms // frame_ms))
+    starts = runs[np.concatenate(([0], breaks + 1)), 0]
+    ends = runs[np.concatenate((breaks, [len(runs) - 1])), 1]
+    keep = ends - starts >= max(1, min_speech_ms // frame_ms)
+
+    pad = int(sample_rate * pad_ms / 1000)
+    return [
+        (max(0, int(start) * frame_length - pad), min(len(audio), int(end) * frame_length + pad))
+        for start, end in zip(starts[keep], ends[keep])
+    ]
+
+
+def pack_regions(audio: np.ndarray, regions: List[Tuple[int, int]], max_samples: int) -> List[np.ndarray]:
+    """Concatenate consecutive speech regions into clips of at most max_samples; longer regions stay whole"""
+    chunks = []
+    current = []
+    size = 0
+    for start, end in regions:
+        if current and size + (end - start) > max_samples:
+            chunks.append(np.concatenate(current))
+            current, size = [], 0
+        current.append(audio[start:end])
+        size += end - start
+    if current:
+        chunks.append(np.concatenate(current))
+    return chunks
@@ -0,0 +1,153 @@
+"""
+Load generator for /api/v1/chat: open-loop arrivals at a target RPS, then a latency and outcome report.
+
+    python load_test.py --url http://127.0.0.1:8000 --rps 20 --duration 30
+    python load_test.py --rps 50 --duration 60 --unique --priority interactive --latency-budget-ms 1500 --json out.json
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from collections import defaultdict
+
+import httpx
+
+# LLM-bound messages by default; schedule queries are answered locally and barely load the server
+DEFAULT_MESSAGES = [
+    "Tell me something interesting about productivity",
+    "How should I plan a busy week?",
+    "Give me a tip for staying focused",
+    "What's a good way to prioritise my work?",
+    "Can you help me organise my tasks?",
+    "What's my highest priority task?",
+    "show my today schedule?",
+]
+
+
+def percentile(ordered, pct):
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def parse_server_timing(header):
+    """Turn 'route;dur=0.1, llm;dur=420.5' into {'route': 0.1, 'llm': 420.5}"""
+    stages = {}
+    for part in (header or "").split(","):
+        name, _, params = part.strip().partition(";")
+        if params.startswith("dur="):
+            try:
+                stages[name] = float(params[4:])
+            except ValueError:
+                pass
+    return stages
+
+
+async def one_request(client, args, results):
+    message = random.choice(args.messages)
+    if args.unique:
+        # Defeat the response caches so every request exercises the LLM path
+        message = f"{message} ({uuid.uuid4().hex[:8]})"
+    body = {"message": message, "priority": args.priority}
+    if args.latency_budget_ms:
+        body["latency_budget_ms"] = args.latency_budget_ms
+
+    started = time.perf_counter()
+    try:
+        response = await client.post(f"{args.url}/api/v1/chat", json=body)
+        elapsed = time.perf_counter() - started
+        outcome = {"latency": elapsed, "status": response.status_code,
+                   "stages": parse_server_timing(response.headers.get("server-timing"))}
+        if response.status_code == 200:
+            data = response.json()
+            outcome.update(fallback=bool(data.get("fallback")), cached=bool(data.get("cached")),
+                           deadline_exceeded=bool(data.get("deadline_exceeded")))
+    except httpx.HTTPError as e:
+        outcome = {"latency": time.perf_counter() - started, "status": None, "error": type(e).__name__}
+    results.append(outcome)
+
+
+async def run(args):
+    results = []
+    tasks = []
+    limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        started = time.perf_counter()
+        next_at = started
+        while next_at - started < args.duration:
+            # Open loop: arrivals do not wait for earlier responses, like real users
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.ensure_future(one_request(client, args, results)))
+            gap = random.expovariate(args.rps) if args.poisson else 1 / args.rps
+            next_at += gap
+        await asyncio.gather(*tasks)
+        wall = time.perf_counter() - started
+    return results, wall
+
+
+def summarize(results, wall, args):
+    ok = [r for r in results if r["status"] == 200]
+    latencies = sorted(r["latency"] for r in ok)
+    stage_totals = defaultdict(list)
+    for r in ok:
+        for stage, ms in r["stages"].items():
+            stage_totals[stage].append(ms)
+
+    def ms(value):
+        return round(value * 1000, 1) if value is not None else None
+
+    return {
+        "target_rps": args.rps,
+        "duration_seconds": round(wall, 2),
+        "requests": len(results),
+        "succeeded": len(ok),
+        "errors": len(results) - len(ok),
+        "throughput_rps": round(len(ok) / wall, 2) if wall else None,
+        "latency_ms": {
+            "p50": ms(percentile(latencies, 50)),
+            "p95": ms(percentile(latencies, 95)),
+            "p99": ms(percentile(latencies, 99)),
+            "max": ms(latencies[-1] if latencies else None)
+        },
+        "fallback_rate": round(sum(r.get("fallback", False) for r in ok) / len(ok), 4) if ok else None,
+        "cached_rate": round(sum(r.get("cached", False) for r in ok) / len(ok), 4) if ok else None,
+        "deadline_exceeded_rate": round(sum(r.get("deadline_exceeded", False) for r in ok) / len(ok), 4) if ok else None,
+        "stage_avg_ms": {stage: round(sum(v) / len(v), 2) for stage, v in stage_totals.items()}
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive /api/v1/chat at a target request rate")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--rps", type=float, default=10.0, help="Target requests per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to generate load for")
+    parser.add_argument("--poisson", action="store_true", help="Exponential inter-arrival times instead of a fixed gap")
+    parser.add_argument("--unique", action="store_true", help="Make every message unique to bypass caches")
+    parser.add_argument("--priority", default="normal", choices=["interactive", "normal", "background"])
+    parser.add_argument("--latency-budget-ms", type=int, default=None)
+    parser.add_argument("--messages-file", help="File with one message per line")
+    parser.add_argument("--max-connections", type=int, default=200)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--json", dest="json_path", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    args.messages = DEFAULT_MESSAGES
+    if args.messages_file:
+        with open(args.messages_file) as f:
+            args.messages = [line.strip() for line in f if line.strip()]
+
+    results, wall = asyncio.run(run(args))
+    report = summarize(results, wall, args)
+    print(json.dumps(report, indent=2))
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
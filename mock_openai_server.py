@@ -0,0 +1,139 @@
+"""
+Local stand-in for the OpenAI chat completions API, for load tests that must not spend real quota.
+
+Run it, then point the app at it:
+    python mock_openai_server.py --port 8001 --latency lognormal --latency-ms 600 --error-rate 0.05
+    OPENAI_BASE_URL=http://127.0.0.1:8001/v1 OPENAI_API_KEY=mock uvicorn app.main:app
+
+Raise OPENAI_RPM_LIMIT / OPENAI_TPM_LIMIT as well when testing above ~8 RPS, or the client-side
+rate limiter, not the server, is what gets measured.
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+app = FastAPI(title="Mock OpenAI API")
+settings = argparse.Namespace(latency="lognormal", latency_ms=600.0, latency_sigma=0.5, error_rate=0.0,
+                              retry_after=1.0, tokens_per_second=80.0, seed=None)
+counters = {"requests": 0, "streamed": 0, "rate_limited": 0}
+
+
+def sample_latency() -> float:
+    """Seconds until the first byte, drawn from the configured distribution"""
+    mean = settings.latency_ms / 1000
+    if settings.latency == "fixed":
+        return mean
+    if settings.latency == "uniform":
+        return random.uniform(0, 2 * mean)
+    if settings.latency == "exponential":
+        return random.expovariate(1 / mean) if mean > 0 else 0.0
+    # Lognormal with the requested mean: a long right tail like real LLM latency
+    if mean <= 0:
+        return 0.0
+    sigma = settings.latency_sigma
+    return random.lognormvariate(math.log(mean) - sigma ** 2 / 2, sigma)
+
+
+def reply_for(body: dict) -> str:
+    """Deterministic reply text so identical prompts get identical answers"""
+    user_messages = [m.get("content") or "" for m in body.get("messages", []) if m.get("role") == "user"]
+    last = user_messages[-1] if user_messages else ""
+    return f"Mock reply to: {last[:200]}. This response was generated by the local mock server for load testing."
+
+
+def completion_body(body: dict, content: str) -> dict:
+    prompt_tokens = sum(len((m.get("content") or "").split()) for m in body.get("messages", []))
+    completion_tokens = len(content.split())
+    return {
+        "id": f"chatcmpl-mock-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "gpt-3.5-turbo"),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                  "total_tokens": prompt_tokens + completion_tokens}
+    }
+
+
+async def stream_chunks(body: dict, content: str):
+    """Server-sent events in the OpenAI streaming format, paced at tokens_per_second"""
+    chunk_id = f"chatcmpl-mock-{uuid.uuid4().hex[:12]}"
+    model = body.get("model", "gpt-3.5-turbo")
+    delay = 1 / settings.tokens_per_second if settings.tokens_per_second > 0 else 0
+    words = content.split(" ")
+    for i, word in enumerate(words):
+        delta = {"content": word if i == 0 else f" {word}"}
+        if i == 0:
+            delta["role"] = "assistant"
+        chunk = {"id": chunk_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                 "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}
+        yield f"data: {json.dumps(chunk)}\n\n"
+        await asyncio.sleep(delay)
+    done = {"id": chunk_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+    yield f"data: {json.dumps(done)}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    counters["requests"] += 1
+
+    if random.random() < settings.error_rate:
+        counters["rate_limited"] += 1
+        return JSONResponse(
+            status_code=429,
+            headers={"retry-after": str(settings.retry_after)},
+            content={"error": {"message": "Rate limit reached (injected by mock server)", "type": "requests",
+                               "code": "rate_limit_exceeded"}}
+        )
+
+    await asyncio.sleep(sample_latency())
+    content = reply_for(body)
+    if body.get("stream"):
+        counters["streamed"] += 1
+        return StreamingResponse(stream_chunks(body, content), media_type="text/event-stream")
+    return completion_body(body, content)
+
+
+@app.get("/v1/models")
+async def models():
+    return {"object": "list", "data": [{"id": "gpt-3.5-turbo", "object": "model", "owned_by": "mock"}]}
+
+
+@app.get("/stats")
+async def stats():
+    return counters
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock OpenAI chat completions server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", choices=["fixed", "uniform", "exponential", "lognormal"], default="lognormal",
+                        help="Distribution of time to first byte")
+    parser.add_argument("--latency-ms", type=float, default=600.0, help="Mean time to first byte")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="Tail heaviness for lognormal latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with injected 429s")
+    parser.add_argument("--tokens-per-second", type=float, default=80.0, help="Streaming pace")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    vars(settings).update(vars(args))
+    if args.seed is not None:
+        random.seed(args.seed)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
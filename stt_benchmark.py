@@ -0,0 +1,303 @@
+"""
+Speech-to-text benchmarks that run the service in-process, without the HTTP layer.
+
+    python stt_benchmark.py batching --clips 64 --concurrency 16
+    python stt_benchmark.py batching --audio-dir samples/ --batch-size 8 --window-ms 20 --json out.json
+    python stt_benchmark.py vad --audio-dir samples/ --transcribe
+    python stt_benchmark.py profiles --prepare --target-wer 0.15 --target-rtf 0.5
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import time
+import wave
+
+import numpy as np
+
+from app.services.speech_recognition import BATCH_WINDOW_SAMPLES, SAMPLE_RATE, SpeechRecognitionService, _synthetic_clip
+from app.services.stt_profiles import PROFILES, get_profile, select_profile, word_error_rate
+from app.utils.audio_decoding import decode_audio
+from app.utils.vad import pack_regions, speech_regions
+
+
+def percentile(ordered, pct):
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def load_wav(path):
+    """16 kHz mono 16-bit WAV to float32 in [-1, 1]"""
+    with wave.open(path, "rb") as f:
+        if f.getframerate() != SAMPLE_RATE or f.getnchannels() != 1 or f.getsampwidth() != 2:
+            raise ValueError(f"{path}: expected 16 kHz mono 16-bit PCM")
+        return np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16).astype(np.float32) / 32768
+
+
+def load_wav_dir(audio_dir):
+    return [load_wav(os.path.join(audio_dir, name)) for name in sorted(os.listdir(audio_dir))
+            if name.lower().endswith(".wav")]
+
+
+def load_clips(args):
+    if args.audio_dir:
+        base = load_wav_dir(args.audio_dir)
+    else:
+        # Short voice-command lengths, the case batching is meant for
+        base = [_synthetic_clip(seconds) for seconds in (1.0, 1.5, 2.0, 3.0, 4.0, 6.0)]
+    return [base[i % len(base)] for i in range(args.clips)]
+
+
+async def run_load(service, clips, concurrency, batch):
+    """Keep `concurrency` transcriptions outstanding until every clip is done"""
+    latencies = []
+    next_clip = iter(clips)
+
+    async def client():
+        for clip in next_clip:
+            started = time.perf_counter()
+            await service._submit(clip, beam_size=service.beam_size, batch=batch)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[client() for _ in range(concurrency)])
+    return latencies, time.perf_counter() - started
+
+
+def summarize(latencies, wall, audio_seconds):
+    ordered = sorted(latencies)
+
+    def ms(value):
+        return round(value * 1000, 1) if value is not None else None
+
+    return {
+        "clips": len(latencies),
+        "wall_seconds": round(wall, 2),
+        "clips_per_second": round(len(latencies) / wall, 2) if wall else None,
+        "audio_seconds_per_second": round(audio_seconds / wall, 2) if wall else None,
+        "latency_ms": {"p50": ms(percentile(ordered, 50)), "p95": ms(percentile(ordered, 95)),
+                       "max": ms(ordered[-1] if ordered else None)}
+    }
+
+
+async def bench_batching(args):
+    os.environ["STT_BATCH_SIZE"] = str(args.batch_size)
+    os.environ["STT_BATCH_WINDOW_MS"] = str(args.window_ms)
+    os.environ["STT_MAX_QUEUE"] = str(args.clips)
+    service = SpeechRecognitionService()
+    await service.ensure_ready()
+    if service.batcher is None:
+        raise SystemExit("Batching is disabled (STT_BATCHING=false or STT_BATCH_SIZE=1)")
+
+    clips = load_clips(args)
+    audio_seconds = sum(len(clip) for clip in clips) / SAMPLE_RATE
+    # One untimed round of each so neither side pays for first-call allocation
+    await run_load(service, clips[:args.concurrency], args.concurrency, batch=False)
+    await run_load(service, clips[:args.concurrency], args.concurrency, batch=True)
+
+    unbatched = summarize(*await run_load(service, clips, args.concurrency, batch=False), audio_seconds)
+    batched = summarize(*await run_load(service, clips, args.concurrency, batch=True), audio_seconds)
+    return {
+        "model": service.model_size,
+        "workers": service.workers,
+        "worker_mode": service.worker_mode,
+        "beam_size": service.beam_size,
+        "concurrency": args.concurrency,
+        "unbatched": unbatched,
+        "batched": batched,
+        "batcher": service.batcher.stats(),
+        "throughput_gain": round(batched["clips_per_second"] / unbatched["clips_per_second"], 2)
+        if unbatched["clips_per_second"] else None
+    }
+
+
+def synthetic_recording(rng):
+    """Shaped like a browser voice note: lead-in silence, a few phrases with pauses, a slow stop"""
+    parts = [rng.normal(0, 0.003, int(SAMPLE_RATE * rng.uniform(0.5, 2.0)))]
+    for i in range(rng.integers(1, 4)):
+        if i:
+            parts.append(rng.normal(0, 0.003, int(SAMPLE_RATE * rng.uniform(0.7, 2.0))))
+        parts.append(_synthetic_clip(rng.uniform(0.8, 3.0)) * rng.uniform(0.3, 1.0))
+    parts.append(rng.normal(0, 0.003, int(SAMPLE_RATE * rng.uniform(1.0, 3.0))))
+    return np.concatenate(parts).astype(np.float32)
+
+
+async def bench_vad(args):
+    if args.audio_dir:
+        corpus = load_wav_dir(args.audio_dir)
+    else:
+        rng = np.random.default_rng(args.seed)
+        corpus = [synthetic_recording(rng) for _ in range(args.clips)]
+
+    options = {"threshold_db": args.threshold_db, "min_silence_ms": args.min_silence_ms, "pad_ms": args.pad_ms}
+    input_samples = speech_samples = 0
+    silent = 0
+    started = time.perf_counter()
+    for audio in corpus:
+        chunks = pack_regions(audio, speech_regions(audio, **options), BATCH_WINDOW_SAMPLES)
+        input_samples += len(audio)
+        speech_samples += sum(len(chunk) for chunk in chunks)
+        silent += not chunks
+    vad_seconds = time.perf_counter() - started
+
+    report = {
+        "recordings": len(corpus),
+        "input_audio_seconds": round(input_samples / SAMPLE_RATE, 1),
+        "speech_audio_seconds": round(speech_samples / SAMPLE_RATE, 1),
+        "reduction": round(1 - speech_samples / input_samples, 3) if input_samples else None,
+        "silent_recordings": silent,
+        "vad_ms_per_audio_minute": round(vad_seconds / (input_samples / SAMPLE_RATE) * 60 * 1000, 2)
+        if input_samples else None
+    }
+
+    if args.transcribe:
+        # End to end through the service: the same corpus with and without trimming
+        service = SpeechRecognitionService()
+        await service.ensure_ready()
+        for label, enabled in (("without_vad", False), ("with_vad", True)):
+            service.vad = enabled
+            started = time.perf_counter()
+            for audio in corpus:
+                chunks = await service.speech_chunks(audio)
+                await asyncio.gather(*[service._submit(chunk, beam_size=service.beam_size) for chunk in chunks])
+            report[f"{label}_seconds"] = round(time.perf_counter() - started, 2)
+        report["transcription_speedup"] = round(report["without_vad_seconds"] / report["with_vad_seconds"], 2) \
+            if report["with_vad_seconds"] else None
+    return report
+
+
+def prepare_samples(samples_dir, manifest):
+    """Synthesize any sample without a recording; gTTS needs network access, so this runs once"""
+    from gtts import gTTS
+
+    for sample in manifest["samples"]:
+        if not any(os.path.exists(os.path.join(samples_dir, f"{sample['id']}.{ext}")) for ext in ("wav", "mp3")):
+            gTTS(text=sample["text"], lang=manifest.get("language", "en")).save(
+                os.path.join(samples_dir, f"{sample['id']}.mp3"))
+            print(f"Synthesized {sample['id']}.mp3")
+
+
+def load_samples(samples_dir, manifest):
+    """Decoded audio and reference text for every sample with a recording (WAV preferred over MP3)"""
+    samples = []
+    for sample in manifest["samples"]:
+        for ext in ("wav", "mp3"):
+            path = os.path.join(samples_dir, f"{sample['id']}.{ext}")
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    samples.append((sample, decode_audio(f.read())))
+                break
+    return samples
+
+
+async def measure_profile(profile, samples, language):
+    service = SpeechRecognitionService(profile)
+    started = time.perf_counter()
+    await service.ensure_ready()
+    load_seconds = time.perf_counter() - started
+
+    processing = 0.0
+    audio_seconds = 0.0
+    errors = 0.0
+    reference_words = 0
+    latencies = []
+    for sample, audio in samples:
+        started = time.perf_counter()
+        text, _, _ = await service.transcribe_array(audio, language=language)
+        elapsed = time.perf_counter() - started
+        latencies.append(elapsed)
+        processing += elapsed
+        audio_seconds += len(audio) / SAMPLE_RATE
+        words = len(sample["text"].split())
+        # Corpus WER: total edits over total reference words, so long samples weigh more
+        errors += word_error_rate(sample["text"], text) * words
+        reference_words += words
+    service.close()
+
+    latencies.sort()
+    return {
+        **profile.to_dict(),
+        "cpu_threads_used": service.cpu_threads,
+        "wer": round(errors / reference_words, 4) if reference_words else None,
+        "rtf": round(processing / audio_seconds, 4) if audio_seconds else None,
+        "p95_latency_ms": round(percentile(latencies, 95) * 1000, 1) if latencies else None,
+        "load_seconds": round(load_seconds, 2)
+    }
+
+
+async def bench_profiles(args):
+    with open(os.path.join(args.samples, "manifest.json")) as f:
+        manifest = json.load(f)
+    if args.prepare:
+        prepare_samples(args.samples, manifest)
+    samples = load_samples(args.samples, manifest)
+    if not samples:
+        raise SystemExit(f"No recordings in {args.samples}; add <id>.wav files or run with --prepare")
+
+    names = args.profiles.split(",") if args.profiles else list(PROFILES)
+    results = {}
+    for name in names:
+        print(f"Measuring {name} on {len(samples)} samples...")
+        # Greedy warm-up is part of loading; the language is known, so detection is not measured
+        results[name] = await measure_profile(get_profile(name), samples, manifest.get("language"))
+
+    report = {
+        "measured_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "machine": {"platform": platform.platform(), "processor": platform.processor(),
+                    "cpu_count": os.cpu_count()},
+        "samples": len(samples),
+        "targets": {"wer": args.target_wer, "rtf": args.target_rtf},
+        "selected": select_profile(results, args.target_wer, args.target_rtf),
+        "profiles": results
+    }
+    # The service reads this at startup when STT_PROFILE=auto
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the speech-to-text service")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    batching = subparsers.add_parser("batching", help="Throughput of micro-batched vs one-by-one transcription")
+    batching.add_argument("--clips", type=int, default=48, help="Clips transcribed per mode")
+    batching.add_argument("--concurrency", type=int, default=16, help="Simultaneous clients")
+    batching.add_argument("--batch-size", type=int, default=8)
+    batching.add_argument("--window-ms", type=float, default=15.0)
+    batching.add_argument("--audio-dir", help="Directory of 16 kHz mono WAV files instead of synthetic clips")
+    batching.add_argument("--json", dest="json_path", help="Also write the report to this file")
+
+    vad = subparsers.add_parser("vad", help="How much audio voice-activity detection keeps away from the model")
+    vad.add_argument("--clips", type=int, default=50, help="Synthetic recordings to generate")
+    vad.add_argument("--seed", type=int, default=0)
+    vad.add_argument("--audio-dir", help="Directory of 16 kHz mono WAV files instead of synthetic recordings")
+    vad.add_argument("--threshold-db", type=float, default=12.0)
+    vad.add_argument("--min-silence-ms", type=int, default=600)
+    vad.add_argument("--pad-ms", type=int, default=200)
+    vad.add_argument("--transcribe", action="store_true", help="Also time transcription with and without VAD")
+    vad.add_argument("--json", dest="json_path", help="Also write the report to this file")
+
+    profiles = subparsers.add_parser("profiles", help="Real-time factor and WER of each model profile")
+    profiles.add_argument("--samples", default="stt_samples", help="Directory with manifest.json and recordings")
+    profiles.add_argument("--prepare", action="store_true", help="Synthesize missing recordings with gTTS")
+    profiles.add_argument("--profiles", help=f"Comma-separated subset of: {', '.join(PROFILES)}")
+    profiles.add_argument("--target-wer", type=float, default=0.15)
+    profiles.add_argument("--target-rtf", type=float, default=0.5)
+    profiles.add_argument("--output", default="stt_profile_results.json", help="Results file the service reads")
+    profiles.add_argument("--json", dest="json_path", help="Also write the report to this file")
+
+    args = parser.parse_args()
+    commands = {"batching": bench_batching, "vad": bench_vad, "profiles": bench_profiles}
+    report = asyncio.run(commands[args.command](args))
+    print(json.dumps(report, indent=2))
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
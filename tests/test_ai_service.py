@@ -0,0 +1,227 @@
+import asyncio
+import json
+import pytest
+from app.services.ai_service import AIService
+from app.services.chat_pipeline import ChatPipeline
+
+@pytest.fixture
+def pipeline(monkeypatch, tmp_path):
+    service = AIService()
+    # Keep the repo's tasks.json out of reach of anything a test creates
+    monkeypatch.setattr(service.task_service, "tasks_file", str(tmp_path / "tasks.json"))
+    service.openai_api_key = "test-key"
+    service.llm_backend = "openai"
+    service.upstream_calls = []
+
+    async def fake_post(data, on_text=None):
+        service.upstream_calls.append(data["messages"][-1]["content"])
+        return {"model": "fake", "choices": [{"message": {"role": "assistant",
+                                                          "content": f"answer {len(service.upstream_calls)}"}}]}
+
+    monkeypatch.setattr(service, "_post_chat_completion", fake_post)
+    return ChatPipeline(service)
+
+def chat(pipeline, message, user_id):
+    result, _ = asyncio.run(pipeline.run(message, user_id=user_id))
+    return result
+
+def test_repeated_question_is_cached_as_the_conversation_grows(pipeline):
+    # Test
+    results = [chat(pipeline, "tell me a joke", "user_001") for _ in range(3)]
+
+    # Verify
+    assert len(pipeline.ai_service.upstream_calls) == 1
+    assert results[1]["cached"] is True and results[2]["cached"] is True
+
+def test_cached_answers_are_not_shared_between_users(pipeline):
+    # Setup: in tool mode the prompt carries only the date, nothing about the user
+    pipeline.ai_service.tool_calling = True
+
+    # Test
+    first = chat(pipeline, "find my tasks about the budget", "user_001")
+    second = chat(pipeline, "find my tasks about the budget", "someone_else")
+
+    # Verify
+    assert len(pipeline.ai_service.upstream_calls) == 2
+    assert "cached" not in second
+    assert second["response"] != first["response"]
+
+def test_follow_up_depends_on_the_conversation(pipeline):
+    # Setup: the same follow-up after two different questions
+    chat(pipeline, "tell me a joke", "user_001")
+    first = chat(pipeline, "tell me more", "user_001")
+    chat(pipeline, "describe the weather on mars", "user_001")
+
+    # Test
+    second = chat(pipeline, "tell me more", "user_001")
+
+    # Verify
+    assert pipeline.ai_service.upstream_calls.count("tell me more") == 2
+    assert second["response"] != first["response"]
+
+@pytest.mark.parametrize("message", ["show my today schedule?", "Can you help me organize my schedule for the week?"])
+def test_schedule_handlers_answer_for_the_asking_user(pipeline, message):
+    # Setup
+    service = pipeline.ai_service
+    service.task_service.create_task("schedule_user", "Water the ferns", due_date="today", frequency="daily")
+
+    # Test
+    mine = service.respond_locally(message, user_id="schedule_user")
+    theirs = service.respond_locally(message, user_id="user_001")
+
+    # Verify
+    assert "Water the ferns" in mine["response"]
+    assert "Water the ferns" not in theirs["response"]
+
+def test_coalesced_callers_all_receive_streamed_text(pipeline, monkeypatch):
+    # Setup: a slow streaming upstream
+    service = pipeline.ai_service
+
+    async def streaming_post(data, on_text=None):
+        service.upstream_calls.append(data["messages"][-1]["content"])
+        text = ""
+        for word in ("One", "two", "three."):
+            text += word + " "
+            await on_text(text)
+            await asyncio.sleep(0.01)
+        return {"model": "fake", "choices": [{"message": {"role": "assistant", "content": text.strip()}}]}
+
+    monkeypatch.setattr(service, "_post_chat_completion", streaming_post)
+    seen = {"leader": [], "follower": []}
+
+    def collector(name):
+        async def on_text(text):
+            seen[name].append(text)
+        return on_text
+
+    async def run():
+        data = {"model": "fake", "messages": [{"role": "user", "content": "count to three"}]}
+        key = service.single_flight.key_for(data)
+        leader = asyncio.ensure_future(service._coalesced_complete(key, data, 0, collector("leader")))
+        await asyncio.sleep(0.015)
+        follower = await service._coalesced_complete(key, data, 0, collector("follower"))
+        return await leader, follower
+
+    # Test
+    leader, follower = asyncio.run(run())
+
+    # Verify: one upstream call; the late follower catches up and then streams along
+    assert len(service.upstream_calls) == 1
+    assert leader == follower
+    assert seen["leader"][-1] == seen["follower"][-1] == "One two three. "
+    assert len(seen["follower"]) >= 2
+
+def test_missed_latency_budget_answers_locally_and_fills_the_cache_later(pipeline, monkeypatch):
+    # Setup: an upstream slower than the caller's budget
+    service = pipeline.ai_service
+
+    async def slow_post(data, on_text=None):
+        await asyncio.sleep(0.1)
+        service.upstream_calls.append(data["messages"][-1]["content"])
+        return {"model": "fake", "choices": [{"message": {"role": "assistant", "content": "a slow joke"}}]}
+
+    monkeypatch.setattr(service, "_post_chat_completion", slow_post)
+
+    async def run():
+        first, _ = await pipeline.run("tell me a joke", latency_budget_ms=20)
+        in_flight = service.latency_budget_stats()["background_in_flight"]
+        await asyncio.gather(*service._background_calls)
+        second, _ = await pipeline.run("tell me a joke", latency_budget_ms=20)
+        return first, in_flight, second
+
+    # Test
+    first, in_flight, second = asyncio.run(run())
+
+    # Verify: the local answer goes out on time and the late LLM answer serves the next ask
+    assert first["deadline_exceeded"] is True and first["fallback"] is True
+    assert first["response"] != "a slow joke"
+    assert in_flight == 1
+    assert second["response"] == "a slow joke" and second["cached"] is True
+    assert service.upstream_calls == ["tell me a joke"]
+    assert service.latency_budget_stats()["missed"] == 1
+
+def test_background_call_does_not_change_tasks(pipeline, monkeypatch):
+    # Setup: the model asks to create a task only after the budget has run out
+    service = pipeline.ai_service
+    service.tool_calling = True
+    rounds = []
+
+    async def tool_post(data, on_text=None):
+        rounds.append(data["messages"][-1])
+        if len(rounds) == 1:
+            await asyncio.sleep(0.05)
+            call = {"id": "call_1", "type": "function",
+                    "function": {"name": "create_task", "arguments": '{"title": "Buy milk"}'}}
+            return {"model": "fake", "choices": [{"message": {"role": "assistant", "content": None,
+                                                              "tool_calls": [call]}}]}
+        return {"model": "fake", "choices": [{"message": {"role": "assistant", "content": "Done."}}]}
+
+    monkeypatch.setattr(service, "_post_chat_completion", tool_post)
+
+    async def run():
+        result, _ = await pipeline.run("remind me to buy milk", latency_budget_ms=10, user_id="tool_user")
+        await asyncio.gather(*service._background_calls)
+        return result
+
+    # Test
+    result = asyncio.run(run())
+
+    # Verify: the tool was refused, and the answer claiming otherwise is not cached
+    assert result["deadline_exceeded"] is True
+    assert service.task_service.get_all_tasks("tool_user") == []
+    assert "tasks were not changed" in rounds[1]["content"]
+    assert service.response_cache.stats()["entries"] == 0
+
+def tool_call(call_id, name, arguments):
+    return {"id": call_id, "type": "function", "function": {"name": name, "arguments": json.dumps(arguments)}}
+
+def test_tool_call_runs_end_to_end(pipeline, monkeypatch):
+    # Setup: the model searches the user's tasks, then answers from the result
+    service = pipeline.ai_service
+    service.tool_calling = True
+    service.task_service.create_task("tool_user", "Budget review", due_date="2025-06-02")
+    requests = []
+
+    async def tool_post(data, on_text=None):
+        requests.append(data)
+        if len(requests) == 1:
+            call = tool_call("call_1", "search_tasks_by_keyword", {"keyword": "budget"})
+            return {"model": "fake", "choices": [{"message": {"role": "assistant", "content": None,
+                                                              "tool_calls": [call]}}]}
+        found = json.loads(data["messages"][-1]["content"])
+        answer = f"You have {found['count']} task: {found['tasks'][0]['title']}."
+        return {"model": "fake", "choices": [{"message": {"role": "assistant", "content": answer}}]}
+
+    monkeypatch.setattr(service, "_post_chat_completion", tool_post)
+
+    # Test
+    result = chat(pipeline, "find my tasks about the budget", "tool_user")
+
+    # Verify
+    assert result["response"] == "You have 1 task: Budget review."
+    assert result["tools_used"] == ["search_tasks_by_keyword"]
+    assert requests[1]["messages"][-1]["tool_call_id"] == "call_1"
+    assert service.task_tools.stats()["calls"]["search_tasks_by_keyword"] == 1
+
+def test_tool_rounds_are_limited(pipeline, monkeypatch):
+    # Setup: a model that keeps calling tools, even when told not to
+    service = pipeline.ai_service
+    service.tool_calling = True
+    service.max_tool_rounds = 2
+    requests = []
+
+    async def looping_post(data, on_text=None):
+        requests.append(data)
+        call = tool_call(f"call_{len(requests)}", "get_upcoming_tasks", {"days": 7})
+        return {"model": "fake", "choices": [{"message": {"role": "assistant", "content": "Let me look.",
+                                                          "tool_calls": [call]}}]}
+
+    monkeypatch.setattr(service, "_post_chat_completion", looping_post)
+
+    # Test
+    result = chat(pipeline, "what is coming up for me", "tool_user")
+
+    # Verify: two tool rounds, then one forced text round whose stray tool call is not run
+    assert [data["tool_choice"] for data in requests] == ["auto", "auto", "none"]
+    assert result["response"] == "Let me look."
+    assert service.task_tools.stats()["calls"]["get_upcoming_tasks"] == 2
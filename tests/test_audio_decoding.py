@@ -0,0 +1,92 @@
+import io
+import wave
+import numpy as np
+import pytest
+from app.utils.audio_decoding import AudioDecodeError, decode_audio, sniff_container
+
+def wav_bytes(samples, rate=16000, channels=1):
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as f:
+        f.setnchannels(channels)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(samples.astype("<i2").tobytes())
+    return buffer.getvalue()
+
+def test_sniff_common_containers():
+    # Test / Verify
+    assert sniff_container(wav_bytes(np.zeros(10))) == "wav"
+    assert sniff_container(b"\x1a\x45\xdf\xa3" + b"\x00" * 20) == "webm"
+    assert sniff_container(b"OggS" + b"\x00" * 20) == "ogg"
+    assert sniff_container(b"ID3\x04" + b"\x00" * 20) == "mp3"
+    assert sniff_container(b"\x00\x00\x00\x20ftypM4A " + b"\x00" * 20) == "mp4"
+    assert sniff_container(b"FORM\x00\x00\x00\x20AIFF" + b"\x00" * 20) == "aiff"
+    assert sniff_container(b"#!AMR\n" + b"\x00" * 20) == "amr"
+    assert sniff_container(b"caff\x00\x01\x00\x00" + b"\x00" * 20) == "caf"
+    assert sniff_container(np.zeros(10, dtype="<i2").tobytes()) == "raw"
+
+def test_wav_int16_is_decoded_without_ffmpeg():
+    # Setup
+    samples = np.array([0, 16384, -16384, 32767], dtype=np.int16)
+
+    # Test
+    audio = decode_audio(wav_bytes(samples))
+
+    # Verify: the header is skipped and samples are scaled to [-1, 1]
+    assert audio.dtype == np.float32
+    assert np.allclose(audio, [0.0, 0.5, -0.5, 32767 / 32768])
+
+def test_stereo_wav_is_downmixed():
+    # Setup: left and right interleaved
+    samples = np.array([16384, 0, 16384, 0], dtype=np.int16)
+
+    # Test
+    audio = decode_audio(wav_bytes(samples, channels=2))
+
+    # Verify
+    assert np.allclose(audio, [0.25, 0.25])
+
+def test_raw_pcm_formats():
+    # Setup
+    floats = np.array([0.1, -0.2, 0.3], dtype="<f4")
+    ints = np.array([8192, -8192, 0, 100], dtype="<i2")
+
+    # Test / Verify: declared formats, and float32 still recognised from older clients
+    assert np.allclose(decode_audio(ints.tobytes(), "s16le"), [0.25, -0.25, 0.0, 100 / 32768])
+    assert np.allclose(decode_audio(floats.tobytes(), "f32le"), floats)
+    assert np.allclose(decode_audio(floats.tobytes()), floats)
+    assert len(decode_audio((ints * 4).tobytes())) == 4
+
+def test_empty_audio_is_rejected():
+    # Test / Verify
+    with pytest.raises(AudioDecodeError):
+        decode_audio(b"")
+
+@pytest.mark.parametrize("cut", [12, 22, 36, 40])
+def test_truncated_wav_header_is_rejected(cut):
+    # Setup: RIFF header, then part of the fmt chunk or nothing after it
+    data = wav_bytes(np.zeros(10))[:cut]
+
+    # Test / Verify
+    with pytest.raises(AudioDecodeError):
+        decode_audio(data)
+
+def test_wav_with_zero_channels_is_rejected():
+    # Setup: patch the channel count in the fmt chunk to 0
+    data = bytearray(wav_bytes(np.zeros(10)))
+    data[22:24] = b"\x00\x00"
+
+    # Test / Verify
+    with pytest.raises(AudioDecodeError):
+        decode_audio(bytes(data))
+
+def test_declared_pcm_is_not_sniffed():
+    # Setup: the first sample's bytes look like an MP3 frame sync
+    samples = np.array([-7937, 0, 100, 200], dtype="<i2")
+    assert sniff_container(samples.tobytes()) == "mp3"
+
+    # Test
+    audio = decode_audio(samples.tobytes(), "s16le")
+
+    # Verify
+    assert np.allclose(audio * 32768, samples)
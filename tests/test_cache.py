@@ -0,0 +1,59 @@
+import pytest
+import time
+from app.utils.cache import TTLCache
+
+@pytest.fixture
+def cache():
+    return TTLCache(max_entries=2, ttl_seconds=60)
+
+def test_get_returns_stored_value(cache):
+    # Setup
+    cache.set("model|hash|what should i focus on|v1|2025-05-29", "Focus on the report")
+
+    # Test
+    value = cache.get("model|hash|what should i focus on|v1|2025-05-29")
+
+    # Verify
+    assert value == "Focus on the report"
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 0
+
+def test_least_recently_used_entry_is_evicted(cache):
+    # Setup
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+
+    # Test
+    cache.set("c", 3)
+
+    # Verify
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+def test_expired_entry_is_a_miss(cache):
+    # Setup
+    cache.set("a", 1, ttl_seconds=0.01)
+    time.sleep(0.02)
+
+    # Test
+    value = cache.get("a")
+
+    # Verify
+    assert value is None
+    assert cache.stats()["misses"] == 1
+
+def test_disk_tier_survives_new_instance(tmp_path):
+    # Setup
+    first = TTLCache(max_entries=2, ttl_seconds=60, disk_dir=str(tmp_path))
+    first.set("help", "Here's how I can help")
+
+    # Test
+    second = TTLCache(max_entries=2, ttl_seconds=60, disk_dir=str(tmp_path))
+    value = second.get("help")
+
+    # Verify
+    assert value == "Here's how I can help"
+    assert second.stats()["disk_hits"] == 1
@@ -0,0 +1,62 @@
+import pytest
+from app.services.conversation_memory import ConversationMemory
+
+@pytest.fixture
+def memory():
+    return ConversationMemory(max_turns=3, summary_trigger_tokens=10000, summary_max_tokens=200, max_users=2)
+
+def test_recent_turns_become_history_messages(memory):
+    # Setup
+    memory.add_turn("user_001", "What's due today?", "You have two tasks.")
+
+    # Test
+    messages = memory.history_messages("user_001")
+
+    # Verify
+    assert messages == [
+        {"role": "user", "content": "What's due today?"},
+        {"role": "assistant", "content": "You have two tasks."}
+    ]
+
+def test_turns_beyond_the_window_are_summarized(memory):
+    # Setup
+    for i in range(5):
+        memory.add_turn("user_001", f"Question {i}. More detail here.", f"Answer {i}. Extra words.")
+
+    # Test
+    messages = memory.history_messages("user_001")
+
+    # Verify
+    assert messages[0]["role"] == "system"
+    assert "- User: Question 0. | DONNA: Answer 0." in messages[0]["content"]
+    assert "Question 1" in messages[0]["content"]
+    assert len(messages) == 1 + 2 * 3
+    assert messages[1]["content"] == "Question 2. More detail here."
+
+def test_summary_trigger_keeps_prompt_size_bounded():
+    # Setup
+    memory = ConversationMemory(max_turns=50, summary_trigger_tokens=100, summary_max_tokens=60)
+    long_answer = "word " * 60
+
+    # Test
+    for i in range(20):
+        memory.add_turn("user_001", f"Question {i}", long_answer)
+
+    # Verify
+    stats = memory.stats()
+    assert stats["summarized_turns"] == 19
+    assert stats["tokens_held"] <= 100 + 60
+
+def test_least_recent_users_are_evicted(memory):
+    # Setup
+    memory.add_turn("a", "hi", "hello")
+    memory.add_turn("b", "hi", "hello")
+    memory.history_messages("a")
+
+    # Test
+    memory.add_turn("c", "hi", "hello")
+
+    # Verify
+    assert memory.get_history("b") == []
+    assert memory.get_history("a") == [{"user": "hi", "bot": "hello"}]
+    assert memory.stats()["evicted_users"] == 1
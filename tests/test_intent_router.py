@@ -0,0 +1,66 @@
+import pytest
+from app.services.intent_router import IntentRouter
+
+@pytest.fixture
+def router():
+    return IntentRouter()
+
+@pytest.mark.parametrize("message, intent, slots", [
+    ("show my today schedule?", "today_schedule", {}),
+    ("Can you help me organize my schedule for the week?", "weekly_overview", {}),
+    ("show my next day schedule?", "tomorrow_schedule", {}),
+    ("show my next 2 day schedule?", "next_days_schedule", {"days": 2}),
+    ("show my 31/05/2025 schedule?", "date_schedule", {"date": "31/05/2025"}),
+    ("show my May 29, 2025 schedule?", "date_schedule", {"date": "may 29, 2025"}),
+    ("show tasks this week", "week_schedule", {"week": "this week"}),
+    ("What is today's date?", "current_date", {}),
+    ("what time is it", "current_date", {}),
+    ("what's on my agenda tomorrow", "tomorrow_schedule", {}),
+    ("any meetings next week?", "week_schedule", {"week": "next week"}),
+    ("Show me my tasks", "schedule_overview", {}),
+    ("What's my highest priority task?", "highest_priority", {}),
+    ("What can you do?", "help", {}),
+    ("hello there", "greeting", {}),
+    ("tell me something interesting", "general", {}),
+])
+def test_classify(router, message, intent, slots):
+    # Test
+    result = router.classify(message)
+
+    # Verify
+    assert result.name == intent
+    assert result.slots == slots
+
+def test_schedule_intents_are_answered_locally(router):
+    # Test
+    schedule = router.classify("show my today schedule?")
+    chat = router.classify("What can you do?")
+
+    # Verify
+    assert schedule.local is True
+    assert chat.local is False
+
+def test_greeting_words_need_word_boundaries(router):
+    # Test
+    result = router.classify("which one is this")
+
+    # Verify
+    assert "greeting" not in result.features
+    assert result.name == "general"
+
+@pytest.mark.parametrize("message, intent", [
+    ("how much time does it take to boil an egg?", "general"),
+    ("what time zone is tokyo in", "general"),
+    ("when is the next date for the olympics", "general"),
+    ("plan a trip to paris for next week", "general"),
+    ("what should I cook tomorrow", "general"),
+    ("what is high tide", "general"),
+    ("What is the date of my dentist appointment?", "task_query"),
+])
+def test_words_in_passing_do_not_trigger_local_answers(router, message, intent):
+    # Test
+    result = router.classify(message)
+
+    # Verify: these need the LLM, not today's date or a schedule dump
+    assert result.name == intent
+    assert result.local is False
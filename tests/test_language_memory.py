@@ -0,0 +1,41 @@
+from app.services.language_memory import LanguageMemory
+
+def test_language_is_rechecked_periodically():
+    # Setup
+    memory = LanguageMemory(recheck_every=3)
+    memory.observe("u1", "en", 0.97)
+
+    # Test
+    hints = [memory.hint("u1") for _ in range(3)]
+
+    # Verify: the third request runs detection again
+    assert hints == ["en", "en", None]
+    assert memory.stats()["rechecks"] == 1
+
+def test_recheck_switches_or_forgets_the_language():
+    # Setup
+    memory = LanguageMemory(min_probability=0.8)
+    memory.observe("u1", "en", 0.97)
+    memory.observe("u2", "en", 0.97)
+
+    # Test
+    memory.observe("u1", "es", 0.9)
+    memory.observe("u2", "es", 0.5)
+
+    # Verify
+    assert memory.hint("u1") == "es"
+    assert memory.hint("u2") is None
+    assert memory.stats()["switches"] == 1 and memory.stats()["forgotten"] == 1
+
+def test_least_recent_users_are_evicted():
+    # Setup
+    memory = LanguageMemory(max_users=2)
+
+    # Test
+    for user in ("u1", "u2", "u3"):
+        memory.observe(user, "en", 0.99)
+
+    # Verify
+    assert memory.hint("u1") is None
+    assert memory.hint("u3") == "en"
+    assert memory.stats()["evicted_users"] == 1
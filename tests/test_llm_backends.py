@@ -0,0 +1,109 @@
+import asyncio
+from app.services.llm_backends import LocalTransformersBackend
+
+def local_backend(monkeypatch, max_batch_size=4):
+    """A local backend whose generate() records each batch instead of running a model"""
+    backend = LocalTransformersBackend(max_batch_size=max_batch_size, max_batch_wait_ms=10)
+    batches = []
+
+    async def loaded():
+        pass
+
+    def generate(batch):
+        batches.append([(p.messages[0]["content"], p.temperature) for p in batch])
+        return [{"content": p.messages[0]["content"]} for p in batch]
+
+    monkeypatch.setattr(backend, "_ensure_loaded", loaded)
+    monkeypatch.setattr(backend, "_generate_batch", generate)
+    return backend, batches
+
+def request(content, temperature):
+    return {"messages": [{"role": "user", "content": content}], "temperature": temperature}
+
+def test_requests_with_different_temperatures_never_share_a_batch(monkeypatch):
+    # Setup
+    backend, batches = local_backend(monkeypatch)
+
+    async def run():
+        return await asyncio.gather(
+            backend.complete(request("a", 0)),
+            backend.complete(request("b", 0.7)),
+            backend.complete(request("c", 0)),
+            backend.complete(request("d", 0.7)),
+        )
+
+    # Test
+    results = asyncio.run(run())
+
+    # Verify: each caller gets its own answer and each batch samples one way
+    assert [r["content"] for r in results] == ["a", "b", "c", "d"]
+    assert batches == [[("a", 0), ("c", 0)], [("b", 0.7), ("d", 0.7)]]
+    assert backend.stats()["batches"] == 2
+
+def test_matching_requests_are_batched_up_to_the_limit(monkeypatch):
+    # Setup
+    backend, batches = local_backend(monkeypatch, max_batch_size=2)
+
+    async def run():
+        return await asyncio.gather(*(backend.complete(request(str(i), 0)) for i in range(3)))
+
+    # Test
+    asyncio.run(run())
+
+    # Verify: oldest first, never more than max_batch_size at once
+    assert batches == [[("0", 0), ("1", 0)], [("2", 0)]]
+
+class WordTokenizer:
+    """Counts one token per word and renders messages one per line"""
+    def apply_chat_template(self, messages, tokenize=False, add_generation_prompt=True):
+        return "\n".join(f"{m['role']}: {m['content']}" for m in messages) + "\nassistant:"
+
+    def __call__(self, text, add_special_tokens=True):
+        return {"input_ids": text.split()}
+
+def test_long_prompt_drops_the_oldest_turns_and_keeps_the_question():
+    # Setup: room for the system prompt and the question, not for the history
+    backend = LocalTransformersBackend(max_input_tokens=12)
+    backend._tokenizer = WordTokenizer()
+    messages = [
+        {"role": "system", "content": "You are DONNA."},
+        {"role": "user", "content": "an old question about something else"},
+        {"role": "assistant", "content": "an old answer about something else"},
+        {"role": "user", "content": "what is due today?"},
+    ]
+
+    # Test
+    prompt = backend._prompt(messages)
+
+    # Verify
+    assert prompt == "system: You are DONNA.\nuser: what is due today?\nassistant:"
+
+def test_tokenizer_truncates_from_the_left(monkeypatch):
+    # Setup: stand-ins for torch and transformers so the loader runs here
+    import sys
+    import types
+
+    class Tokenizer:
+        pad_token = None
+        eos_token = "</s>"
+        padding_side = truncation_side = "right"
+
+    class Model:
+        def eval(self):
+            pass
+
+    transformers = types.ModuleType("transformers")
+    transformers.AutoTokenizer = types.SimpleNamespace(from_pretrained=lambda name: Tokenizer())
+    transformers.AutoModelForCausalLM = types.SimpleNamespace(from_pretrained=lambda name, **kwargs: Model())
+    torch = types.ModuleType("torch")
+    torch.float32 = "float32"
+    monkeypatch.setitem(sys.modules, "transformers", transformers)
+    monkeypatch.setitem(sys.modules, "torch", torch)
+    backend = LocalTransformersBackend(quantize=False)
+
+    # Test
+    backend._load()
+
+    # Verify: an over-long prompt loses its beginning, never the question and generation prompt
+    assert backend._tokenizer.truncation_side == "left"
+    assert backend._tokenizer.padding_side == "left"
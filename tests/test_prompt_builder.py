@@ -0,0 +1,58 @@
+import pytest
+from app.services.prompt_builder import BASE_PROMPT, COMMANDS_REFERENCE, PromptAssembler
+
+def context_sections():
+    lines = "\n".join(f"- Task number {i} with a long description of what needs doing" for i in range(40))
+    return [
+        ("date", "## TODAY\nToday is May 29, 2025."),
+        ("today", f"## TODAY'S TASKS\n{lines}"),
+        ("daily", f"## DAILY TASKS\n{lines}"),
+    ]
+
+@pytest.fixture
+def assembler():
+    return PromptAssembler("gpt-3.5-turbo")
+
+def budget_for(assembler, extra_tokens):
+    """A budget with room for the static prompt, the user message and extra_tokens of context"""
+    static = assembler.counter.count(BASE_PROMPT + "\n" + COMMANDS_REFERENCE)
+    return static + assembler.counter.count("what is on today?") + 20 + extra_tokens
+
+def test_context_within_budget_is_not_trimmed(assembler):
+    # Setup
+    assembler.token_budget = 100000
+
+    # Test
+    prompt = assembler.assemble("what is on today?", ["commands"], context_sections())
+
+    # Verify
+    assert prompt["trimmed_sections"] == []
+    assert "Task number 39" in prompt["messages"][1]["content"]
+
+def test_budget_overflow_trims_context_before_static_sections(assembler):
+    # Setup: room for the static prompt and only a little context
+    assembler.token_budget = budget_for(assembler, 150)
+
+    # Test
+    prompt = assembler.assemble("what is on today?", ["commands"], context_sections())
+
+    # Verify: static instructions intact, least important context trimmed first, date kept
+    static, context = prompt["messages"][0]["content"], prompt["messages"][1]["content"]
+    assert static == BASE_PROMPT + "\n" + COMMANDS_REFERENCE
+    assert "daily" in prompt["trimmed_sections"]
+    assert "date" not in prompt["trimmed_sections"]
+    assert "Today is May 29, 2025." in context
+    assert "more lines omitted" in context or "DAILY TASKS" not in context
+    assert prompt["tokens"]["total"] <= prompt["tokens"]["budget"]
+    assert prompt["messages"][-1] == {"role": "user", "content": "what is on today?"}
+
+def test_sections_are_trimmed_in_reverse_priority_order(assembler):
+    # Setup: enough room for the date and part of today's tasks, none for daily ones
+    assembler.token_budget = budget_for(assembler, 400)
+
+    # Test
+    prompt = assembler.assemble("what is on today?", ["commands"], context_sections())
+
+    # Verify
+    assert prompt["trimmed_sections"][0] == "daily"
+    assert "Task number 0" in prompt["messages"][1]["content"]
@@ -0,0 +1,54 @@
+import asyncio
+import pytest
+from app.services.rate_limiter import (
+    PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, RateLimitTimeout, TokenBucketRateLimiter
+)
+
+def test_acquire_within_budget_does_not_wait():
+    # Setup
+    limiter = TokenBucketRateLimiter(requests_per_minute=60, tokens_per_minute=1000)
+
+    # Test
+    asyncio.run(limiter.acquire(100))
+
+    # Verify
+    stats = limiter.stats()
+    assert stats["admitted"]["normal"] == 1
+    assert stats["queue_depth"] == 0
+    assert stats["tokens_available"] == 900
+
+def test_interactive_calls_are_served_before_background():
+    # Setup: one request per 50ms, and the first request uses up the bucket
+    limiter = TokenBucketRateLimiter(requests_per_minute=1200, tokens_per_minute=100000)
+    limiter.requests.level = 1
+    order = []
+
+    async def call(name, priority):
+        await limiter.acquire(10, priority)
+        order.append(name)
+
+    async def run():
+        await limiter.acquire(10)
+        await asyncio.gather(
+            call("background", PRIORITY_BACKGROUND),
+            call("interactive", PRIORITY_INTERACTIVE)
+        )
+
+    # Test
+    asyncio.run(run())
+
+    # Verify
+    assert order == ["interactive", "background"]
+
+def test_acquire_times_out_when_paused():
+    # Setup
+    limiter = TokenBucketRateLimiter(max_queue_wait=0.05)
+
+    async def run():
+        limiter.pause(5)
+        await limiter.acquire(10)
+
+    # Test / Verify
+    with pytest.raises(RateLimitTimeout):
+        asyncio.run(run())
+    assert limiter.stats()["timeouts"] == 1
@@ -0,0 +1,108 @@
+import asyncio
+import pytest
+from app.services.request_coalescer import SingleFlight
+
+def test_concurrent_callers_share_one_call():
+    # Setup
+    flight = SingleFlight()
+    calls = []
+
+    async def upstream():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "answer"
+
+    async def run():
+        return await asyncio.gather(*[flight.do("key", upstream) for _ in range(3)])
+
+    # Test
+    results = asyncio.run(run())
+
+    # Verify
+    assert results == ["answer"] * 3
+    assert len(calls) == 1
+    assert flight.stats() == {"in_flight": 0, "upstream_calls": 1, "coalesced_hits": 2}
+
+def test_exception_reaches_every_waiter():
+    # Setup
+    flight = SingleFlight()
+
+    async def upstream():
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream failed")
+
+    async def run():
+        return await asyncio.gather(*[flight.do("key", upstream) for _ in range(2)], return_exceptions=True)
+
+    # Test
+    results = asyncio.run(run())
+
+    # Verify
+    assert all(isinstance(r, ValueError) for r in results)
+    assert flight.stats()["upstream_calls"] == 1
+
+def test_key_is_cleared_after_completion():
+    # Setup
+    flight = SingleFlight()
+    calls = []
+
+    async def upstream():
+        calls.append(1)
+        return len(calls)
+
+    async def run():
+        first = await flight.do("key", upstream)
+        in_flight = flight.in_flight("key")
+        second = await flight.do("key", upstream)
+        return first, in_flight, second
+
+    # Test
+    first, in_flight, second = asyncio.run(run())
+
+    # Verify: a later call with the same key goes upstream again
+    assert (first, second) == (1, 2)
+    assert in_flight is False
+
+def test_cancelled_follower_does_not_cancel_the_leader():
+    # Setup
+    flight = SingleFlight()
+
+    async def upstream():
+        await asyncio.sleep(0.02)
+        return "answer"
+
+    async def run():
+        leader = asyncio.ensure_future(flight.do("key", upstream))
+        follower = asyncio.ensure_future(flight.do("key", upstream))
+        await asyncio.sleep(0.005)
+        follower.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await follower
+        return await leader
+
+    # Test / Verify
+    assert asyncio.run(run()) == "answer"
+
+def test_cancelled_leader_does_not_cancel_the_shared_call():
+    # Setup
+    flight = SingleFlight()
+
+    async def upstream():
+        await asyncio.sleep(0.02)
+        return "answer"
+
+    async def run():
+        leader = asyncio.ensure_future(flight.do("key", upstream))
+        await asyncio.sleep(0.005)
+        follower = asyncio.ensure_future(flight.do("key", upstream))
+        await asyncio.sleep(0.005)
+        leader.cancel()
+        return await follower
+
+    # Test / Verify
+    assert asyncio.run(run()) == "answer"
+
+def test_key_for_ignores_dict_order():
+    # Test / Verify
+    assert SingleFlight.key_for({"a": 1, "b": [1, 2]}) == SingleFlight.key_for({"b": [1, 2], "a": 1})
+    assert SingleFlight.key_for({"a": 1}) != SingleFlight.key_for({"a": 2})
@@ -0,0 +1,155 @@
+import asyncio
+import time
+import pytest
+from app.services.resilience import CircuitBreaker, CircuitOpenError, ResilientExecutor
+
+class UpstreamError(Exception):
+    def __init__(self, status_code, retry_after=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+class FakeUpstream:
+    """Answers with the scripted outcomes in order: an exception to raise or a value to return"""
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        outcome = self.outcomes.pop(0) if self.outcomes else "ok"
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+def test_retryable_errors_are_retried_until_success():
+    # Setup
+    upstream = FakeUpstream(UpstreamError(503), UpstreamError(502), "answer")
+    executor = ResilientExecutor(max_retries=3, base_delay=0)
+
+    # Test
+    result = asyncio.run(executor.call(upstream))
+
+    # Verify
+    assert result == "answer"
+    assert upstream.calls == 3
+    assert executor.retries == 2
+    assert executor.breaker.state == CircuitBreaker.CLOSED
+
+def test_client_errors_are_not_retried():
+    # Setup
+    upstream = FakeUpstream(UpstreamError(400))
+    executor = ResilientExecutor(max_retries=3, base_delay=0)
+
+    # Test / Verify
+    with pytest.raises(UpstreamError):
+        asyncio.run(executor.call(upstream))
+    assert upstream.calls == 1
+    assert executor.breaker.consecutive_failures == 0
+
+def test_breaker_opens_then_half_opens_and_closes_after_a_good_probe():
+    # Setup
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    executor = ResilientExecutor(max_retries=0, breaker=breaker)
+    for _ in range(2):
+        with pytest.raises(UpstreamError):
+            asyncio.run(executor.call(FakeUpstream(UpstreamError(500))))
+    assert breaker.state == CircuitBreaker.OPEN
+
+    # Test: short-circuited while open, then one probe after the cool-down
+    upstream = FakeUpstream("recovered")
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(executor.call(upstream))
+    time.sleep(0.06)
+    result = asyncio.run(executor.call(upstream))
+
+    # Verify
+    assert result == "recovered"
+    assert upstream.calls == 1
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.times_opened == 1
+
+def test_half_open_lets_one_probe_through_and_reopens_if_it_fails():
+    # Setup
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+
+    # Test
+    first, second = breaker.allow_request(), breaker.allow_request()
+    breaker.record_failure()
+
+    # Verify
+    assert (first, second) == (True, False)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+
+def test_probe_is_released_by_a_non_retryable_error():
+    # Setup: half-open with the probe about to go out
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    executor = ResilientExecutor(max_retries=0, breaker=breaker)
+    breaker.record_failure()
+    time.sleep(0.06)
+
+    # Test: the probe hits a client error, which says nothing about upstream health
+    with pytest.raises(UpstreamError):
+        asyncio.run(executor.call(FakeUpstream(UpstreamError(400))))
+
+    # Verify: still half-open, and the next request may probe
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow_request()
+
+def test_retry_after_is_honoured_but_capped():
+    # Setup
+    executor = ResilientExecutor(base_delay=0.5, max_delay=1.0)
+
+    # Test / Verify: never shorter than Retry-After, never longer than four times max_delay
+    assert executor.backoff_delay(0, retry_after=2.0) >= 2.0
+    assert executor.backoff_delay(0, retry_after=600.0) == 4.0
+    assert executor.backoff_delay(5) <= 1.0
+
+def test_retry_waits_for_retry_after(monkeypatch):
+    # Setup
+    delays = []
+
+    async def fake_sleep(seconds):
+        delays.append(seconds)
+
+    monkeypatch.setattr(asyncio, "sleep", fake_sleep)
+    executor = ResilientExecutor(max_retries=1, base_delay=0.01, max_delay=0.5)
+
+    # Test
+    asyncio.run(executor.call(FakeUpstream(UpstreamError(429, retry_after=30.0), "ok")))
+
+    # Verify
+    assert delays == [2.0]
+
+def test_slow_request_is_hedged_and_the_loser_cancelled():
+    # Setup: hedging after 20ms; the first request hangs, the duplicate is fast
+    executor = ResilientExecutor(hedge_enabled=True, hedge_min_samples=1, hedge_min_delay=0.02)
+    executor.latency.record(0.001)
+    state = {"calls": 0, "cancelled": False}
+
+    async def upstream():
+        state["calls"] += 1
+        if state["calls"] == 1:
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                state["cancelled"] = True
+                raise
+            return "slow"
+        return "fast"
+
+    async def run():
+        result = await executor.call(upstream)
+        await asyncio.sleep(0)  # Let the cancellation reach the loser
+        return result
+
+    # Test
+    result = asyncio.run(run())
+
+    # Verify
+    assert result == "fast"
+    assert executor.hedges_sent == 1 and executor.hedges_won == 1
+    assert state["cancelled"] is True
@@ -0,0 +1,112 @@
+import itertools
+import pytest
+from app.services import semantic_cache
+from app.services.ai_service import AIService
+from app.services.semantic_cache import SemanticCache
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A time.time that moves forward one second per call, so recency is never tied"""
+    ticks = itertools.count(1000)
+    now = {"offset": 0}
+    monkeypatch.setattr(semantic_cache.time, "time", lambda: next(ticks) + now["offset"])
+    return now
+
+def test_paraphrase_hits_and_unrelated_question_misses():
+    # Setup
+    cache = SemanticCache(threshold=0.9)
+    cache.set("what tasks do I have today", "scope", "You have two tasks.")
+
+    # Test / Verify
+    assert cache.get("What do I have on my plate today?", "scope") == "You have two tasks."
+    assert cache.get("what is the weather in paris", "scope") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+def test_threshold_is_respected():
+    # Setup: a threshold no similarity can reach
+    cache = SemanticCache(threshold=1.01)
+    cache.set("what tasks do I have today", "scope", "You have two tasks.")
+
+    # Test / Verify
+    assert cache.get("what tasks do I have today", "scope") is None
+
+def test_entries_never_cross_scopes():
+    # Setup
+    cache = SemanticCache()
+    cache.set("what tasks do I have today", "scope-a", "Answer for A")
+
+    # Test / Verify
+    assert cache.get("what tasks do I have today", "scope-b") is None
+    assert cache.get("what tasks do I have today", "scope-a") == "Answer for A"
+
+def test_users_get_separate_scopes_for_the_same_prompt():
+    # Setup: identical prompts, as in tool-calling mode where only the date is in the prompt
+    service = AIService()
+    messages = [{"role": "system", "content": "You are DONNA."}]
+    cache = SemanticCache()
+    cache.set("search my tasks for budget", service._cache_scope(messages, "user_001"), "user_001's tasks")
+
+    # Test
+    result = cache.get("search my tasks for budget", service._cache_scope(messages, "someone_else"))
+
+    # Verify
+    assert result is None
+
+def test_least_recently_used_entry_is_evicted(clock):
+    # Setup
+    cache = SemanticCache(max_entries=2)
+    cache.set("what tasks do I have today", "scope", "tasks")
+    cache.set("what is the weather in paris", "scope", "weather")
+    cache.get("what tasks do I have today", "scope")
+
+    # Test
+    cache.set("tell me a joke about cats", "scope", "joke")
+
+    # Verify
+    assert cache.get("what is the weather in paris", "scope") is None
+    assert cache.get("what tasks do I have today", "scope") == "tasks"
+    assert cache.stats()["evictions"] == 1
+
+def test_expired_entries_miss_and_are_evicted_first(clock):
+    # Setup
+    cache = SemanticCache(max_entries=2, ttl_seconds=100)
+    cache.set("what tasks do I have today", "scope", "tasks")
+    clock["offset"] = 50
+    cache.set("what is the weather in paris", "scope", "weather")
+    clock["offset"] = 120
+
+    # Test
+    expired = cache.get("what tasks do I have today", "scope")
+    cache.set("tell me a joke about cats", "scope", "joke")
+
+    # Verify: the expired entry's slot is reused, the live one survives
+    assert expired is None
+    assert cache.get("what is the weather in paris", "scope") == "weather"
+
+@pytest.mark.parametrize("cached, asked", [
+    ("add milk to my shopping list", "do not add milk to my shopping list"),
+    ("add milk to my shopping list", "don't add milk to my shopping list"),
+    ("write an email to sarah to reschedule our quarterly budget review meeting to friday afternoon",
+     "write an email to sarah to reschedule our quarterly budget review meeting to monday afternoon"),
+])
+def test_similar_wording_with_a_different_meaning_misses(cached, asked):
+    # Setup
+    cache = SemanticCache(threshold=0.9)
+    cache.set(cached, "scope", "cached answer")
+
+    # Test
+    result = cache.get(asked, "scope")
+
+    # Verify: similar enough for the embedding, but a content word differs
+    assert float(cache.embed(cached) @ cache.embed(asked)) >= 0.9
+    assert result is None
+    assert cache.stats()["rejected"] == 1
+
+def test_paraphrase_through_synonyms_and_framing_words_hits():
+    # Setup
+    cache = SemanticCache(threshold=0.9)
+    cache.set("what's on my plate", "scope", "You have two tasks.")
+
+    # Test / Verify
+    assert cache.get("what do I have to do", "scope") == "You have two tasks."
+    assert cache.get("what do I have to do friday", "scope") is None
@@ -0,0 +1,186 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pytest
+from app.services.speech_recognition import SpeechRecognitionService
+
+@pytest.fixture
+def stt_service(monkeypatch, tmp_path):
+    monkeypatch.setenv("STT_PROFILE", "none")
+    monkeypatch.setenv("STT_CACHE_DIR", str(tmp_path))
+    service = SpeechRecognitionService()
+    service.state = service.READY
+    service.calls = []
+
+    async def fake_submit(audio_np, beam_size=5, language=None, batch=True, admitted=False):
+        service.calls.append(len(audio_np))
+        await asyncio.sleep(0.01)
+        return f"{len(audio_np)} samples", language or "en", 1.0
+
+    monkeypatch.setattr(service, "_submit", fake_submit)
+    return service
+
+def speech_pcm(seconds=1.0):
+    t = np.arange(int(16000 * seconds)) / 16000
+    return (8000 * np.sin(2 * np.pi * 220 * t)).astype("<i2").tobytes()
+
+def test_repeated_upload_is_served_from_cache(stt_service):
+    # Setup
+    pcm = speech_pcm()
+
+    # Test
+    first = asyncio.run(stt_service.transcribe(pcm, "s16le"))
+    second = asyncio.run(stt_service.transcribe(pcm, "s16le"))
+
+    # Verify
+    assert len(stt_service.calls) == 1
+    assert "cached" not in first
+    assert second["cached"] is True
+    assert second["text"] == first["text"]
+
+def test_language_is_part_of_the_cache_key(stt_service):
+    # Setup
+    pcm = speech_pcm()
+
+    # Test
+    asyncio.run(stt_service.transcribe(pcm, "s16le"))
+    result = asyncio.run(stt_service.transcribe(pcm, "s16le", language="fr"))
+
+    # Verify
+    assert len(stt_service.calls) == 2
+    assert result["language"] == "fr"
+
+def test_concurrent_identical_uploads_share_one_transcription(stt_service):
+    # Setup
+    pcm = speech_pcm()
+
+    async def run():
+        return await asyncio.gather(*[stt_service.transcribe(pcm, "s16le") for _ in range(3)])
+
+    # Test
+    results = asyncio.run(run())
+
+    # Verify
+    assert len(stt_service.calls) == 1
+    assert len({r["text"] for r in results}) == 1
+    assert stt_service.single_flight.stats()["coalesced_hits"] == 2
+
+def test_disk_tier_survives_a_restart(stt_service):
+    # Setup
+    pcm = speech_pcm()
+    asyncio.run(stt_service.transcribe(pcm, "s16le"))
+
+    # Test: a fresh service with an empty memory tier and no model loaded
+    restarted = SpeechRecognitionService()
+    result = asyncio.run(restarted.transcribe(pcm, "s16le"))
+
+    # Verify
+    assert result["cached"] is True
+    assert restarted.state == restarted.NOT_LOADED
+
+def detecting_submit(stt_service, monkeypatch, detected="de", probability=0.95):
+    async def fake_submit(audio_np, beam_size=5, language=None, batch=True, admitted=False):
+        stt_service.calls.append(language)
+        return "hallo", language or detected, 1.0 if language else probability
+
+    monkeypatch.setattr(stt_service, "_submit", fake_submit)
+
+def test_confident_detection_is_reused_for_the_same_user(stt_service, monkeypatch):
+    # Setup
+    detecting_submit(stt_service, monkeypatch)
+
+    # Test
+    first = asyncio.run(stt_service.transcribe(speech_pcm(1.0), "s16le", user_id="u1"))
+    second = asyncio.run(stt_service.transcribe(speech_pcm(1.1), "s16le", user_id="u1"))
+    other = asyncio.run(stt_service.transcribe(speech_pcm(1.2), "s16le", user_id="u2"))
+    forced = asyncio.run(stt_service.transcribe(speech_pcm(1.3), "s16le", language="auto", user_id="u1"))
+
+    # Verify: only the second request from u1 skips detection
+    assert stt_service.calls == [None, "de", None, None]
+    assert first["language_source"] == "detected" and second["language_source"] == "user"
+    assert other["language_source"] == "detected" and forced["language_source"] == "detected"
+
+def test_unsure_detection_is_not_remembered(stt_service, monkeypatch):
+    # Setup
+    detecting_submit(stt_service, monkeypatch, probability=0.4)
+
+    # Test
+    asyncio.run(stt_service.transcribe(speech_pcm(1.0), "s16le", user_id="u1"))
+    result = asyncio.run(stt_service.transcribe(speech_pcm(1.1), "s16le", user_id="u1"))
+
+    # Verify
+    assert stt_service.calls == [None, None]
+    assert result["language_source"] == "detected"
+
+class FakeWhisper:
+    """Stands in for the faster-whisper model on the real worker pool path"""
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+        self.calls = 0
+
+    def transcribe(self, audio_np, beam_size=5, language=None):
+        self.calls += 1
+        if self.fail_on is not None and len(audio_np) == self.fail_on:
+            raise RuntimeError("decoder crashed")
+        info = type("Info", (), {"language": "en", "language_probability": 0.99})
+        return [type("Segment", (), {"text": "word"})], info
+
+@pytest.fixture
+def pooled_service(monkeypatch):
+    monkeypatch.setenv("STT_PROFILE", "none")
+    monkeypatch.setenv("STT_CACHE", "false")
+    monkeypatch.setenv("STT_BATCHING", "false")
+    monkeypatch.setenv("STT_MAX_QUEUE", "2")
+    service = SpeechRecognitionService()
+    service.state = service.READY
+    service._executor = ThreadPoolExecutor(1)
+    yield service
+    service._executor.shutdown()
+
+def test_long_upload_is_admitted_once(pooled_service, monkeypatch):
+    # Setup: far more speech chunks than the queue bound
+    chunks = [np.zeros(1600 + i, dtype=np.float32) for i in range(40)]
+    pooled_service.model = FakeWhisper()
+
+    async def fake_chunks(audio_np):
+        return chunks
+
+    monkeypatch.setattr(pooled_service, "speech_chunks", fake_chunks)
+
+    # Test
+    result = asyncio.run(pooled_service.transcribe(speech_pcm(), "s16le"))
+
+    # Verify
+    assert result["success"] is True
+    assert pooled_service.model.calls == 40
+    assert pooled_service.rejected == 0
+
+def test_failed_chunk_cancels_the_rest_of_the_request(pooled_service, monkeypatch):
+    # Setup: the second chunk fails while the others are still waiting for the single replica
+    chunks = [np.zeros(1600 + i, dtype=np.float32) for i in range(20)]
+    pooled_service.model = FakeWhisper(fail_on=1601)
+
+    async def fake_chunks(audio_np):
+        return chunks
+
+    monkeypatch.setattr(pooled_service, "speech_chunks", fake_chunks)
+
+    # Test
+    result = asyncio.run(pooled_service.transcribe(speech_pcm(), "s16le"))
+
+    # Verify
+    assert result["success"] is False and "decoder crashed" in result["error"]
+    # The freed slot may start one more chunk before the failure is seen; the rest never run
+    assert pooled_service.model.calls <= 3
+    assert pooled_service.in_flight == 0
+
+def test_truncated_wav_is_reported_as_invalid_audio(stt_service):
+    # Setup: 22 bytes, a RIFF/WAVE header cut off inside the fmt chunk
+    data = b"RIFF\x24\x00\x00\x00WAVEfmt \x10\x00\x00\x00\x01\x00"
+
+    # Test
+    result = asyncio.run(stt_service.transcribe(data))
+
+    # Verify
+    assert result["success"] is False
+    assert result["invalid_audio"] is True
@@ -0,0 +1,60 @@
+import asyncio
+import numpy as np
+from app.services.stt_batcher import MicroBatchScheduler
+
+def make_runner(calls, fail=False):
+    async def run_batch(audios, languages):
+        calls.append(len(audios))
+        await asyncio.sleep(0.01)
+        if fail:
+            raise RuntimeError("decoder crashed")
+        return [(f"{len(audio)} samples", language or "en", 1.0) for audio, language in zip(audios, languages)]
+    return run_batch
+
+def test_concurrent_clips_share_one_batch():
+    # Setup
+    calls = []
+    scheduler = MicroBatchScheduler(make_runner(calls), max_batch_size=8, max_wait_ms=20)
+
+    async def run():
+        return await asyncio.gather(*[
+            scheduler.submit(np.zeros(n, dtype=np.float32), "de" if n == 2 else None) for n in (1, 2, 3)
+        ])
+
+    # Test
+    results = asyncio.run(run())
+
+    # Verify: each result goes back to the clip that asked for it
+    assert calls == [3]
+    assert results == [("1 samples", "en", 1.0), ("2 samples", "de", 1.0), ("3 samples", "en", 1.0)]
+    assert scheduler.stats()["avg_batch_size"] == 3
+
+def test_batches_are_capped_at_max_batch_size():
+    # Setup
+    calls = []
+    scheduler = MicroBatchScheduler(make_runner(calls), max_batch_size=4, max_wait_ms=20)
+
+    async def run():
+        await asyncio.gather(*[scheduler.submit(np.zeros(i + 1, dtype=np.float32)) for i in range(10)])
+
+    # Test
+    asyncio.run(run())
+
+    # Verify
+    assert calls == [4, 4, 2]
+    assert scheduler.stats()["largest_batch"] == 4
+
+def test_batch_failure_reaches_every_waiting_clip():
+    # Setup
+    scheduler = MicroBatchScheduler(make_runner([], fail=True), max_batch_size=4, max_wait_ms=5)
+
+    async def run():
+        return await asyncio.gather(*[scheduler.submit(np.zeros(10, dtype=np.float32)) for _ in range(2)],
+                                    return_exceptions=True)
+
+    # Test
+    results = asyncio.run(run())
+
+    # Verify
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert scheduler.stats()["failed_batches"] == 1
@@ -0,0 +1,66 @@
+import json
+import pytest
+from app.services.stt_profiles import DEFAULT_PROFILE, PROFILES, resolve_profile, select_profile, word_error_rate
+
+@pytest.mark.parametrize("reference, hypothesis, expected", [
+    ("turn on the lights", "turn on the lights", 0.0),
+    ("turn on the lights", "Turn on the lights!", 0.0),
+    ("turn on the lights", "turn off the lights", 0.25),
+    ("turn on the lights", "turn the lights", 0.25),
+    ("turn on the lights", "please turn on the lights now", 0.5),
+    ("turn on the lights", "", 1.0),
+    ("", "", 0.0),
+    ("", "noise", 1.0),
+])
+def test_word_error_rate(reference, hypothesis, expected):
+    # Test / Verify: substitutions, deletions and insertions all count one each
+    assert word_error_rate(reference, hypothesis) == pytest.approx(expected)
+
+def test_fastest_profile_within_targets_is_selected():
+    # Setup
+    results = {
+        "tiny-int8-greedy": {"wer": 0.30, "rtf": 0.05},
+        "base-int8": {"wer": 0.12, "rtf": 0.20},
+        "small-int8": {"wer": 0.08, "rtf": 0.45},
+    }
+
+    # Test / Verify
+    assert select_profile(results, max_wer=0.15, max_rtf=0.5) == "base-int8"
+    assert select_profile(results, max_wer=0.05, max_rtf=0.5) is None
+
+def test_results_for_unknown_or_incomplete_profiles_are_ignored():
+    # Setup
+    results = {
+        "retired-profile": {"wer": 0.01, "rtf": 0.01},
+        "base-int8-greedy": {"wer": None, "rtf": 0.1},
+        "small-int8": {"wer": 0.10, "rtf": 0.40},
+    }
+
+    # Test / Verify
+    assert select_profile(results, max_wer=0.15, max_rtf=0.5) == "small-int8"
+
+def test_auto_falls_back_to_the_most_accurate_profile(tmp_path):
+    # Setup: nothing meets both targets
+    path = tmp_path / "results.json"
+    path.write_text(json.dumps({"profiles": {
+        "tiny-int8-greedy": {"wer": 0.30, "rtf": 0.05},
+        "medium-int8": {"wer": 0.06, "rtf": 1.8},
+        "retired-profile": {"wer": 0.01, "rtf": 0.9},
+    }}))
+
+    # Test
+    profile = resolve_profile("auto", str(path), max_wer=0.05, max_rtf=0.5)
+
+    # Verify
+    assert profile is PROFILES["medium-int8"]
+
+def test_auto_without_measurements_uses_the_default_profile(tmp_path):
+    # Setup: never benchmarked, as on a checkout without recordings
+    missing = str(tmp_path / "missing.json")
+
+    # Test / Verify
+    assert resolve_profile("auto", missing, 0.15, 0.5) is PROFILES[DEFAULT_PROFILE]
+    assert resolve_profile("auto", missing, 0.15, 0.5, default=None) is None
+    assert resolve_profile("none", missing, 0.15, 0.5) is None
+    with pytest.raises(ValueError):
+        resolve_profile("huge-fp64", missing, 0.15, 0.5)
@@ -0,0 +1,121 @@
+from datetime import date, datetime, timedelta
+import pytest
+from app.services.task_context import TaskContextBuilder
+from app.services.task_service import TaskService
+
+def days_from_today(days):
+    return (date.today() + timedelta(days=days)).isoformat()
+
+def task(title, due_in, priority="medium", status="pending", frequency="once", description=""):
+    return {"title": title, "description": description, "due_date": days_from_today(due_in),
+            "priority": priority, "frequency": frequency, "status": status}
+
+@pytest.fixture
+def task_service(tmp_path, monkeypatch):
+    service = TaskService()
+    monkeypatch.setattr(service, "tasks_file", str(tmp_path / "tasks.json"))
+    service._save_tasks({
+        "user_001": [
+            task("Stand-up", 0, frequency="daily", description="Team sync"),
+            task("Ship release", 0, priority="high", status="in progress"),
+            task("Old report", 0, priority="high", status="completed"),
+            task("Overdue invoice", -3, priority="high"),
+            task("Dentist", 2, priority="low", description="   "),
+            task("Gym", 3, frequency="daily"),
+            task("Groceries", 4),
+            task("Car service", 6, priority="low"),
+            task("Tax return", 7, priority="high"),
+            task("Holiday", 30),
+        ],
+        "someone_else": [task("Not mine", 0, priority="high")],
+    })
+    return service
+
+def baseline_task_context(task_service, user_id):
+    """AIService._get_task_context as it was before the single-pass builder, one query per section"""
+    context = [f"📅 Today's Date: {datetime.now().strftime('%B %d, %Y')}"]
+
+    today_tasks = task_service.get_today_tasks(user_id)
+    if today_tasks:
+        context.append(f"\n📋 TODAY'S TASKS ({len(today_tasks)} tasks):")
+        for t in today_tasks:
+            status_emoji = "✅" if t['status'] == "completed" else "🔄" if t['status'] == "in progress" else "⏳"
+            priority_emoji = "🔴" if t['priority'] == "high" else "🟡" if t['priority'] == "medium" else "🟢"
+            context.append(f"  {status_emoji} {priority_emoji} {t['title']}")
+            if t.get('description', '').strip():
+                context.append(f"      Description: {t['description']}")
+            context.append(f"      Priority: {t['priority']} | Status: {t['status']}")
+    else:
+        context.append("\n📋 TODAY'S TASKS: No tasks scheduled for today")
+
+    high_priority = task_service.get_highest_priority_task(user_id)
+    if high_priority:
+        context.append("\n🚨 HIGHEST PRIORITY TASK:")
+        context.append(f"   {high_priority['title']}")
+        context.append(f"   Due: {high_priority['due_date']} | Status: {high_priority['status']}")
+
+    upcoming_tasks = task_service.get_upcoming_tasks(user_id, 7)
+    if upcoming_tasks:
+        context.append(f"\n📈 UPCOMING TASKS (Next 7 days - {len(upcoming_tasks)} tasks):")
+        for t in upcoming_tasks[:5]:
+            priority_emoji = "🔴" if t['priority'] == "high" else "🟡" if t['priority'] == "medium" else "🟢"
+            context.append(f"  {priority_emoji} {t['title']} (Due: {t['due_date']})")
+        if len(upcoming_tasks) > 5:
+            context.append(f"  ... and {len(upcoming_tasks) - 5} more tasks")
+    else:
+        context.append("\n📈 UPCOMING TASKS: No upcoming tasks in the next 7 days")
+
+    daily_tasks = task_service.get_daily_tasks(user_id)
+    if daily_tasks:
+        context.append(f"\n🔄 DAILY RECURRING TASKS ({len(daily_tasks)} tasks):")
+        for t in daily_tasks:
+            priority_emoji = "🔴" if t['priority'] == "high" else "🟡" if t['priority'] == "medium" else "🟢"
+            context.append(f"  {priority_emoji} {t['title']} (Priority: {t['priority']})")
+
+    all_tasks = task_service.get_all_tasks(user_id)
+    if all_tasks:
+        completed_count = len([t for t in all_tasks if t.get('status') == 'completed'])
+        pending_count = len([t for t in all_tasks if t.get('status') == 'pending'])
+        in_progress_count = len([t for t in all_tasks if t.get('status') == 'in progress'])
+        context.append("\n📊 TASK SUMMARY:")
+        context.append(f"   Total Tasks: {len(all_tasks)}")
+        context.append(f"   Completed: {completed_count} | In Progress: {in_progress_count} | Pending: {pending_count}")
+
+    return "\n".join(context)
+
+@pytest.mark.parametrize("user_id", ["user_001", "someone_else", "nobody"])
+def test_single_pass_matches_the_per_section_queries(task_service, user_id):
+    # Setup
+    builder = TaskContextBuilder(task_service)
+
+    # Test
+    context = builder.build(user_id)
+
+    # Verify: same text as before, section for section
+    assert context == baseline_task_context(task_service, user_id)
+
+def test_sections_are_named_for_the_prompt_budget(task_service):
+    # Test
+    names = [name for name, _ in TaskContextBuilder(task_service).build_sections("user_001")]
+
+    # Verify
+    assert names == ["date", "today", "priority", "upcoming", "daily", "summary"]
+
+def test_context_is_memoized_until_the_store_changes(task_service, monkeypatch):
+    # Setup
+    builder = TaskContextBuilder(task_service)
+    reads = []
+    snapshot = task_service.get_snapshot
+    monkeypatch.setattr(task_service, "get_snapshot", lambda: reads.append(1) or snapshot())
+    first = builder.build("user_001")
+    again = builder.build("user_001")
+
+    # Test
+    task_service.create_task("user_001", "New urgent thing", due_date=days_from_today(0), priority="high")
+    changed = builder.build("user_001")
+
+    # Verify: one read for the repeat, a fresh one after the write
+    assert again == first
+    assert len(reads) == 2
+    assert "New urgent thing" in changed and "New urgent thing" not in first
+    assert changed == baseline_task_context(task_service, "user_001")
@@ -0,0 +1,67 @@
+import json
+import pytest
+from app.services.task_service import TaskService
+from app.services.task_tools import TaskToolExecutor
+
+@pytest.fixture
+def executor(tmp_path, monkeypatch):
+    service = TaskService()
+    monkeypatch.setattr(service, "tasks_file", str(tmp_path / "tasks.json"))
+    service.create_task("user_001", "Budget review", description="Q3 numbers", due_date="2025-06-02",
+                        priority="high")
+    service.create_task("user_001", "Dentist", due_date="2025-06-03")
+    return TaskToolExecutor(service)
+
+def run(executor, name, arguments, user_id="user_001"):
+    return json.loads(executor.execute(name, json.dumps(arguments), user_id))
+
+def test_read_tools_return_compact_task_lists(executor):
+    # Test
+    by_date = run(executor, "get_tasks_for_date", {"date": "2025-06-02"})
+    by_keyword = run(executor, "search_tasks_by_keyword", {"keyword": "budget"})
+
+    # Verify: only the task fields the model needs
+    assert by_date["count"] == 1
+    assert by_date["tasks"][0] == {"title": "Budget review", "description": "Q3 numbers", "due_date": "2025-06-02",
+                                   "priority": "high", "frequency": "once", "status": "pending"}
+    assert [task["title"] for task in by_keyword["tasks"]] == ["Budget review"]
+    assert executor.stats()["calls"]["get_tasks_for_date"] == 1
+
+def test_write_tools_change_the_store(executor):
+    # Test
+    created = run(executor, "create_task", {"title": "Call mom", "due_date": "2025-06-04", "priority": "low"})
+    updated = run(executor, "update_task_status", {"title": "Dentist", "status": "completed"})
+
+    # Verify
+    tasks = {task["title"]: task for task in executor.task_service.get_all_tasks("user_001")}
+    assert created == {"created": True, "title": "Call mom"}
+    assert updated == {"updated": True, "title": "Dentist", "status": "completed"}
+    assert tasks["Call mom"]["priority"] == "low"
+    assert tasks["Dentist"]["status"] == "completed"
+
+@pytest.mark.parametrize("name, arguments, error", [
+    ("get_tasks_for_date", {}, "Missing required argument: date"),
+    ("get_upcoming_tasks", {"days": "soon"}, "Argument days must be of type integer"),
+    ("update_task_status", {"title": "Dentist", "status": "done"}, "Argument status must be one of"),
+    ("create_task", {"title": "Call mom", "owner": "someone_else"}, "Unexpected argument: owner"),
+    ("delete_everything", {}, "Unknown tool: delete_everything"),
+])
+def test_invalid_calls_are_reported_to_the_model_and_change_nothing(executor, name, arguments, error):
+    # Setup
+    before = executor.task_service.get_all_tasks("user_001")
+
+    # Test
+    result = run(executor, name, arguments)
+
+    # Verify
+    assert result["error"].startswith(error)
+    assert executor.stats()["errors"] == 1
+    assert executor.task_service.get_all_tasks("user_001") == before
+
+def test_malformed_json_is_an_error(executor):
+    # Test
+    result = json.loads(executor.execute("create_task", "{not json", "user_001"))
+
+    # Verify
+    assert "error" in result
+    assert len(executor.task_service.get_all_tasks("user_001")) == 2
@@ -0,0 +1,89 @@
+import os
+import pytest
+from app.services.transcript_store import TranscriptStore
+
+@pytest.fixture
+def store(tmp_path):
+    return TranscriptStore(base_dir=str(tmp_path), segment_max_records=10, index_every=3, retention_days=1)
+
+def test_pages_are_newest_first_with_cursor(store):
+    # Setup
+    for i in range(25):
+        store.append("user_001", f"question {i}", f"answer {i}", ts=1000.0 + i)
+
+    # Test
+    first = store.read_page("user_001", limit=7)
+    second = store.read_page("user_001", first["next_cursor"], limit=7)
+
+    # Verify
+    assert [m["seq"] for m in first["messages"]] == list(range(24, 17, -1))
+    assert [m["seq"] for m in second["messages"]] == list(range(17, 10, -1))
+    assert second["messages"][0]["user"] == "question 17"
+
+def test_last_page_has_no_cursor(store):
+    # Setup
+    for i in range(4):
+        store.append("user_001", f"question {i}", f"answer {i}")
+
+    # Test
+    page = store.read_page("user_001", limit=10)
+
+    # Verify
+    assert len(page["messages"]) == 4
+    assert page["next_cursor"] is None
+
+def test_reopened_store_recovers_unindexed_records(store, tmp_path):
+    # Setup
+    for i in range(5):
+        store.append("user_001", f"question {i}", f"answer {i}")
+    segment = os.path.join(str(tmp_path), "user_001", "000000000000.jsonl")
+    with open(segment, "ab") as f:
+        f.write(b'{"seq": 5, "ts"')  # torn write
+
+    # Test
+    reopened = TranscriptStore(base_dir=str(tmp_path), segment_max_records=10, index_every=3)
+    seq = reopened.append("user_001", "question 5", "answer 5")
+
+    # Verify
+    assert seq == 5
+    assert [m["seq"] for m in reopened.read_page("user_001")["messages"]] == [5, 4, 3, 2, 1, 0]
+
+def test_retention_deletes_only_old_segments(store):
+    # Setup
+    for i in range(20):
+        store.append("user_001", f"question {i}", f"answer {i}", ts=1000.0 + i)
+    store.append("user_001", "question 20", "answer 20", ts=1000.0 + 3 * 86400)
+
+    # Test
+    page = store.read_page("user_001", limit=50)
+
+    # Verify
+    assert [m["seq"] for m in page["messages"]] == [20]
+    assert store.stats()["segments_deleted"] == 2
+
+def test_inactive_user_expires_completely(store, tmp_path):
+    # Setup: one user stopped chatting two days ago, another is still active
+    for i in range(3):
+        store.append("gone_user", f"question {i}", f"answer {i}", ts=1000.0 + i)
+    store.append("user_001", "question", "answer", ts=1000.0 + 2 * 86400)
+
+    # Test
+    store.apply_retention(now=1000.0 + 2 * 86400)
+
+    # Verify
+    assert store.read_page("gone_user")["messages"] == []
+    assert not os.path.exists(os.path.join(str(tmp_path), "gone_user"))
+    assert len(store.read_page("user_001")["messages"]) == 1
+    assert store.stats()["users_expired"] == 1
+
+def test_idle_user_indexes_are_evicted(tmp_path):
+    # Setup
+    store = TranscriptStore(base_dir=str(tmp_path), index_every=3, max_cached_users=2)
+
+    # Test
+    for user in ("user_a", "user_b", "user_c"):
+        store.append(user, "question", "answer")
+
+    # Verify: the evicted user's history is reloaded from disk on demand
+    assert store.stats()["users_loaded"] == 2
+    assert [m["user"] for m in store.read_page("user_a")["messages"]] == ["question"]
@@ -0,0 +1,85 @@
+import numpy as np
+from app.utils.vad import StreamingVAD, frame_levels_db, pack_regions, speech_regions
+
+RATE = 16000
+
+def tone(seconds, amplitude=0.3):
+    t = np.arange(int(RATE * seconds)) / RATE
+    return (amplitude * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+def noise(seconds, level=0.002):
+    return np.random.default_rng(0).normal(0, level, int(RATE * seconds)).astype(np.float32)
+
+def test_frame_levels_of_full_scale_sine():
+    # Setup
+    audio = tone(0.3, amplitude=1.0)
+
+    # Test
+    levels = frame_levels_db(audio, 480)
+
+    # Verify: 10 frames of 30ms, each about -3 dBFS
+    assert len(levels) == 10
+    assert np.allclose(levels, -3.01, atol=0.1)
+
+def test_speech_start_and_end_are_reported_at_stream_positions():
+    # Setup
+    vad = StreamingVAD(min_silence_ms=300)
+    audio = np.concatenate([noise(0.6), tone(1.0), noise(0.6)])
+
+    # Test: feed in uneven chunks, as a client would
+    events = []
+    for start in range(0, len(audio), 1000):
+        events += vad.push(audio[start:start + 1000])
+
+    # Verify
+    assert [name for name, _ in events] == ["start", "end"]
+    assert abs(events[0][1] - 0.6 * RATE) <= 480
+    assert abs(events[1][1] - 1.6 * RATE) <= 480
+    assert not vad.in_speech
+
+def test_short_pause_does_not_end_speech():
+    # Setup
+    vad = StreamingVAD(min_silence_ms=600)
+
+    # Test
+    events = vad.push(np.concatenate([tone(0.5), noise(0.2), tone(0.5)]))
+
+    # Verify
+    assert [name for name, _ in events] == ["start"]
+    assert vad.in_speech
+
+def test_speech_regions_trim_silence_and_split_on_long_pauses():
+    # Setup: 1s silence, 0.5s speech, 0.2s pause, 0.5s speech, 1.5s pause, 0.5s speech, 1s silence
+    audio = np.concatenate([noise(1.0), tone(0.5), noise(0.2), tone(0.5), noise(1.5), tone(0.5), noise(1.0)])
+
+    # Test
+    regions = speech_regions(audio, min_silence_ms=600, pad_ms=100)
+
+    # Verify: the short pause stays inside the first region, the long one splits
+    assert len(regions) == 2
+    assert abs(regions[0][0] - 0.9 * RATE) <= 480 and abs(regions[0][1] - 2.3 * RATE) <= 480
+    assert abs(regions[1][0] - 3.6 * RATE) <= 480 and abs(regions[1][1] - 4.3 * RATE) <= 480
+
+def test_silence_has_no_speech_regions():
+    # Test / Verify
+    assert speech_regions(noise(3.0)) == []
+    assert speech_regions(np.zeros(RATE, dtype=np.float32)) == []
+
+def test_pack_regions_respects_max_samples():
+    # Setup
+    audio = np.arange(100, dtype=np.float32)
+
+    # Test
+    chunks = pack_regions(audio, [(0, 10), (20, 30), (40, 80)], max_samples=25)
+
+    # Verify
+    assert [len(chunk) for chunk in chunks] == [20, 40]
+    assert chunks[0][10] == 20
+
+def test_recording_without_silence_is_all_speech():
+    # Test
+    regions = speech_regions(tone(2.0), pad_ms=0)
+
+    # Verify: everything up to the last complete frame
+    assert len(regions) == 1
+    assert regions[0][0] == 0 and 2 * RATE - regions[0][1] < 480
@@ -0,0 +1,138 @@
+import asyncio
+from app.services.voice_turn import SentenceSplitter, VoiceTurnPipeline
+
+class FakeSTT:
+    async def transcribe(self, audio_bytes, sample_format=None, language=None, user_id=None):
+        return {"success": True, "text": "tell me something", "language": "en"}
+
+class FakeTTS:
+    async def synthesize(self, text, voice_id="en"):
+        return {"success": not text.startswith("Broken"), "audio_data": text.encode(), "error": "tts down"}
+
+class StreamingChat:
+    """Streams its answer word by word, recording what was spoken before it finished"""
+    def __init__(self, answer):
+        self.answer = answer
+        self.events_before_done = None
+
+    async def run(self, message, priority, latency_budget_ms, user_id, on_text=None):
+        text = ""
+        for word in self.answer.split(" "):
+            text += word + " "
+            await on_text(text)
+            await asyncio.sleep(0.01)
+        self.events_before_done = list(self.events)
+        return {"success": True, "response": self.answer}, {"llm": 1.0}
+
+class ScriptedChat:
+    """Streams the given texts so far in order, then answers with a possibly different final text"""
+    def __init__(self, updates, response):
+        self.updates = updates
+        self.response = response
+
+    async def run(self, message, priority, latency_budget_ms, user_id, on_text=None):
+        for text in self.updates:
+            await on_text(text)
+        return {"success": True, "response": self.response}, {"llm": 1.0}
+
+def run_turn(chat):
+    events = []
+    audio = []
+    chat.events = events
+    async def emit(event):
+        events.append(event)
+    async def emit_bytes(data):
+        audio.append(data)
+    pipeline = VoiceTurnPipeline(FakeSTT(), chat, FakeTTS(), min_sentence_chars=10)
+    timings = asyncio.run(pipeline.run(b"\0\0", emit, emit_bytes))
+    return pipeline, events, audio, timings
+
+def test_splitter_waits_for_whitespace_and_minimum_length():
+    # Setup
+    splitter = SentenceSplitter(min_chars=10)
+
+    # Test
+    first = splitter.feed("Ok. It costs 3.5 dol")
+    second = splitter.feed("Ok. It costs 3.5 dollars. And")
+    restarted = splitter.feed("Ok. It")
+    rest = splitter.flush("Ok. It costs 3.5 dollars. And more")
+
+    # Verify: "Ok." is too short alone, "3.5" is not a boundary, a restart repeats nothing
+    assert first == []
+    assert second == ["Ok. It costs 3.5 dollars."]
+    assert restarted == []
+    assert rest == ["And more"]
+
+def test_first_sentence_is_spoken_while_the_answer_streams():
+    # Setup
+    chat = StreamingChat("The first sentence is here. The second one follows. And the tail")
+
+    # Test
+    pipeline, events, audio, timings = run_turn(chat)
+
+    # Verify
+    assert any(event["type"] == "audio" for event in chat.events_before_done)
+    assert [event["text"] for event in events if event["type"] == "text"] == [
+        "The first sentence is here.", "The second one follows.", "And the tail"
+    ]
+    assert audio == [b"The first sentence is here.", b"The second one follows.", b"And the tail"]
+    assert events[0]["type"] == "transcript" and events[-1]["type"] == "done"
+    assert {"stt", "llm", "first_text", "first_audio", "tts", "turn"} <= set(timings)
+    assert pipeline.stats()["sentences"] == 3
+
+def test_failed_sentence_reports_an_error_and_the_rest_is_spoken():
+    # Setup
+    chat = StreamingChat("Broken sentence goes first. The next one is fine.")
+
+    # Test
+    pipeline, events, audio, timings = run_turn(chat)
+
+    # Verify
+    errors = [event for event in events if event["type"] == "error"]
+    assert errors == [{"type": "error", "stage": "tts", "index": 0, "error": "tts down"}]
+    assert audio == [b"The next one is fine."]
+
+def test_splitter_rewinds_to_the_last_shared_sentence_when_the_text_diverges():
+    # Setup
+    splitter = SentenceSplitter(min_chars=10)
+    splitter.feed("First shared sentence. Second one from attempt A. ")
+
+    # Test
+    catching_up = splitter.feed("First shared sentence. Sec")
+    diverged = splitter.feed("First shared sentence. Another second one. ")
+
+    # Verify
+    assert catching_up == []
+    assert diverged == ["Another second one."]
+    assert splitter.restarts == 1
+
+def test_fallback_after_a_broken_stream_is_spoken_whole():
+    # Setup: the stream dies mid-answer and the fallback reply comes back instead
+    chat = ScriptedChat(
+        ["Sure, I am looking ", "Sure, I am looking into your tasks now. Your first"],
+        "I'm DONNA, your personal assistant! I can help you with tasks."
+    )
+
+    # Test
+    pipeline, events, audio, timings = run_turn(chat)
+
+    # Verify: nothing cut at the stale offset
+    assert audio == [b"Sure, I am looking into your tasks now.",
+                     b"I'm DONNA, your personal assistant!", b"I can help you with tasks."]
+    assert pipeline.stats()["restarts"] == 1
+
+def test_restarted_attempt_with_different_text_is_spoken_from_where_it_differs():
+    # Setup: a retry after the first sentence was spoken samples a different answer
+    chat = ScriptedChat(
+        ["Here is the plan for today. Start with",
+         "Here is",
+         "Here is the plan for today. Begin with the report. ",
+         "Here is the plan for today. Begin with the report. Then lunch."],
+        "Here is the plan for today. Begin with the report. Then lunch."
+    )
+
+    # Test
+    pipeline, events, audio, timings = run_turn(chat)
+
+    # Verify: the shared first sentence is not repeated, the new attempt is spoken from its own text
+    assert audio == [b"Here is the plan for today.", b"Begin with the report.", b"Then lunch."]